@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class DjangoBackendConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'django_backend'
+
+    def ready(self):
+        from . import signals  # noqa: F401
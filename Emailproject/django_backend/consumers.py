@@ -3,6 +3,7 @@ from channels.generic.websocket import AsyncWebsocketConsumer
 from channels.db import database_sync_to_async
 from django.contrib.auth import get_user_model
 from .models import ChatRoom, ChatMessage
+from fastapi_app.core.room_summary import record_new_message
 
 User = get_user_model()
 
@@ -70,4 +71,6 @@ class ChatConsumer(AsyncWebsocketConsumer):
         # because the connect() function guarantees the user exists.
         user = User.objects.get(id=user_id)
         room = ChatRoom.objects.get(id=room_id)
-        return ChatMessage.objects.create(sender=user, room=room, content=content)
\ No newline at end of file
+        msg = ChatMessage.objects.create(sender=user, room=room, content=content)
+        record_new_message(msg)
+        return msg
\ No newline at end of file
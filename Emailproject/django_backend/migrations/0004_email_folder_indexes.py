@@ -0,0 +1,49 @@
+# Generated by Django 5.2.8 on 2026-10-17 20:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('django_backend', '0003_merge_20260107_1312'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='email',
+            index=models.Index(condition=models.Q(('is_archived', False), ('is_deleted_by_receiver', False)), fields=['receiver', 'status', '-created_at', '-id'], name='email_inbox_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='email',
+            index=models.Index(condition=models.Q(('is_deleted_by_sender', False)), fields=['sender', '-created_at', '-id'], name='email_sent_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='email',
+            index=models.Index(condition=models.Q(('is_archived', True), ('is_deleted_by_receiver', False)), fields=['receiver', '-created_at', '-id'], name='email_archived_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='email',
+            index=models.Index(condition=models.Q(('is_deleted_by_receiver', False), ('is_favorite', True)), fields=['receiver', '-created_at', '-id'], name='email_recv_starred_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='email',
+            index=models.Index(condition=models.Q(('is_deleted_by_sender', False), ('is_favorite', True)), fields=['sender', '-created_at', '-id'], name='email_sent_starred_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='email',
+            index=models.Index(condition=models.Q(('is_deleted_by_receiver', False), ('is_important', True)), fields=['receiver', '-created_at', '-id'], name='email_recv_important_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='email',
+            index=models.Index(condition=models.Q(('is_deleted_by_sender', False), ('is_important', True)), fields=['sender', '-created_at', '-id'], name='email_sent_important_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='email',
+            index=models.Index(condition=models.Q(('is_deleted_by_receiver', True)), fields=['receiver', '-created_at', '-id'], name='email_recv_trash_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='email',
+            index=models.Index(condition=models.Q(('is_deleted_by_sender', True)), fields=['sender', '-created_at', '-id'], name='email_sent_trash_idx'),
+        ),
+    ]
@@ -0,0 +1,91 @@
+from django.db import migrations
+from django.db.utils import OperationalError
+
+FTS_TABLE = "django_backend_email_fts"
+EMAIL_TABLE = "django_backend_email"
+
+# 's<sender_id> r<receiver_id>', receiver omitted for drafts without one.
+PARTIES_NEW = "'s' || new.sender_id || coalesce(' r' || new.receiver_id, '')"
+PARTIES_OLD = "'s' || old.sender_id || coalesce(' r' || old.receiver_id, '')"
+
+CREATE_SQL = [
+    f"""
+    CREATE VIRTUAL TABLE {FTS_TABLE} USING fts5(
+        subject, body, parties,
+        content='', prefix='2 3', tokenize='unicode61 remove_diacritics 2'
+    )
+    """,
+    # Subject matches weigh ten times body matches; the parties column only
+    # narrows results to one mailbox and never contributes to the score.
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rank) VALUES ('rank', 'bm25(10.0, 1.0, 0.0)')",
+    f"""
+    CREATE TRIGGER {FTS_TABLE}_ai AFTER INSERT ON {EMAIL_TABLE} BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, subject, body, parties)
+        VALUES (new.id, new.subject, new.body, {PARTIES_NEW});
+    END
+    """,
+    f"""
+    CREATE TRIGGER {FTS_TABLE}_ad AFTER DELETE ON {EMAIL_TABLE} BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, subject, body, parties)
+        VALUES ('delete', old.id, old.subject, old.body, {PARTIES_OLD});
+    END
+    """,
+    f"""
+    CREATE TRIGGER {FTS_TABLE}_au AFTER UPDATE ON {EMAIL_TABLE}
+    WHEN old.subject IS NOT new.subject
+        OR old.body IS NOT new.body
+        OR old.sender_id IS NOT new.sender_id
+        OR old.receiver_id IS NOT new.receiver_id
+    BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, subject, body, parties)
+        VALUES ('delete', old.id, old.subject, old.body, {PARTIES_OLD});
+        INSERT INTO {FTS_TABLE}(rowid, subject, body, parties)
+        VALUES (new.id, new.subject, new.body, {PARTIES_NEW});
+    END
+    """,
+    f"""
+    INSERT INTO {FTS_TABLE}(rowid, subject, body, parties)
+    SELECT id, subject, body, 's' || sender_id || coalesce(' r' || receiver_id, '')
+    FROM {EMAIL_TABLE}
+    """,
+]
+
+DROP_SQL = [
+    f"DROP TRIGGER IF EXISTS {FTS_TABLE}_ai",
+    f"DROP TRIGGER IF EXISTS {FTS_TABLE}_ad",
+    f"DROP TRIGGER IF EXISTS {FTS_TABLE}_au",
+    f"DROP TABLE IF EXISTS {FTS_TABLE}",
+]
+
+
+def create_fts_index(apps, schema_editor):
+    """
+    Only SQLite builds with FTS5 get the index; everywhere else search
+    falls back to LikeSearchBackend (see fastapi_app/core/email_search.py).
+    """
+    if schema_editor.connection.vendor != "sqlite":
+        return
+    try:
+        schema_editor.execute(CREATE_SQL[0])
+    except OperationalError:
+        return
+    for sql in CREATE_SQL[1:]:
+        schema_editor.execute(sql)
+
+
+def drop_fts_index(apps, schema_editor):
+    if schema_editor.connection.vendor != "sqlite":
+        return
+    for sql in DROP_SQL:
+        schema_editor.execute(sql)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('django_backend', '0004_email_folder_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_fts_index, drop_fts_index),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.8 on 2026-10-17 21:08
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('django_backend', '0005_email_fts_index'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='chatmessage',
+            index=models.Index(condition=models.Q(('is_deleted', False)), fields=['room', 'timestamp', 'id'], name='chatmsg_room_history_idx'),
+        ),
+    ]
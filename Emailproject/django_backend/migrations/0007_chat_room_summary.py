@@ -0,0 +1,66 @@
+# Generated by Django 5.2.8 on 2026-10-17 21:10
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Max
+
+
+def backfill_room_summary(apps, schema_editor):
+    """
+    Seeds last_message and one read state per participant from the existing
+    read_by receipts. Messages a user sent themselves never count as unread.
+    """
+    ChatRoom = apps.get_model('django_backend', 'ChatRoom')
+    ChatMessage = apps.get_model('django_backend', 'ChatMessage')
+    ChatRoomReadState = apps.get_model('django_backend', 'ChatRoomReadState')
+
+    for room in ChatRoom.objects.all().iterator():
+        visible = ChatMessage.objects.filter(room=room, is_deleted=False)
+        room.last_message = visible.order_by('-timestamp', '-id').first()
+        room.save(update_fields=['last_message'])
+
+        states = []
+        for user_id in room.participants.values_list('id', flat=True):
+            last_read_id = (
+                ChatMessage.objects.filter(room=room, read_by__id=user_id)
+                .aggregate(last=Max('id'))['last']
+            )
+            unread = visible.exclude(sender_id=user_id).exclude(read_by__id=user_id).count()
+            states.append(ChatRoomReadState(
+                room=room,
+                user_id=user_id,
+                last_read_message_id=last_read_id,
+                unread_count=unread,
+            ))
+        ChatRoomReadState.objects.bulk_create(states, ignore_conflicts=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('django_backend', '0006_chatmessage_room_history_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='chatroom',
+            name='last_message',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='django_backend.chatmessage'),
+        ),
+        migrations.CreateModel(
+            name='ChatRoomReadState',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('unread_count', models.PositiveIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('last_read_message', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='django_backend.chatmessage')),
+                ('room', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='read_states', to='django_backend.chatroom')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='chat_read_states', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'unique_together': {('room', 'user')},
+            },
+        ),
+        migrations.RunPython(backfill_room_summary, migrations.RunPython.noop),
+    ]
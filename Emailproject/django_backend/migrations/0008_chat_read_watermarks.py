@@ -0,0 +1,41 @@
+# Generated by Django 5.2.8 on 2026-10-17 21:12
+
+from django.db import migrations
+from django.db.models import Max, Q
+
+
+def merge_read_receipts(apps, schema_editor):
+    """
+    Folds any read_by receipts into the read markers before the M2M goes:
+    each marker moves up to the newest message the user had read in the
+    room. Users who have since left the room have no marker and are skipped.
+    """
+    ChatMessage = apps.get_model('django_backend', 'ChatMessage')
+    ChatRoomReadState = apps.get_model('django_backend', 'ChatRoomReadState')
+
+    newest_read = (
+        ChatMessage.read_by.through.objects
+        .values('chatmessage__room_id', 'user_id')
+        .annotate(last=Max('chatmessage_id'))
+    )
+    for row in newest_read.iterator():
+        ChatRoomReadState.objects.filter(
+            Q(last_read_message__isnull=True) | Q(last_read_message_id__lt=row['last']),
+            room_id=row['chatmessage__room_id'],
+            user_id=row['user_id'],
+        ).update(last_read_message_id=row['last'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('django_backend', '0007_chat_room_summary'),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_read_receipts, migrations.RunPython.noop),
+        migrations.RemoveField(
+            model_name='chatmessage',
+            name='read_by',
+        ),
+    ]
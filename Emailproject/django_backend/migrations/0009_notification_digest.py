@@ -0,0 +1,23 @@
+# Generated by Django 5.2.8 on 2026-10-17 21:26
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contenttypes', '0002_remove_content_type_name'),
+        ('django_backend', '0008_chat_read_watermarks'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='notification',
+            name='count',
+            field=models.PositiveIntegerField(default=1),
+        ),
+        migrations.AddConstraint(
+            model_name='notification',
+            constraint=models.UniqueConstraint(condition=models.Q(('is_read', False), ('notification_type', 'chat')), fields=('recipient', 'content_type', 'object_id'), name='notification_unread_chat_digest'),
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.8 on 2026-10-17 21:30
+
+from django.db import migrations, models
+from django.db.models import F
+
+
+def mark_existing_invited(apps, schema_editor):
+    """
+    Attendees added before this migration were already invited one by one.
+    """
+    EventAttendee = apps.get_model('django_backend', 'EventAttendee')
+    EventAttendee.objects.update(invited_at=F('added_at'), emailed_at=F('added_at'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('django_backend', '0009_notification_digest'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='eventattendee',
+            name='emailed_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='eventattendee',
+            name='invited_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.RunPython(mark_existing_invited, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,59 @@
+# Generated by Django 5.2.8 on 2026-10-17 21:35
+
+import django.db.models.deletion
+import django.utils.timezone
+import os
+
+from django.db import migrations, models
+
+
+def fill_attachment_names(apps, schema_editor):
+    Attachment = apps.get_model("django_backend", "Attachment")
+    for attachment in Attachment.objects.only("id", "file").iterator():
+        Attachment.objects.filter(id=attachment.id).update(file_name=os.path.basename(attachment.file.name))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('django_backend', '0011_drive_streaming_uploads'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='attachment',
+            name='file_name',
+            field=models.CharField(blank=True, max_length=255),
+        ),
+        migrations.CreateModel(
+            name='Blob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('sha256', models.CharField(max_length=64, unique=True)),
+                ('file', models.FileField(upload_to='blobs/')),
+                ('size', models.BigIntegerField(default=0)),
+                ('ref_count', models.IntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+            options={
+                'indexes': [models.Index(condition=models.Q(('ref_count__lte', 0)), fields=['updated_at'], name='blob_unreferenced_idx')],
+            },
+        ),
+        migrations.AddField(
+            model_name='attachment',
+            name='blob',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='attachments', to='django_backend.blob'),
+        ),
+        migrations.AddField(
+            model_name='chatmessage',
+            name='blob',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='chat_messages', to='django_backend.blob'),
+        ),
+        migrations.AddField(
+            model_name='drivefile',
+            name='blob',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='drive_files', to='django_backend.blob'),
+        ),
+        migrations.RunPython(fill_attachment_names, migrations.RunPython.noop),
+    ]
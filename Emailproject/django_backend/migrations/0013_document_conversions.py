@@ -0,0 +1,26 @@
+# Generated by Django 5.2.8 on 2026-10-17 21:37
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('django_backend', '0012_blob_store'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DocumentConversion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('status', models.CharField(choices=[('PENDING', 'Pending'), ('DONE', 'Done'), ('FAILED', 'Failed')], default='PENDING', max_length=10)),
+                ('error', models.TextField(blank=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('result', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='+', to='django_backend.blob')),
+                ('source', models.OneToOneField(on_delete=django.db.models.deletion.PROTECT, related_name='conversion', to='django_backend.blob')),
+            ],
+        ),
+    ]
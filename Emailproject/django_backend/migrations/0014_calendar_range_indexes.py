@@ -0,0 +1,43 @@
+# Generated by Django 5.2.8 on 2026-10-17 21:39
+
+from datetime import timedelta
+
+from django.db import migrations, models
+
+
+def mark_long_events(apps, schema_editor):
+    Event = apps.get_model("django_backend", "Event")
+    long_ids = [
+        event_id
+        for event_id, start, end in Event.objects.values_list("id", "start_datetime", "end_datetime").iterator()
+        if end - start > timedelta(days=7)
+    ]
+    Event.objects.filter(id__in=long_ids).update(is_long=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('django_backend', '0013_document_conversions'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='event',
+            name='is_long',
+            field=models.BooleanField(default=False, editable=False),
+        ),
+        migrations.AddIndex(
+            model_name='event',
+            index=models.Index(fields=['start_datetime'], name='event_start_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='event',
+            index=models.Index(condition=models.Q(('is_long', True)), fields=['start_datetime'], name='event_long_start_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='eventattendee',
+            index=models.Index(fields=['user', 'event'], name='eventattendee_user_event_idx'),
+        ),
+        migrations.RunPython(mark_long_events, migrations.RunPython.noop),
+    ]
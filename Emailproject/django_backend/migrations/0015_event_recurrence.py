@@ -0,0 +1,35 @@
+# Generated by Django 5.2.8 on 2026-10-17 21:46
+
+from django.db import migrations, models
+
+
+def flag_recurring_events(apps, schema_editor):
+    # Treated as open-ended until the event is next saved, which computes
+    # the real end; that only costs an extra expansion per query.
+    Event = apps.get_model("django_backend", "Event")
+    Event.objects.exclude(repeat_rule__isnull=True).exclude(repeat_rule="").update(is_recurring=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('django_backend', '0014_calendar_range_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='event',
+            name='is_recurring',
+            field=models.BooleanField(default=False, editable=False),
+        ),
+        migrations.AddField(
+            model_name='event',
+            name='recurrence_end',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='event',
+            index=models.Index(condition=models.Q(('is_recurring', True)), fields=['start_datetime'], name='event_recurring_start_idx'),
+        ),
+        migrations.RunPython(flag_recurring_events, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 5.2.8 on 2026-10-17 21:53
+
+from datetime import timedelta
+
+from django.db import migrations, models
+from django.db.models.functions import Now
+
+
+def schedule_pending(apps, schema_editor):
+    # Reminders of one-off events that have not started yet get their fire
+    # time; recurring ones are scheduled by 0020_schedule_recurring_reminders.
+    EventReminder = apps.get_model('django_backend', 'EventReminder')
+    pending = EventReminder.objects.filter(
+        event__is_recurring=False, event__start_datetime__gt=Now()
+    )
+    for reminder in pending.select_related('event').iterator():
+        reminder.fire_at = reminder.event.start_datetime - timedelta(minutes=reminder.minutes_before)
+        reminder.save(update_fields=['fire_at'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('django_backend', '0015_event_recurrence'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='eventreminder',
+            name='fire_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='eventreminder',
+            name='sent_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='eventreminder',
+            index=models.Index(condition=models.Q(('sent_at__isnull', True)), fields=['fire_at'], name='eventreminder_due_idx'),
+        ),
+        migrations.RunPython(schedule_pending, migrations.RunPython.noop),
+    ]
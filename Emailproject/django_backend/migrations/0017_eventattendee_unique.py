@@ -0,0 +1,35 @@
+# Generated by Django 5.2.8 on 2026-10-17 21:56
+
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def drop_duplicate_attendees(apps, schema_editor):
+    # Keep one row per (event, user): the one carrying a response if there
+    # is one, otherwise the oldest.
+    EventAttendee = apps.get_model('django_backend', 'EventAttendee')
+    duplicated = (
+        EventAttendee.objects.values('event_id', 'user_id')
+        .annotate(n=Count('id')).filter(n__gt=1)
+    )
+    for pair in duplicated:
+        rows = list(
+            EventAttendee.objects.filter(event_id=pair['event_id'], user_id=pair['user_id']).order_by('id')
+        )
+        keep = next((row for row in rows if row.status != 'pending'), rows[0])
+        EventAttendee.objects.filter(id__in=[row.id for row in rows if row.id != keep.id]).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('django_backend', '0016_reminder_schedule'),
+    ]
+
+    operations = [
+        migrations.RunPython(drop_duplicate_attendees, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='eventattendee',
+            constraint=models.UniqueConstraint(fields=('event', 'user'), name='eventattendee_event_user_uniq'),
+        ),
+    ]
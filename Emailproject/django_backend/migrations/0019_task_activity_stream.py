@@ -0,0 +1,57 @@
+# Generated by Django 5.2.8 on 2026-10-17 22:03
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+
+def copy_project_from_task(apps, schema_editor):
+    Task = apps.get_model('django_backend', 'Task')
+    TaskActivity = apps.get_model('django_backend', 'TaskActivity')
+    TaskActivity.objects.update(
+        project_id=Subquery(Task.objects.filter(id=OuterRef('task_id')).values('project_id')[:1])
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('django_backend', '0018_task_list_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='taskactivity',
+            name='field',
+            field=models.CharField(blank=True, max_length=50),
+        ),
+        migrations.AddField(
+            model_name='taskactivity',
+            name='new_value',
+            field=models.CharField(blank=True, max_length=255, null=True),
+        ),
+        migrations.AddField(
+            model_name='taskactivity',
+            name='old_value',
+            field=models.CharField(blank=True, max_length=255, null=True),
+        ),
+        migrations.AddField(
+            model_name='taskactivity',
+            name='project',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='activity_log', to='django_backend.project'),
+        ),
+        migrations.AlterField(
+            model_name='taskactivity',
+            name='details',
+            field=models.TextField(blank=True),
+        ),
+        migrations.AddIndex(
+            model_name='taskactivity',
+            index=models.Index(fields=['task', 'created_at'], name='taskactivity_task_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='taskactivity',
+            index=models.Index(fields=['project', 'created_at'], name='taskactivity_project_idx'),
+        ),
+        migrations.RunPython(copy_project_from_task, migrations.RunPython.noop),
+    ]
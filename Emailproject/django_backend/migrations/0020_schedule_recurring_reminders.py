@@ -0,0 +1,39 @@
+from datetime import timedelta
+
+from django.db import migrations
+from django.utils import timezone
+
+from django_backend.recurrence import next_occurrence
+
+
+def schedule_recurring(apps, schema_editor):
+    # 0016 only gave fire times to reminders of one-off events. Schedule
+    # the ones on recurring events for their next occurrence, as
+    # fastapi_app.core.reminders.next_fire_at would.
+    EventReminder = apps.get_model('django_backend', 'EventReminder')
+    now = timezone.now()
+    pending = EventReminder.objects.filter(
+        event__is_recurring=True, fire_at__isnull=True, sent_at__isnull=True
+    ).select_related('event')
+    batch = []
+    for reminder in pending.iterator(chunk_size=500):
+        start = next_occurrence(reminder.event, now)
+        if start is None:
+            continue
+        reminder.fire_at = start - timedelta(minutes=reminder.minutes_before)
+        batch.append(reminder)
+        if len(batch) >= 500:
+            EventReminder.objects.bulk_update(batch, ['fire_at'])
+            batch = []
+    EventReminder.objects.bulk_update(batch, ['fire_at'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('django_backend', '0019_task_activity_stream'),
+    ]
+
+    operations = [
+        migrations.RunPython(schedule_recurring, migrations.RunPython.noop),
+    ]
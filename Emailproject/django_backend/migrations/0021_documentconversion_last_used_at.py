@@ -0,0 +1,19 @@
+# Generated by Django 5.2.8 on 2026-10-17 22:30
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('django_backend', '0020_schedule_recurring_reminders'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='documentconversion',
+            name='last_used_at',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+    ]
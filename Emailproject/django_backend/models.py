@@ -1,9 +1,12 @@
+import uuid
+from datetime import timedelta
 from django.contrib.auth.models import AbstractBaseUser, PermissionsMixin, BaseUserManager
 from django.db import models
 from django.utils import timezone
 from django.conf import settings
 from django.contrib.contenttypes.fields import GenericForeignKey
 from django.contrib.contenttypes.models import ContentType
+from django_backend.recurrence import series_bounds
 
 class CustomUserManager(BaseUserManager):
     def create_user(self, email, password=None, **extra_fields):
@@ -96,18 +99,119 @@ class Email(models.Model):
     # Fixed Logic: Default should be DRAFT, not SENT
     status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='DRAFT')
 
+    class Meta:
+        # One partial index per mailbox folder (see fastapi_app/core/mailbox.py).
+        # The folder's boolean flags live in the index condition and the key
+        # ends in (-created_at, -id), so a folder page is a single index range
+        # scan in keyset order with no sort step.
+        indexes = [
+            models.Index(
+                fields=["receiver", "status", "-created_at", "-id"],
+                condition=models.Q(is_deleted_by_receiver=False, is_archived=False),
+                name="email_inbox_idx",
+            ),
+            models.Index(
+                fields=["sender", "-created_at", "-id"],
+                condition=models.Q(is_deleted_by_sender=False),
+                name="email_sent_idx",
+            ),
+            models.Index(
+                fields=["receiver", "-created_at", "-id"],
+                condition=models.Q(is_deleted_by_receiver=False, is_archived=True),
+                name="email_archived_idx",
+            ),
+            models.Index(
+                fields=["receiver", "-created_at", "-id"],
+                condition=models.Q(is_deleted_by_receiver=False, is_favorite=True),
+                name="email_recv_starred_idx",
+            ),
+            models.Index(
+                fields=["sender", "-created_at", "-id"],
+                condition=models.Q(is_deleted_by_sender=False, is_favorite=True),
+                name="email_sent_starred_idx",
+            ),
+            models.Index(
+                fields=["receiver", "-created_at", "-id"],
+                condition=models.Q(is_deleted_by_receiver=False, is_important=True),
+                name="email_recv_important_idx",
+            ),
+            models.Index(
+                fields=["sender", "-created_at", "-id"],
+                condition=models.Q(is_deleted_by_sender=False, is_important=True),
+                name="email_sent_important_idx",
+            ),
+            models.Index(
+                fields=["receiver", "-created_at", "-id"],
+                condition=models.Q(is_deleted_by_receiver=True),
+                name="email_recv_trash_idx",
+            ),
+            models.Index(
+                fields=["sender", "-created_at", "-id"],
+                condition=models.Q(is_deleted_by_sender=True),
+                name="email_sent_trash_idx",
+            ),
+        ]
+
     def __str__(self):
         receiver_email = self.receiver.email if self.receiver else "Draft"
         return f"{self.sender.email} -> {receiver_email}"
 
+class Blob(models.Model):
+    """
+    Stored file content, shared by every attachment, chat file and Drive
+    file with the same bytes. `ref_count` is maintained by signals on the
+    referencing models; blobs that drop to zero are removed by
+    tasks.collect_unreferenced_blobs.
+    """
+    sha256 = models.CharField(max_length=64, unique=True)
+    file = models.FileField(upload_to="blobs/")
+    size = models.BigIntegerField(default=0)
+    ref_count = models.IntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["updated_at"], condition=models.Q(ref_count__lte=0), name="blob_unreferenced_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.sha256[:12]} ({self.ref_count} refs)"
+
 class Attachment(models.Model):
     email = models.ForeignKey(Email, related_name="attachments", on_delete=models.CASCADE)
     file = models.FileField(upload_to='attachments/')
+    file_name = models.CharField(max_length=255, blank=True)
+    blob = models.ForeignKey(Blob, null=True, blank=True, on_delete=models.PROTECT, related_name="attachments")
     uploaded_at = models.DateTimeField(auto_now_add=True)
 
     def __str__(self):
         return f"Attachment for Email {self.email.id}"
 
+class DocumentConversion(models.Model):
+    """
+    Conversion cache: one row per distinct source document (a Blob, so keyed
+    by content hash) with the PDF made from it. Both blobs are protected
+    from garbage collection while the row exists; rows not used for
+    CONVERSION_CACHE_DAYS whose blobs nothing else references are expired
+    by tasks.collect_unreferenced_blobs.
+    """
+    STATUS_CHOICES = (
+        ('PENDING', 'Pending'),
+        ('DONE', 'Done'),
+        ('FAILED', 'Failed'),
+    )
+    source = models.OneToOneField(Blob, on_delete=models.PROTECT, related_name="conversion")
+    result = models.ForeignKey(Blob, null=True, blank=True, on_delete=models.PROTECT, related_name="+")
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='PENDING')
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    last_used_at = models.DateTimeField(default=timezone.now)
+
+    def __str__(self):
+        return f"Conversion of {self.source.sha256[:12]} ({self.status})"
+
 class ChatRoom(models.Model):
     name = models.CharField(max_length=255, blank=True, null=True)
     is_group = models.BooleanField(default=False)
@@ -120,6 +224,15 @@ class ChatRoom(models.Model):
         related_name="chat_room"
     )
     created_at = models.DateTimeField(auto_now_add=True)
+    # Denormalized pointer to the newest non-deleted message, kept current by
+    # fastapi_app/core/room_summary.py so room lists never scan messages.
+    last_message = models.ForeignKey(
+        "ChatMessage",
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="+"
+    )
 
     def __str__(self):
         return self.name or f"Room {self.id}"
@@ -136,17 +249,45 @@ class ChatMessage(models.Model):
     message_type = models.CharField(max_length=10, choices=TYPE_CHOICES, default='TEXT')
     content = models.TextField(blank=True, null=True)
     attachment = models.FileField(upload_to='chat_attachments/', blank=True, null=True)
+    blob = models.ForeignKey("Blob", null=True, blank=True, on_delete=models.PROTECT, related_name="chat_messages")
     timestamp = models.DateTimeField(auto_now_add=True)
 
-    read_by = models.ManyToManyField(settings.AUTH_USER_MODEL, related_name="read_messages", blank=True)
     starred_by = models.ManyToManyField(settings.AUTH_USER_MODEL, related_name="starred_chat_messages", blank=True)
     is_deleted = models.BooleanField(default=False)
     is_forwarded = models.BooleanField(default=False)
     mentions = models.ManyToManyField(settings.AUTH_USER_MODEL, related_name="mentioned_in_messages", blank=True)
+
+    class Meta:
+        # Keyset index for room history windows (before/after/around).
+        indexes = [
+            models.Index(
+                fields=["room", "timestamp", "id"],
+                condition=models.Q(is_deleted=False),
+                name="chatmsg_room_history_idx",
+            ),
+        ]
     
     def __str__(self):
         return f"{self.sender.email}: {str(self.content)[:20]}"
 
+class ChatRoomReadState(models.Model):
+    """
+    Per-(room, participant) summary: how far the user has read and how many
+    messages from others are waiting. One row per participant, created and
+    removed with the room's participants (see django_backend/signals.py).
+    """
+    room = models.ForeignKey(ChatRoom, related_name="read_states", on_delete=models.CASCADE)
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, related_name="chat_read_states", on_delete=models.CASCADE)
+    last_read_message = models.ForeignKey(ChatMessage, null=True, blank=True, on_delete=models.SET_NULL, related_name="+")
+    unread_count = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ('room', 'user')
+
+    def __str__(self):
+        return f"{self.user} in {self.room}: {self.unread_count} unread"
+
 class Tag(models.Model):
     name = models.CharField(max_length=50, unique=True)
     color = models.CharField(max_length=7, default="#FFFFFF")
@@ -189,6 +330,13 @@ class Task(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=["assigned_to", "status"], name="task_assignee_status_idx"),
+            models.Index(fields=["created_by", "status"], name="task_creator_status_idx"),
+            models.Index(fields=["due_date"], name="task_due_idx"),
+        ]
+
     def __str__(self):
         return self.title
 
@@ -274,16 +422,65 @@ class Event(models.Model):
     created_by = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="created_events")       
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
+    # Events lasting longer than LONG_EVENT_SPAN. Range queries only look
+    # LONG_EVENT_SPAN back on the start_datetime index and find these few
+    # through their own index (see fastapi_app/core/calendar_query.py).
+    is_long = models.BooleanField(default=False, editable=False)
+    # Derived from repeat_rule on save: whether it is a valid rule, and when
+    # the last occurrence ends (null for open-ended series). Range queries
+    # use these to pick the series to expand (see
+    # django_backend/recurrence.py).
+    is_recurring = models.BooleanField(default=False, editable=False)
+    recurrence_end = models.DateTimeField(null=True, blank=True, editable=False)
+
+    LONG_EVENT_SPAN = timedelta(days=7)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["start_datetime"], name="event_start_idx"),
+            models.Index(fields=["start_datetime"], condition=models.Q(is_long=True), name="event_long_start_idx"),
+            models.Index(fields=["start_datetime"], condition=models.Q(is_recurring=True), name="event_recurring_start_idx"),
+        ]
+
+    def save(self, *args, **kwargs):
+        self.is_long = self.end_datetime - self.start_datetime > self.LONG_EVENT_SPAN
+        self.is_recurring, self.recurrence_end = series_bounds(self)
+        if kwargs.get("update_fields") is not None:
+            kwargs["update_fields"] = set(kwargs["update_fields"]) | {"is_long", "is_recurring", "recurrence_end"}
+        super().save(*args, **kwargs)
 
 class EventAttendee(models.Model):
     event = models.ForeignKey(Event, on_delete=models.CASCADE)
     user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
     status = models.CharField(max_length=20, choices=(("accepted","Accepted"),("declined","Declined"),("maybe","Maybe"),("pending","Pending")), default="pending")
     added_at = models.DateTimeField(auto_now_add=True)
+    # Set by process_event_invites once the in-app invite (notification and
+    # internal email) and the outbound email have gone out, so retries skip them.
+    invited_at = models.DateTimeField(null=True, blank=True)
+    emailed_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["event", "user"], name="eventattendee_event_user_uniq"),
+        ]
+        indexes = [
+            models.Index(fields=["user", "event"], name="eventattendee_user_event_idx"),
+        ]
 
 class EventReminder(models.Model):
     event = models.ForeignKey(Event, on_delete=models.CASCADE)
     minutes_before = models.IntegerField()
+    # When the reminder is next due (for recurring events, before the next
+    # occurrence). Null when there is nothing left to remind about. sent_at
+    # is set once a one-off reminder has gone out.
+    fire_at = models.DateTimeField(null=True, blank=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            # The scheduler only ever reads the front of this index.
+            models.Index(fields=["fire_at"], condition=models.Q(sent_at__isnull=True), name="eventreminder_due_idx"),
+        ]
 
 class GovernmentHoliday(models.Model):
     name = models.CharField(max_length=255)
@@ -318,6 +515,18 @@ class Notification(models.Model):
     content_type = models.ForeignKey(ContentType, on_delete=models.CASCADE, null=True)
     object_id = models.PositiveIntegerField(null=True)
     content_object = GenericForeignKey('content_type', 'object_id')
+    # How many events an unread digest stands for (e.g. "5 new messages in ...").
+    count = models.PositiveIntegerField(default=1)
+
+    class Meta:
+        constraints = [
+            # At most one unread chat digest per recipient and room.
+            models.UniqueConstraint(
+                fields=["recipient", "content_type", "object_id"],
+                condition=models.Q(is_read=False, notification_type='chat'),
+                name="notification_unread_chat_digest",
+            ),
+        ]
 
     def __str__(self):
         return f"Notification for {self.recipient}: {self.message}"
@@ -332,12 +541,44 @@ class TaskComment(models.Model):
         return f"Comment by {self.author.email} on {self.task.title}"
 
 class TaskActivity(models.Model):
+    """
+    Append-only: rows are written in bulk (see fastapi_app.core.task_activity)
+    and never changed afterwards.
+    """
     task = models.ForeignKey(Task, related_name="activity_log", on_delete=models.CASCADE)
+    # Copied from the task when the entry is written, so a project's feed
+    # is read straight off (project, created_at) without joining tasks.
+    project = models.ForeignKey(Project, related_name="activity_log", null=True, blank=True, on_delete=models.CASCADE)
     actor = models.ForeignKey(settings.AUTH_USER_MODEL, related_name="actions", on_delete=models.CASCADE)
     action_type = models.CharField(max_length=50)
-    details = models.TextField()
+    field = models.CharField(max_length=50, blank=True)
+    old_value = models.CharField(max_length=255, null=True, blank=True)
+    new_value = models.CharField(max_length=255, null=True, blank=True)
+    # Free text, only kept for entries written before field/old/new existed.
+    details = models.TextField(blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=["task", "created_at"], name="taskactivity_task_created_idx"),
+            models.Index(fields=["project", "created_at"], name="taskactivity_project_idx"),
+        ]
+
+    def save(self, *args, **kwargs):
+        if not self._state.adding:
+            raise ValueError("TaskActivity entries are append-only")
+        super().save(*args, **kwargs)
+
+    @property
+    def summary(self) -> str:
+        if self.details or not self.field:
+            return self.details
+        if self.action_type == "tag_added":
+            return f"Added tag: {self.new_value}"
+        if self.old_value is None:
+            return f"Set {self.field} to {self.new_value}"
+        return f"Changed {self.field} from {self.old_value} to {self.new_value}"
+
     def __str__(self):
         return f"{self.actor.email} - {self.action_type}"
 
@@ -361,6 +602,25 @@ class DriveFile(models.Model):
     content_type = models.CharField(max_length=100, default="application/octet-stream")
     uploaded_at = models.DateTimeField(default=timezone.now)
     created_at = models.DateTimeField(auto_now_add=True)
+    sha256 = models.CharField(max_length=64, blank=True, db_index=True)
+    blob = models.ForeignKey(Blob, null=True, blank=True, on_delete=models.PROTECT, related_name="drive_files")
+
+    def __str__(self):
+        return self.original_name    
+
+class UploadSession(models.Model):
+    """
+    A resumable Drive upload in progress: chunks are appended to a partial
+    file (see fastapi_app/core/uploads.py) until the client completes it.
+    """
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    owner = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="upload_sessions")
+    original_name = models.CharField(max_length=255)
+    content_type = models.CharField(max_length=100, default="application/octet-stream")
+    total_size = models.BigIntegerField(null=True, blank=True)
+    received = models.BigIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
 
     def __str__(self):
-        return self.original_name    
\ No newline at end of file
+        return f"{self.original_name} ({self.received} bytes received)"
\ No newline at end of file
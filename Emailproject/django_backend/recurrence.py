@@ -0,0 +1,149 @@
+# Pure rrule helpers for Event.repeat_rule, used by Event.save, migrations
+# and the calendar API. Deliberately free of Django settings and FastAPI
+# config so models and migrations can import them anywhere.
+from datetime import datetime, timedelta, timezone as dt_timezone
+from typing import List, Optional, Tuple
+from zoneinfo import ZoneInfo
+
+from dateutil.rrule import rrulestr, WEEKLY, DAILY, HOURLY, MINUTELY, SECONDLY
+
+# Plain names the UI may store instead of an RRULE.
+SIMPLE_RULES = {
+    "daily": "FREQ=DAILY",
+    "weekly": "FREQ=WEEKLY",
+    "weekdays": "FREQ=WEEKLY;BYDAY=MO,TU,WE,TH,FR",
+    "monthly": "FREQ=MONTHLY",
+    "yearly": "FREQ=YEARLY",
+}
+
+# Frequencies whose periods have a fixed length, so a series can jump
+# straight to the period containing a window.
+FIXED_PERIODS = {
+    WEEKLY: timedelta(weeks=1),
+    DAILY: timedelta(days=1),
+    HOURLY: timedelta(hours=1),
+    MINUTELY: timedelta(minutes=1),
+    SECONDLY: timedelta(seconds=1),
+}
+
+
+def _zone(name: str):
+    try:
+        return ZoneInfo(name)
+    except Exception:
+        return dt_timezone.utc
+
+
+def _to_local(value: datetime, zone) -> datetime:
+    return value.astimezone(zone).replace(tzinfo=None)
+
+
+def _to_utc(local: datetime, zone) -> datetime:
+    return local.replace(tzinfo=zone).astimezone(dt_timezone.utc)
+
+
+def parse_rule(repeat_rule: Optional[str], local_start: datetime):
+    """
+    Parses Event.repeat_rule ("FREQ=WEEKLY;BYDAY=MO,WE", optionally
+    prefixed with "RRULE:", or one of SIMPLE_RULES) anchored at the
+    event's naive local start time. Rules are expanded in local wall-clock
+    time so occurrences keep their time of day across DST changes.
+    Returns None for an empty or invalid rule.
+    """
+    if not repeat_rule or not repeat_rule.strip():
+        return None
+    text = repeat_rule.strip()
+    text = SIMPLE_RULES.get(text.lower(), text)
+    try:
+        return rrulestr(text, dtstart=local_start, ignoretz=True)
+    except (ValueError, TypeError, AttributeError):
+        return None
+
+
+def _fast_forward(rule, local_from: datetime):
+    """
+    Moves the rule's start forward by whole periods to the last one
+    beginning at or before `local_from`, so expanding a window costs the
+    same however old the series is. Rules with COUNT need every earlier
+    occurrence to be counted, and monthly/yearly periods vary in length, so
+    those are left alone (the latter yield at most a few dozen occurrences
+    a year).
+    """
+    # dateutil keeps the parsed rule parts in private attributes only.
+    period = FIXED_PERIODS.get(getattr(rule, "_freq", None))
+    if period is None or rule._count is not None:
+        return rule
+    period *= rule._interval
+    skip = (local_from - rule._dtstart) // period
+    if skip < 1:
+        return rule
+    return rule.replace(dtstart=rule._dtstart + skip * period)
+
+
+def series_bounds(event) -> Tuple[bool, Optional[datetime]]:
+    """
+    (is_recurring, recurrence_end) for an event: whether its repeat_rule
+    is valid, and when its last occurrence ends (None if it never stops).
+    """
+    zone = _zone(event.timezone)
+    rule = parse_rule(event.repeat_rule, _to_local(event.start_datetime, zone))
+    if rule is None:
+        return False, None
+    until = getattr(rule, "_until", None)
+    if until is None and getattr(rule, "_count", None) is None:
+        # Open-ended (rule sets with EXDATE etc. are treated as such too).
+        return True, None
+
+    last = None
+    if until is not None:
+        last = _fast_forward(rule, until).before(until, inc=True)
+    else:
+        for last in rule:
+            pass
+    if last is None:
+        return True, event.end_datetime
+    return True, _to_utc(last, zone) + (event.end_datetime - event.start_datetime)
+
+
+def expand(event, start: datetime, end: datetime) -> List[datetime]:
+    """
+    Start times (UTC) of the event's occurrences that overlap [start, end).
+    """
+    zone = _zone(event.timezone)
+    duration = event.end_datetime - event.start_datetime
+    rule = parse_rule(event.repeat_rule, _to_local(event.start_datetime, zone))
+    if rule is None:
+        # Flagged as recurring before the rule was validated; show it once.
+        overlaps = event.start_datetime < end and (event.end_datetime > start or event.start_datetime >= start)
+        return [event.start_datetime] if overlaps else []
+
+    # A day of slack on each side absorbs UTC offset changes.
+    local_from = _to_local(start - duration, zone) - timedelta(days=1)
+    local_to = _to_local(end, zone) + timedelta(days=1)
+
+    starts = []
+    for local in _fast_forward(rule, local_from).xafter(local_from, inc=True):
+        if local >= local_to:
+            break
+        occurrence = _to_utc(local, zone)
+        if occurrence < end and (occurrence + duration > start or occurrence >= start):
+            starts.append(occurrence)
+    return starts
+
+
+def next_occurrence(event, after: datetime) -> Optional[datetime]:
+    """
+    Start (UTC) of the event's first occurrence strictly after `after`, or
+    None once the series is over.
+    """
+    zone = _zone(event.timezone)
+    rule = parse_rule(event.repeat_rule, _to_local(event.start_datetime, zone))
+    if rule is None:
+        return event.start_datetime if event.start_datetime > after else None
+
+    local_after = _to_local(after, zone) - timedelta(days=1)
+    for local in _fast_forward(rule, local_after).xafter(local_after, inc=True):
+        occurrence = _to_utc(local, zone)
+        if occurrence > after:
+            return occurrence
+    return None
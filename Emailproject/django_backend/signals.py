@@ -0,0 +1,64 @@
+from django.db.models import F
+from django.db.models.signals import m2m_changed, post_save, post_delete
+from django.dispatch import receiver
+from django.utils import timezone
+
+from .models import ChatRoom, ChatRoomReadState, Attachment, ChatMessage, DriveFile, Blob
+
+BLOB_OWNERS = (Attachment, ChatMessage, DriveFile)
+
+
+@receiver(m2m_changed, sender=ChatRoom.participants.through)
+def sync_room_read_states(sender, instance, action, reverse, pk_set, **kwargs):
+    """
+    Keeps one ChatRoomReadState per participant. New members start with
+    everything already in the room marked as read.
+    """
+    if action == "post_add" and pk_set:
+        if reverse:
+            pairs = [(room_id, instance.pk) for room_id in pk_set]
+        else:
+            pairs = [(instance.pk, user_id) for user_id in pk_set]
+        last_ids = dict(
+            ChatRoom.objects.filter(id__in={room_id for room_id, _ in pairs})
+            .values_list("id", "last_message_id")
+        )
+        ChatRoomReadState.objects.bulk_create(
+            [
+                ChatRoomReadState(room_id=room_id, user_id=user_id, last_read_message_id=last_ids.get(room_id))
+                for room_id, user_id in pairs
+            ],
+            ignore_conflicts=True
+        )
+    elif action == "post_remove" and pk_set:
+        if reverse:
+            ChatRoomReadState.objects.filter(user_id=instance.pk, room_id__in=pk_set).delete()
+        else:
+            ChatRoomReadState.objects.filter(room_id=instance.pk, user_id__in=pk_set).delete()
+    elif action == "post_clear":
+        if reverse:
+            ChatRoomReadState.objects.filter(user_id=instance.pk).delete()
+        else:
+            ChatRoomReadState.objects.filter(room_id=instance.pk).delete()
+
+
+def _adjust_blob_refs(blob_id, delta):
+    Blob.objects.filter(pk=blob_id).update(ref_count=F("ref_count") + delta, updated_at=timezone.now())
+
+
+def retain_blob(sender, instance, created, **kwargs):
+    """
+    Every new row that points at a blob holds one reference to it.
+    """
+    if created and instance.blob_id:
+        _adjust_blob_refs(instance.blob_id, 1)
+
+
+def release_blob(sender, instance, **kwargs):
+    if instance.blob_id:
+        _adjust_blob_refs(instance.blob_id, -1)
+
+
+for model in BLOB_OWNERS:
+    post_save.connect(retain_blob, sender=model, dispatch_uid=f"retain_blob_{model.__name__}")
+    post_delete.connect(release_blob, sender=model, dispatch_uid=f"release_blob_{model.__name__}")
@@ -1,3 +1,613 @@
-from django.test import TestCase
+import asyncio
+import json
+import os
+import tempfile
+from datetime import timedelta
+from unittest import mock, skipUnless
 
-# Create your tests here.
+from celery import current_app
+from django.conf import settings as django_settings
+from django.contrib.auth import get_user_model
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import connection
+from django.db.models import Q, QuerySet
+from django.test import SimpleTestCase, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from pydantic import ValidationError
+from starlette.applications import Starlette
+from starlette.routing import Mount
+from starlette.testclient import TestClient
+
+from django_backend.models import (
+    Blob, ChatMessage, ChatRoom, DocumentConversion, DriveFile, Email, Event, EventReminder, MessageReaction,
+    Notification, Project, Task, TaskActivity, UploadSession,
+)
+from fastapi_app.core import broadcast
+from fastapi_app.core.config import settings
+from fastapi_app.core.email_search import SearchBackend, get_search_backend
+from fastapi_app.core.mailbox import list_folder
+from fastapi_app.core.media import MediaFiles
+from fastapi_app.core.message_serializer import serialize_messages
+from fastapi_app.core.reminders import schedule_reminders
+from fastapi_app.core.task_activity import ActivityBuffer, activity_page
+from fastapi_app.core.task_bulk import bulk_create_tasks, bulk_update_tasks
+from fastapi_app.core.task_query import PRIORITY_RANK, SORTS, list_tasks
+from fastapi_app.core.uploads import chunk_spool, commit_chunk, partial_path
+from fastapi_app.schemas.calendar_schemas import FreeBusyRequest
+from fastapi_app.schemas.task_schemas import TaskCreate
+from fastapi_app.tasks import (
+    attach_converted_document, collect_unreferenced_blobs, fan_out_chat_notification, fire_due_reminders,
+    purge_stale_upload_sessions,
+)
+
+User = get_user_model()
+
+
+def run_scheduled(name, at):
+    """
+    Runs a CELERY_BEAT_SCHEDULE entry the way beat would, at time `at`.
+    """
+    entry = django_settings.CELERY_BEAT_SCHEDULE[name]
+    with mock.patch("django.utils.timezone.now", return_value=at):
+        return current_app.tasks[entry["task"]].apply(kwargs=entry.get("kwargs", {})).get()
+
+
+class ReminderDeliveryTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user("alice@thestackly.com", "pw")
+
+    def _event(self, starts_in):
+        start = timezone.now() + starts_in
+        return Event.objects.create(
+            title="Standup",
+            start_datetime=start,
+            end_datetime=start + timedelta(minutes=30),
+            created_by=self.user,
+        )
+
+    def test_reminder_offset_longer_than_notice_fires_at_once(self):
+        event = self._event(timedelta(minutes=10))
+        schedule_reminders(event, [30])
+
+        self.assertEqual(fire_due_reminders(), 1)
+        self.assertEqual(Notification.objects.filter(recipient=self.user, object_id=event.id).count(), 1)
+        self.assertIsNotNone(EventReminder.objects.get(event=event).sent_at)
+        self.assertEqual(fire_due_reminders(), 0)
+
+    def test_lead_longer_than_repeat_period_sends_one_catch_up(self):
+        # Daily series, next occurrence in two hours, reminder three days ahead.
+        event = self._event(timedelta(hours=2) - timedelta(days=1))
+        event.repeat_rule = "daily"
+        event.save()
+        schedule_reminders(event, [3 * 24 * 60])
+        reminder = EventReminder.objects.get(event=event)
+
+        self.assertEqual(fire_due_reminders(), 1)
+        self.assertEqual(fire_due_reminders(), 0)
+        reminder.refresh_from_db()
+        self.assertGreater(reminder.fire_at, timezone.now())
+        self.assertIsNone(reminder.sent_at)
+
+        # From then on, one reminder per occurrence, each three days ahead.
+        fire_at = reminder.fire_at
+        with mock.patch("django.utils.timezone.now", return_value=fire_at + timedelta(seconds=1)):
+            self.assertEqual(fire_due_reminders(), 1)
+            self.assertEqual(fire_due_reminders(), 0)
+        reminder.refresh_from_db()
+        self.assertEqual(reminder.fire_at, fire_at + timedelta(days=1))
+        self.assertEqual(Notification.objects.filter(object_id=event.id).count(), 2)
+
+    def test_reminder_for_event_well_under_way_is_skipped(self):
+        event = self._event(-timedelta(hours=1))
+        EventReminder.objects.create(
+            event=event, minutes_before=10, fire_at=event.start_datetime - timedelta(minutes=10)
+        )
+
+        self.assertEqual(fire_due_reminders(), 0)
+        self.assertFalse(Notification.objects.filter(object_id=event.id).exists())
+        self.assertIsNotNone(EventReminder.objects.get(event=event).sent_at)
+
+
+@skipUnless(connection.vendor == "sqlite", "plan text is SQLite's")
+class MailboxQueryPlanTests(TestCase):
+    def setUp(self):
+        self.alice = User.objects.create_user("alice@thestackly.com", "pw")
+        bob = User.objects.create_user("bob@thestackly.com", "pw")
+        Email.objects.bulk_create([
+            Email(
+                sender=bob if i % 2 else self.alice,
+                receiver=self.alice if i % 2 else bob,
+                subject=f"s{i}",
+                body="b",
+                status="SENT",
+                is_archived=i % 5 == 0,
+            )
+            for i in range(200)
+        ])
+        with connection.cursor() as cursor:
+            cursor.execute("ANALYZE")
+
+    def _plan(self, folder):
+        # EXPLAINs the page query list_folder actually runs for a page
+        # after the first.
+        first = list_folder(self.alice, folder, limit=10)
+        with CaptureQueriesContext(connection) as queries:
+            list_folder(self.alice, folder, cursor=first["next_cursor"], limit=10)
+        page_sql = next(q["sql"] for q in queries.captured_queries if 'FROM "django_backend_email"' in q["sql"])
+        with connection.cursor() as cursor:
+            cursor.execute(f"EXPLAIN QUERY PLAN {page_sql}")
+            return "\n".join(row[-1] for row in cursor.fetchall())
+
+    def test_folder_pages_are_an_index_range_scan(self):
+        for folder, index in (
+            ("inbox", "email_inbox_idx"),
+            ("sent", "email_sent_idx"),
+            ("archived", "email_archived_idx"),
+        ):
+            with self.subTest(folder=folder):
+                plan = self._plan(folder)
+                self.assertIn(f"SEARCH django_backend_email USING INDEX {index} ", plan)
+                self.assertNotIn("TEMP B-TREE", plan)
+
+
+class UploadChunkTests(TestCase):
+    def setUp(self):
+        temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(temp_dir.cleanup)
+        patcher = mock.patch.object(settings, "UPLOAD_TEMP_DIR", temp_dir.name)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        owner = User.objects.create_user("alice@thestackly.com", "pw")
+        self.session = UploadSession.objects.create(owner=owner, original_name="a.bin", total_size=8)
+
+    def _commit(self, offset, data):
+        with chunk_spool() as spool:
+            spool.write(data)
+            return commit_chunk(self.session.id, offset, spool, len(data))
+
+    def test_losing_request_at_same_offset_does_not_touch_the_upload(self):
+        self.assertTrue(self._commit(0, b"AAAA"))
+        # A second request that also started at offset 0 loses the claim.
+        self.assertFalse(self._commit(0, b"BBBBBB"))
+        self.assertTrue(self._commit(4, b"CCCC"))
+
+        self.session.refresh_from_db()
+        self.assertEqual(self.session.received, 8)
+        with open(partial_path(self.session.id), "rb") as fh:
+            self.assertEqual(fh.read(), b"AAAACCCC")
+
+
+    def test_scheduled_purge_removes_only_idle_sessions(self):
+        self.assertTrue(self._commit(0, b"AAAA"))
+        self.assertEqual(run_scheduled("purge-stale-upload-sessions", timezone.now()), 0)
+        self.assertEqual(run_scheduled("purge-stale-upload-sessions", timezone.now() + timedelta(days=2)), 1)
+        self.assertFalse(UploadSession.objects.filter(id=self.session.id).exists())
+        self.assertFalse(os.path.exists(partial_path(self.session.id)))
+
+    def test_purge_keeps_session_that_took_a_chunk_after_listing(self):
+        self.assertTrue(self._commit(0, b"AAAA"))
+        UploadSession.objects.filter(id=self.session.id).update(updated_at=timezone.now() - timedelta(days=2))
+
+        def list_then_receive_chunk(queryset, *args, **kwargs):
+            ids = list(queryset)
+            self.assertTrue(self._commit(4, b"CCCC"))
+            return iter(ids)
+
+        with mock.patch("django.db.models.query.QuerySet.iterator", list_then_receive_chunk):
+            self.assertEqual(purge_stale_upload_sessions(), 0)
+
+        self.assertTrue(UploadSession.objects.filter(id=self.session.id).exists())
+        with open(partial_path(self.session.id), "rb") as fh:
+            self.assertEqual(fh.read(), b"AAAACCCC")
+
+
+class MessageSerializerTests(TestCase):
+    def setUp(self):
+        self.alice = User.objects.create_user("alice@thestackly.com", "pw")
+        self.bob = User.objects.create_user("bob@thestackly.com", "pw")
+        self.room = ChatRoom.objects.create(name="Team", is_group=True)
+        self.room.participants.add(self.alice, self.bob)
+        parent = None
+        for i in range(30):
+            sender = self.alice if i % 2 else self.bob
+            message = ChatMessage.objects.create(room=self.room, sender=sender, content=f"m{i}", parent=parent)
+            MessageReaction.objects.create(message=message, user=self.bob, emoji="+1")
+            if i % 3 == 0:
+                message.starred_by.add(self.alice)
+            parent = message
+
+    def test_query_count_does_not_depend_on_page_size(self):
+        for size in (5, 25):
+            page = ChatMessage.objects.filter(id__in=list(
+                ChatMessage.objects.order_by("-id").values_list("id", flat=True)[:size]
+            ))
+            with self.assertNumQueries(4):
+                data = serialize_messages(page, self.alice)
+            self.assertEqual(len(data), size)
+            self.assertTrue(all(m["reactions"] and m["parent_sender"] for m in data))
+
+
+class BlobCollectionTests(TestCase):
+    def _blob(self, sha):
+        blob = Blob.objects.create(sha256=sha, file=f"blobs/{sha[:2]}/{sha}.docx", size=1)
+        Blob.objects.filter(id=blob.id).update(updated_at=timezone.now() - timedelta(days=1))
+        return blob
+
+    def test_conversion_cache_blobs_are_not_candidates(self):
+        source = self._blob("a" * 64)
+        result = self._blob("b" * 64)
+        DocumentConversion.objects.create(source=source, result=result, status="DONE")
+
+        # Only the cache expiry and candidate queries run: no blob DELETE is
+        # attempted and refused.
+        with self.assertNumQueries(2):
+            self.assertEqual(collect_unreferenced_blobs(), 0)
+        self.assertEqual(Blob.objects.count(), 2)
+
+    def test_blob_released_by_delete_is_removed_by_scheduled_run(self):
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        self.enterContext(self.settings(MEDIA_ROOT=media.name))
+        name = default_storage.save("blobs/dd/report.pdf", ContentFile(b"%PDF"))
+        blob = Blob.objects.create(sha256="d" * 64, file=name, size=4)
+        owner = User.objects.create_user("alice@thestackly.com", "pw")
+        drive_file = DriveFile.objects.create(owner=owner, original_name="report.pdf", file=name, blob=blob)
+        blob.refresh_from_db()
+        self.assertEqual(blob.ref_count, 1)
+
+        drive_file.delete()
+        self.assertEqual(run_scheduled("collect-unreferenced-blobs", timezone.now()), 0)
+        self.assertEqual(run_scheduled("collect-unreferenced-blobs", timezone.now() + timedelta(hours=2)), 1)
+        self.assertFalse(Blob.objects.filter(id=blob.id).exists())
+        self.assertFalse(default_storage.exists(name))
+
+    def test_unused_conversion_expires_with_its_blobs(self):
+        source = self._blob("a" * 64)
+        result = self._blob("b" * 64)
+        DocumentConversion.objects.create(
+            source=source, result=result, status="DONE", last_used_at=timezone.now() - timedelta(days=31)
+        )
+
+        self.assertEqual(collect_unreferenced_blobs(), 2)
+        self.assertFalse(DocumentConversion.objects.exists())
+        self.assertFalse(Blob.objects.exists())
+
+    def test_conversion_whose_pdf_is_attached_is_kept(self):
+        source = self._blob("a" * 64)
+        result = self._blob("b" * 64)
+        Blob.objects.filter(id=result.id).update(ref_count=1)
+        DocumentConversion.objects.create(
+            source=source, result=result, status="DONE", last_used_at=timezone.now() - timedelta(days=31)
+        )
+
+        self.assertEqual(collect_unreferenced_blobs(), 0)
+        self.assertTrue(DocumentConversion.objects.exists())
+
+    def test_attaching_converted_document_is_retried(self):
+        with mock.patch("fastapi_app.tasks._attach_converted_document", side_effect=[OSError("storage down"), 7]) as attach:
+            with self.assertLogs("fastapi_app.tasks", "ERROR"):
+                self.assertEqual(attach_converted_document.apply(args=(1, 2, "a.docx")).get(), 7)
+        self.assertEqual(attach.call_count, 2)
+
+    def test_unreferenced_blob_is_removed(self):
+        self._blob("c" * 64)
+        self.assertEqual(collect_unreferenced_blobs(), 1)
+        self.assertFalse(Blob.objects.exists())
+
+
+class FakePubSub:
+    def __init__(self):
+        self.channels = set()
+        self.closed = False
+        self.inbox = asyncio.Queue()
+
+    async def subscribe(self, *channels):
+        await asyncio.sleep(0)
+        self.channels.update(channels)
+
+    async def unsubscribe(self, *channels):
+        await asyncio.sleep(0)
+        self.channels.difference_update(channels)
+
+    async def aclose(self):
+        self.closed = True
+
+    async def listen(self):
+        while True:
+            item = await self.inbox.get()
+            if isinstance(item, Exception):
+                raise item
+            yield item
+
+
+class FakeRedis:
+    def __init__(self):
+        self.pubsubs = []
+
+    def pubsub(self):
+        self.pubsubs.append(FakePubSub())
+        return self.pubsubs[-1]
+
+    async def publish(self, channel, data):
+        for pubsub in self.pubsubs:
+            if not pubsub.closed and channel in pubsub.channels:
+                pubsub.inbox.put_nowait({"type": "message", "channel": channel.encode(), "data": data})
+
+
+class RedisBroadcastBackendTests(SimpleTestCase):
+    def setUp(self):
+        self.redis = FakeRedis()
+        self.backend = broadcast.RedisBroadcastBackend(flush_interval=0, client=self.redis)
+        self.received = []
+        self.backend.on_batch = lambda channel, messages: self.received.append((channel, messages))
+
+    async def _settle(self):
+        for _ in range(10):
+            await asyncio.sleep(0)
+
+    def test_backend_without_send_cannot_be_instantiated(self):
+        class Incomplete(broadcast.BroadcastBackend):
+            pass
+
+        with self.assertRaises(TypeError):
+            Incomplete(flush_interval=0)
+
+    async def test_interleaved_join_and_leave_leave_no_stale_subscription(self):
+        channel = broadcast.room_channel(1)
+        await self.backend.subscribe(channel)  # before start: applied by start()
+        await self.backend.start()
+        self.assertIn(channel, self.redis.pubsubs[-1].channels)
+
+        await asyncio.gather(self.backend.unsubscribe(channel), self.backend.subscribe(broadcast.room_channel(2)))
+        await asyncio.gather(self.backend.subscribe(channel), self.backend.unsubscribe(channel))
+        self.assertNotIn(channel, self.redis.pubsubs[-1].channels)
+        self.assertIn(broadcast.room_channel(2), self.redis.pubsubs[-1].channels)
+        await self.backend.stop()
+
+    async def test_listener_reconnects_and_resubscribes(self):
+        channel = broadcast.room_channel(1)
+        with mock.patch.object(broadcast, "RECONNECT_MIN_DELAY", 0):
+            await self.backend.start()
+            await self.backend.subscribe(channel)
+            first = self.redis.pubsubs[-1]
+
+            with self.assertLogs(broadcast.logger, "WARNING"):
+                first.inbox.put_nowait(ConnectionError("connection reset"))
+                await self._settle()
+
+            second = self.redis.pubsubs[-1]
+            self.assertIsNot(first, second)
+            self.assertTrue(first.closed)
+            self.assertLessEqual({channel, broadcast.USERS_CHANNEL, broadcast.ALL_CHANNEL}, second.channels)
+
+            await self.redis.publish(channel, json.dumps([{"text": "hi"}]))
+            await self._settle()
+            self.assertEqual(self.received, [(channel, [{"text": "hi"}])])
+            await self.backend.stop()
+
+
+class IncompleteSearchBackend(SearchBackend):
+    pass
+
+
+class SearchBackendTests(SimpleTestCase):
+    def setUp(self):
+        get_search_backend.cache_clear()
+        self.addCleanup(get_search_backend.cache_clear)
+
+    def test_incomplete_configured_backend_fails_on_load(self):
+        with self.settings(EMAIL_SEARCH_BACKEND=f"{__name__}.IncompleteSearchBackend"):
+            with self.assertRaises(TypeError):
+                get_search_backend()
+
+
+class TaskListTests(TestCase):
+    def setUp(self):
+        self.alice = User.objects.create_user("alice@thestackly.com", "pw")
+        bob = User.objects.create_user("bob@thestackly.com", "pw")
+        base = timezone.now().replace(microsecond=0)
+        due_dates = [None, base + timedelta(days=1), base + timedelta(days=1), base + timedelta(days=2)]
+        for i in range(15):
+            task = Task.objects.create(
+                title=f"t{i}",
+                created_by=self.alice if i % 3 else bob,
+                assigned_to=self.alice if i % 3 == 0 and i % 2 == 0 else None,
+                priority=("high", "medium", "low")[i % 3],
+                due_date=due_dates[i % 4],
+            )
+            # Only three distinct creation times, so every sort has ties.
+            Task.objects.filter(id=task.id).update(created_at=base - timedelta(hours=i % 3))
+
+    def _expected(self, sort):
+        tasks = list(Task.objects.filter(Q(created_by=self.alice) | Q(assigned_to=self.alice)))
+
+        def due_key(t):
+            return (t.due_date is None, t.due_date or t.created_at)
+
+        keys = {
+            "created": lambda t: (-t.created_at.timestamp(), -t.id),
+            "due_date": lambda t: (*due_key(t), t.id),
+            "priority": lambda t: (PRIORITY_RANK[t.priority], *due_key(t), t.id),
+        }
+        return [t.id for t in sorted(tasks, key=keys[sort])]
+
+    def test_cursor_walk_visits_every_task_once_in_order(self):
+        for sort in SORTS:
+            with self.subTest(sort=sort):
+                seen, cursor = [], None
+                while True:
+                    page = list_tasks(self.alice, sort=sort, cursor=cursor, limit=4)
+                    seen += [task.id for task in page["results"]]
+                    cursor = page["next_cursor"]
+                    if cursor is None:
+                        break
+                self.assertEqual(seen, self._expected(sort))
+
+
+class TaskActivityTests(TestCase):
+    def setUp(self):
+        self.alice = User.objects.create_user("alice@thestackly.com", "pw")
+        self.project = Project.objects.create(name="Launch", owner=self.alice)
+        self.task = Task.objects.create(title="Ship", created_by=self.alice, project=self.project)
+
+    def _log(self, count, start=0):
+        log = ActivityBuffer(self.alice)
+        for i in range(start, start + count):
+            log.change(self.task, "status_change", "status", f"s{i}", f"s{i + 1}")
+        log.flush()
+
+    def test_buffer_writes_one_insert(self):
+        with self.assertNumQueries(1):
+            self._log(5)
+        entry = TaskActivity.objects.order_by("id").first()
+        self.assertEqual((entry.project_id, entry.field, entry.old_value, entry.new_value),
+                         (self.project.id, "status", "s0", "s1"))
+
+    def test_cursor_walk_is_continuous_while_entries_are_added(self):
+        self._log(10)
+        # Two timestamps only, so the id tie-breaker decides most of the order.
+        first = TaskActivity.objects.order_by("id").first().created_at
+        TaskActivity.objects.filter(id__in=TaskActivity.objects.order_by("id").values("id")[:6]).update(created_at=first)
+        expected = list(TaskActivity.objects.order_by("-created_at", "-id").values_list("id", flat=True))
+
+        feed = TaskActivity.objects.filter(project=self.project)
+        seen, cursor = [], None
+        while True:
+            page = activity_page(feed, cursor=cursor, limit=3)
+            seen += [entry.id for entry in page["results"]]
+            cursor = page["next_cursor"]
+            if cursor is None:
+                break
+            # Newer entries land ahead of the cursor and do not shift it.
+            self._log(1, start=100 + len(seen))
+
+        self.assertEqual(seen, expected)
+
+
+class TaskBulkTests(TestCase):
+    def setUp(self):
+        self.alice = User.objects.create_user("alice@thestackly.com", "pw")
+        self.bob = User.objects.create_user("bob@thestackly.com", "pw")
+        self.carol = User.objects.create_user("carol@thestackly.com", "pw")
+        self.own = Task.objects.create(title="own", created_by=self.alice)
+        self.assigned = Task.objects.create(title="assigned", created_by=self.bob, assigned_to=self.alice)
+        self.hidden = Task.objects.create(title="hidden", created_by=self.bob)
+
+    def test_update_applies_to_visible_tasks_only(self):
+        ids = [self.own.id, self.hidden.id, self.assigned.id, self.own.id]
+        results = bulk_update_tasks(self.alice, ids, status="done", assigned_to_email=self.carol.email, add_tags=["q3"])
+
+        self.assertEqual([r["task_id"] for r in results], ids)
+        self.assertEqual([r["ok"] for r in results], [True, False, True, True])
+        self.assertEqual(results[0]["changed"], ["status", "assigned_to", "tags"])
+        self.assertEqual(results[0], results[3])
+
+        self.hidden.refresh_from_db()
+        self.assertEqual((self.hidden.status, self.hidden.assigned_to_id), ("todo", None))
+        for task in (self.own, self.assigned):
+            task.refresh_from_db()
+            self.assertEqual((task.status, task.assigned_to_id), ("done", self.carol.id))
+            self.assertEqual(list(task.tags.values_list("name", flat=True)), ["q3"])
+            self.assertEqual(
+                sorted(TaskActivity.objects.filter(task=task).values_list("action_type", flat=True)),
+                ["assignment", "status_change", "tag_added"],
+            )
+        self.assertFalse(TaskActivity.objects.filter(task=self.hidden).exists())
+        self.assertEqual(
+            sorted(Notification.objects.filter(recipient=self.carol).values_list("object_id", flat=True)),
+            [self.own.id, self.assigned.id],
+        )
+
+    def test_tag_only_change_bumps_updated_at(self):
+        old = timezone.now() - timedelta(days=1)
+        Task.objects.filter(id=self.own.id).update(updated_at=old)
+
+        results = bulk_update_tasks(self.alice, [self.own.id], add_tags=["q3"])
+
+        self.assertEqual(results[0]["changed"], ["tags"])
+        self.own.refresh_from_db()
+        self.assertGreater(self.own.updated_at, old)
+
+    def test_create_fails_items_with_invalid_priority(self):
+        results = bulk_create_tasks(self.alice, [
+            TaskCreate(title="a", priority="urgent"),
+            TaskCreate(title="b", priority="high"),
+        ])
+
+        self.assertEqual([(r["ok"], r["error"]) for r in results], [(False, "Invalid priority"), (True, None)])
+        created = Task.objects.filter(created_by=self.alice, title__in=["a", "b"])
+        self.assertEqual(list(created.values_list("title", flat=True)), ["b"])
+
+
+class FreeBusyRequestTests(SimpleTestCase):
+    def test_max_slots_must_be_in_range(self):
+        window = {"user_ids": [1], "start": timezone.now(), "end": timezone.now() + timedelta(days=1)}
+        self.assertEqual(FreeBusyRequest(**window, max_slots=0).max_slots, 0)
+        for max_slots in (-1, 10_000):
+            with self.subTest(max_slots=max_slots), self.assertRaises(ValidationError):
+                FreeBusyRequest(**window, max_slots=max_slots)
+
+
+class ChatFanOutTests(TestCase):
+    def setUp(self):
+        self.alice = User.objects.create_user("alice@thestackly.com", "pw")
+        self.bob = User.objects.create_user("bob@thestackly.com", "pw")
+        self.carol = User.objects.create_user("carol@thestackly.com", "pw")
+        self.room = ChatRoom.objects.create(name="Team", is_group=True)
+        self.room.participants.add(self.alice, self.bob, self.carol)
+
+    def _digest(self, user):
+        return Notification.objects.get(recipient=user, notification_type="chat", is_read=False, object_id=self.room.id)
+
+    def test_repeat_messages_bump_one_digest(self):
+        fan_out_chat_notification(self.room.id, self.alice.id, "hi")
+        fan_out_chat_notification(self.room.id, self.alice.id, "there")
+
+        digest = self._digest(self.bob)
+        self.assertEqual((digest.count, digest.message), (2, "2 new messages in Team"))
+
+    def test_digest_created_concurrently_is_bumped_not_dropped(self):
+        fan_out_chat_notification(self.room.id, self.alice.id, "hi")
+        Notification.objects.filter(recipient=self.carol).delete()
+        select_for_update = QuerySet.select_for_update
+
+        def miss_bob_once(queryset, *args, **kwargs):
+            # The first pass reads before another fan-out commits bob's
+            # digest, so its INSERT for bob conflicts.
+            if not getattr(miss_bob_once, "raced", False):
+                miss_bob_once.raced = True
+                queryset = queryset.exclude(recipient=self.bob)
+            return select_for_update(queryset, *args, **kwargs)
+
+        with mock.patch.object(QuerySet, "select_for_update", miss_bob_once):
+            fan_out_chat_notification(self.room.id, self.alice.id, "there")
+
+        self.assertEqual(self._digest(self.bob).count, 2)
+        self.assertEqual(self._digest(self.carol).count, 1)
+
+
+class MediaFilesTests(SimpleTestCase):
+    def setUp(self):
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        self.sha = "e" * 64
+        os.makedirs(os.path.join(media.name, "blobs", "ee"))
+        with open(os.path.join(media.name, "blobs", "ee", f"{self.sha}.pdf"), "wb") as fh:
+            fh.write(b"%PDF")
+        with open(os.path.join(media.name, "avatar.png"), "wb") as fh:
+            fh.write(b"png")
+        app = Starlette(routes=[Mount("/media", MediaFiles(directory=media.name))])
+        self.client = TestClient(app)
+
+    def test_blob_is_immutable_but_private(self):
+        response = self.client.get(f"/media/blobs/ee/{self.sha}.pdf")
+        self.assertEqual(response.headers["etag"], f'"{self.sha}"')
+        self.assertEqual(
+            response.headers["cache-control"], f"private, max-age={settings.MEDIA_BLOB_MAX_AGE}, immutable"
+        )
+        self.assertEqual(self.client.get(response.url, headers={"if-none-match": f'"{self.sha}"'}).status_code, 304)
+
+    def test_other_files_are_revalidated(self):
+        self.assertEqual(self.client.get("/media/avatar.png").headers["cache-control"], "no-cache")
@@ -134,6 +134,24 @@ CELERY_TASK_SERIALIZER = 'json'
 CELERY_RESULT_SERIALIZER = 'json'
 CELERY_TIMEZONE = 'UTC'
 
+# Periodic jobs, run by `celery -A email_project beat`.
+CELERY_BEAT_SCHEDULE = {
+    "fire-due-reminders": {
+        "task": "fastapi_app.tasks.fire_due_reminders",
+        "schedule": 30.0,
+    },
+    "collect-unreferenced-blobs": {
+        "task": "fastapi_app.tasks.collect_unreferenced_blobs",
+        "schedule": 3600.0,
+        "kwargs": {"grace_minutes": 60},
+    },
+    "purge-stale-upload-sessions": {
+        "task": "fastapi_app.tasks.purge_stale_upload_sessions",
+        "schedule": 3600.0,
+        "kwargs": {"max_age_hours": 24},
+    },
+}
+
 # --- Email Configuration (Gmail) ---
 EMAIL_BACKEND = 'django.core.mail.backends.smtp.EmailBackend'
 EMAIL_HOST = 'smtp.gmail.com'
@@ -0,0 +1,55 @@
+from typing import Iterable, List
+
+from django.contrib.auth import get_user_model
+from django_backend.models import EventAttendee
+
+User = get_user_model()
+
+ATTENDEE_BATCH_SIZE = 500
+
+
+def existing_user_ids(user_ids: Iterable[int]) -> List[int]:
+    """
+    The ids among `user_ids` that belong to real users, in the order given
+    and without duplicates. One query.
+    """
+    wanted = list(dict.fromkeys(user_ids))
+    if not wanted:
+        return []
+    found = set(User.objects.filter(id__in=wanted).values_list("id", flat=True))
+    return [uid for uid in wanted if uid in found]
+
+
+def invite_attendees(event, user_ids: Iterable[int], status: str = "pending") -> List[int]:
+    """
+    Invites users to an event and returns the ids that were newly added.
+    Unknown ids and users who are already attendees are skipped, so it is
+    safe to call with overlapping lists. A few queries however many users.
+    """
+    candidates = existing_user_ids(user_ids)
+    if not candidates:
+        return []
+    already = set(
+        EventAttendee.objects.filter(event=event, user_id__in=candidates).values_list("user_id", flat=True)
+    )
+    added = [uid for uid in candidates if uid not in already]
+    # ignore_conflicts covers a concurrent request adding the same user
+    # between the read above and this insert (unique on event, user).
+    EventAttendee.objects.bulk_create(
+        [EventAttendee(event=event, user_id=uid, status=status) for uid in added],
+        batch_size=ATTENDEE_BATCH_SIZE,
+        ignore_conflicts=True,
+    )
+    return added
+
+
+def add_room_members(room, user_ids: Iterable[int]) -> List[int]:
+    """
+    Adds users to a chat room's participants and returns the ids that were
+    valid. Django skips existing members and inserts the rest in one
+    statement.
+    """
+    ids = existing_user_ids(user_ids)
+    if ids:
+        room.participants.add(*ids)
+    return ids
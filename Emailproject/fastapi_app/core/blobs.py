@@ -0,0 +1,68 @@
+import hashlib
+import os
+
+from django.core.files import File
+from django.core.files.storage import default_storage
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from django_backend.models import Blob
+from fastapi_app.core.config import settings
+
+
+def hash_file(fileobj):
+    """
+    Returns (size, sha256) of a seekable file, read in UPLOAD_CHUNK_SIZE
+    pieces. The file is rewound afterwards.
+    """
+    digest = hashlib.sha256()
+    size = 0
+    fileobj.seek(0)
+    while True:
+        chunk = fileobj.read(settings.UPLOAD_CHUNK_SIZE)
+        if not chunk:
+            break
+        digest.update(chunk)
+        size += len(chunk)
+    fileobj.seek(0)
+    return size, digest.hexdigest()
+
+
+def blob_path(sha256: str, name: str) -> str:
+    """
+    Storage path for a blob. The extension of the first upload is kept so
+    the file is served with a sensible content type.
+    """
+    ext = os.path.splitext(name or "")[1].lower()
+    if len(ext) > 10 or not ext[1:].isalnum():
+        ext = ""
+    return f"blobs/{sha256[:2]}/{sha256}{ext}"
+
+
+def store_blob(fileobj, name: str) -> Blob:
+    """
+    Returns the Blob holding the contents of `fileobj`, writing it to
+    storage only if that content is not stored yet. The file is hashed in
+    one streaming pass and, when new, copied in UPLOAD_CHUNK_SIZE pieces,
+    so memory use does not depend on file size.
+
+    The blob is not referenced yet: the caller points a row at it (which
+    takes the reference, see django_backend/signals.py). Reused blobs are
+    touched so garbage collection leaves them alone in the meantime.
+    """
+    size, digest = hash_file(fileobj)
+
+    blob = Blob.objects.filter(sha256=digest).first()
+    if blob is not None:
+        Blob.objects.filter(pk=blob.pk).update(updated_at=timezone.now())
+        return blob
+
+    content = File(fileobj, name=name)
+    content.DEFAULT_CHUNK_SIZE = settings.UPLOAD_CHUNK_SIZE
+    stored_name = default_storage.save(blob_path(digest, name), content)
+    try:
+        with transaction.atomic():
+            return Blob.objects.create(sha256=digest, file=stored_name, size=size)
+    except IntegrityError:
+        # The same content was stored concurrently; keep the other copy.
+        default_storage.delete(stored_name)
+        return Blob.objects.get(sha256=digest)
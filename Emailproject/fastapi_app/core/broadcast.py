@@ -0,0 +1,236 @@
+import abc
+import asyncio
+import json
+import logging
+from typing import Callable, Dict, Hashable, List, Optional, Set
+
+import redis.asyncio as redis
+
+from fastapi_app.core.config import settings
+
+ROOM_CHANNEL_PREFIX = "chat:room:"
+USERS_CHANNEL = "chat:users"
+ALL_CHANNEL = "chat:all"
+
+# Backoff between attempts to get the Redis listener back after the
+# connection drops.
+RECONNECT_MIN_DELAY = 0.5
+RECONNECT_MAX_DELAY = 30.0
+
+logger = logging.getLogger(__name__)
+
+
+def room_channel(room_id: int) -> str:
+    return f"{ROOM_CHANNEL_PREFIX}{room_id}"
+
+
+class BroadcastBackend(abc.ABC):
+    """
+    Carries chat events between every process that holds WebSockets.
+
+    publish() never blocks: events are buffered per channel and flushed
+    together every `flush_interval` seconds, one transport message per
+    channel. Events published with the same `coalesce_key` inside one
+    window replace each other (e.g. a burst of typing notifications), so
+    only the latest is sent.
+
+    Received batches are handed to `on_batch(channel, messages)`.
+    Subclasses provide the transport: start/stop, subscribe/unsubscribe
+    and _send.
+    """
+
+    def __init__(self, flush_interval: Optional[float] = None):
+        self.flush_interval = settings.BROADCAST_FLUSH_INTERVAL if flush_interval is None else flush_interval
+        self.on_batch: Optional[Callable[[str, List[dict]], None]] = None
+        self._pending: Dict[str, List[dict]] = {}
+        self._slots: Dict[str, Dict[Hashable, int]] = {}
+        self._flush_task: Optional[asyncio.Task] = None
+
+    async def start(self):
+        pass
+
+    async def stop(self):
+        if self._flush_task is not None:
+            self._flush_task.cancel()
+            self._flush_task = None
+        await self.flush()
+
+    async def subscribe(self, channel: str):
+        pass
+
+    async def unsubscribe(self, channel: str):
+        pass
+
+    def publish(self, channel: str, message: dict, coalesce_key: Optional[Hashable] = None):
+        batch = self._pending.setdefault(channel, [])
+        if coalesce_key is not None:
+            slots = self._slots.setdefault(channel, {})
+            if coalesce_key in slots:
+                batch[slots[coalesce_key]] = message
+                return
+            slots[coalesce_key] = len(batch)
+        batch.append(message)
+
+        if self._flush_task is None:
+            self._flush_task = asyncio.create_task(self._flush_later())
+
+    async def _flush_later(self):
+        await asyncio.sleep(self.flush_interval)
+        self._flush_task = None
+        await self.flush()
+
+    async def flush(self):
+        pending, self._pending, self._slots = self._pending, {}, {}
+        for channel, messages in pending.items():
+            try:
+                await self._send(channel, messages)
+            except Exception:
+                logger.exception("Broadcast to %s failed", channel)
+
+    @abc.abstractmethod
+    async def _send(self, channel: str, messages: List[dict]):
+        ...
+
+
+class MemoryBroadcastBackend(BroadcastBackend):
+    """
+    Single-process backend: batches are delivered straight back to this
+    process. The default when no Redis is configured.
+    """
+
+    async def _send(self, channel, messages):
+        if self.on_batch is not None:
+            self.on_batch(channel, messages)
+
+
+class RedisBroadcastBackend(BroadcastBackend):
+    """
+    Redis pub/sub backend for running several uvicorn workers.
+
+    Each batch is one PUBLISH of a JSON list. A process only subscribes to
+    the room channels it has sockets for, plus the user and all-sockets
+    channels, and receives its own publishes through Redis like everyone
+    else.
+
+    subscribe/unsubscribe record the wanted channel set and return once
+    Redis matches it, so a room's first socket only starts once its
+    SUBSCRIBE has landed. Changes are applied under one lock by diffing
+    against what is actually subscribed, so calls that interleave can
+    never leave a stale subscription behind. If the connection drops, the
+    listener reconnects with backoff and subscribes the current set again.
+    """
+
+    FIXED_CHANNELS = (USERS_CHANNEL, ALL_CHANNEL)
+
+    def __init__(self, url: Optional[str] = None, flush_interval: Optional[float] = None, client=None):
+        super().__init__(flush_interval)
+        self._redis = client or redis.from_url(url or settings.REDIS_URL)
+        self._pubsub = None
+        self._listener: Optional[asyncio.Task] = None
+        self._lock = asyncio.Lock()
+        self._wanted: Set[str] = set()
+        self._subscribed: Set[str] = set()
+
+    async def start(self):
+        await self._connect()
+        self._listener = asyncio.create_task(self._listen())
+
+    async def stop(self):
+        await super().stop()
+        if self._listener is not None:
+            self._listener.cancel()
+            self._listener = None
+        async with self._lock:
+            await self._close_pubsub()
+
+    async def subscribe(self, channel):
+        self._wanted.add(channel)
+        await self._sync()
+
+    async def unsubscribe(self, channel):
+        self._wanted.discard(channel)
+        await self._sync()
+
+    async def _sync(self):
+        async with self._lock:
+            if self._pubsub is None:
+                # Not started, or reconnecting: _connect subscribes the
+                # whole set.
+                return
+            wanted = set(self._wanted)
+            added = wanted - self._subscribed
+            removed = self._subscribed - wanted
+            try:
+                if added:
+                    await self._pubsub.subscribe(*added)
+                if removed:
+                    await self._pubsub.unsubscribe(*removed)
+            except Exception as e:
+                # Dropping the connection hands recovery to the listener,
+                # which reconnects with the wanted set.
+                logger.warning("Updating broadcast subscriptions failed (%s); reconnecting", e)
+                await self._close_pubsub()
+                return
+            self._subscribed = wanted
+
+    async def _connect(self):
+        async with self._lock:
+            await self._close_pubsub()
+            pubsub = self._redis.pubsub()
+            wanted = set(self._wanted)
+            await pubsub.subscribe(*self.FIXED_CHANNELS, *wanted)
+            self._pubsub = pubsub
+            self._subscribed = wanted
+
+    async def _close_pubsub(self):
+        pubsub, self._pubsub = self._pubsub, None
+        self._subscribed = set()
+        if pubsub is not None:
+            try:
+                await pubsub.aclose()
+            except Exception:
+                pass
+
+    async def _send(self, channel, messages):
+        await self._redis.publish(channel, json.dumps(messages, default=str))
+
+    async def _listen(self):
+        delay = RECONNECT_MIN_DELAY
+        while True:
+            try:
+                if self._pubsub is None:
+                    await self._connect()
+                    logger.info("Broadcast listener reconnected to Redis")
+                async for message in self._pubsub.listen():
+                    delay = RECONNECT_MIN_DELAY
+                    self._dispatch(message)
+                raise ConnectionError("pub/sub stream ended")
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning("Broadcast listener lost Redis (%s); retrying in %.1fs", e, delay)
+                async with self._lock:
+                    await self._close_pubsub()
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, RECONNECT_MAX_DELAY)
+
+    def _dispatch(self, message):
+        if message["type"] != "message":
+            return
+        channel = message["channel"]
+        if isinstance(channel, bytes):
+            channel = channel.decode()
+        try:
+            self.on_batch(channel, json.loads(message["data"]))
+        except Exception:
+            logger.exception("Error delivering broadcast from %s", channel)
+
+
+def get_broadcast_backend() -> BroadcastBackend:
+    """
+    settings.BROADCAST_BACKEND selects the transport: "memory" (default)
+    or "redis" (uses settings.REDIS_URL).
+    """
+    if settings.BROADCAST_BACKEND == "redis":
+        return RedisBroadcastBackend()
+    return MemoryBroadcastBackend()
@@ -0,0 +1,91 @@
+from datetime import date, datetime, time, timedelta, timezone as dt_timezone
+from typing import List
+
+from django.db.models import Exists, OuterRef, Q
+from django_backend.models import Event, EventAttendee
+from fastapi_app.core.recurrence import occurrences_in_range
+
+
+def visible_to(user) -> Q:
+    """
+    Events a user may see on their calendar: ones they created or are
+    invited to.
+    """
+    invited = EventAttendee.objects.filter(event=OuterRef("pk"), user=user)
+    return Q(created_by=user) | Q(Exists(invited))
+
+
+def overlapping(start: datetime, end: datetime, prefix: str = "") -> Q:
+    """
+    Events that intersect the half-open range [start, end). `prefix`
+    (e.g. "event__") applies the filter through a relation.
+
+    Written so the database can walk event_start_idx over
+    [start - LONG_EVENT_SPAN, end) plus the small event_long_start_idx,
+    instead of every event that started before `end`.
+    """
+    lookback = start - Event.LONG_EVENT_SPAN
+    starts, ends, is_long = f"{prefix}start_datetime", f"{prefix}end_datetime", f"{prefix}is_long"
+    return (
+        (
+            Q(**{f"{starts}__gte": lookback, f"{starts}__lt": end})
+            | Q(**{is_long: True, f"{starts}__lt": end})
+        )
+        # Zero-length events at `start` count as inside the range.
+        & (Q(**{f"{ends}__gt": start}) | Q(**{f"{starts}__gte": start}))
+    )
+
+
+def recurring_overlapping(start: datetime, end: datetime) -> Q:
+    """
+    Recurring series that may have an occurrence in [start, end): started
+    before `end` and not finished before `start`.
+    """
+    return (
+        Q(is_recurring=True, start_datetime__lt=end)
+        & (Q(recurrence_end__isnull=True) | Q(recurrence_end__gt=start))
+    )
+
+
+def events_in_range(user, start: datetime, end: datetime) -> List[Event]:
+    """
+    Every event visible to `user` that overlaps [start, end), ordered by
+    start time. Recurring events appear once per occurrence in the range.
+
+    One query for one-off events and one for recurring series, which are
+    expanded for this window only (see fastapi_app/core/recurrence.py).
+    """
+    visible = visible_to(user)
+    single = list(
+        Event.objects.filter(overlapping(start, end), is_recurring=False)
+        .filter(visible)
+        .order_by("start_datetime", "id")
+    )
+    series = Event.objects.filter(recurring_overlapping(start, end)).filter(visible)
+    occurrences = occurrences_in_range(series, start, end)
+    if not occurrences:
+        return single
+    return sorted(single + occurrences, key=lambda e: (e.start_datetime, e.id))
+
+
+def _utc_midnight(d: date) -> datetime:
+    return datetime.combine(d, time.min, tzinfo=dt_timezone.utc)
+
+
+def day_range(d: date):
+    start = _utc_midnight(d)
+    return start, start + timedelta(days=1)
+
+
+def week_range(d: date):
+    """
+    The Monday-to-Sunday week containing `d`.
+    """
+    start = _utc_midnight(d - timedelta(days=d.weekday()))
+    return start, start + timedelta(days=7)
+
+
+def month_range(year: int, month: int):
+    start = date(year, month, 1)
+    next_month = date(year + 1, 1, 1) if month == 12 else date(year, month + 1, 1)
+    return _utc_midnight(start), _utc_midnight(next_month)
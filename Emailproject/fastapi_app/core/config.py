@@ -1,4 +1,5 @@
 import os
+import tempfile
 from pathlib import Path
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
@@ -15,6 +16,36 @@ class Settings(BaseSettings):
     TWILIO_AUTH_TOKEN: str
     TWILIO_PHONE_NUMBER: str
 
+    # Outgoing WebSocket messages buffered per connection before it is
+    # treated as a slow consumer and disconnected.
+    WS_SEND_QUEUE_SIZE: int = 256
+    WS_SEND_TIMEOUT: float = 5.0
+
+    # "memory" for a single process, "redis" to fan chat events out across
+    # uvicorn workers (see fastapi_app/core/broadcast.py).
+    BROADCAST_BACKEND: str = "memory"
+    BROADCAST_FLUSH_INTERVAL: float = 0.01
+    REDIS_URL: str = "redis://localhost:6379/0"
+
+    # Authenticated users are cached per token subject for this many seconds
+    # (see fastapi_app/dependencies/auth.py).
+    AUTH_CACHE_TTL: float = 30.0
+    AUTH_CACHE_SIZE: int = 10000
+
+    # Partial files of resumable Drive uploads. Kept outside MEDIA_ROOT so
+    # unfinished uploads are never served.
+    UPLOAD_TEMP_DIR: str = os.path.join(tempfile.gettempdir(), "drive_uploads")
+    UPLOAD_CHUNK_SIZE: int = 1024 * 1024
+
+    # /media responses (see fastapi_app/core/media.py). Blobs never change,
+    # so browsers may cache them for MEDIA_BLOB_MAX_AGE seconds.
+    MEDIA_CHUNK_SIZE: int = 1024 * 1024
+    MEDIA_BLOB_MAX_AGE: int = 365 * 24 * 3600
+
+    # Expanded windows of recurring events kept in memory per process
+    # (see fastapi_app/core/recurrence.py).
+    RECURRENCE_CACHE_SIZE: int = 20000
+
     model_config = SettingsConfigDict(
         env_file=os.path.join(BASE_DIR, ".env"),
         env_ignore_empty=True,
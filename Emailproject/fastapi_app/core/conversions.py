@@ -0,0 +1,36 @@
+import tempfile
+from pathlib import Path
+
+from django_backend.models import Attachment
+from fastapi_app.core.blobs import store_blob
+from fastapi_app.utils.file_convert import docx_to_pdf
+
+CONVERTIBLE_EXTENSIONS = (".doc", ".docx")
+
+
+def needs_conversion(file_name: str) -> bool:
+    return Path(file_name).suffix.lower() in CONVERTIBLE_EXTENSIONS
+
+
+def pdf_name(file_name: str) -> str:
+    return Path(file_name).with_suffix(".pdf").name
+
+
+def convert_to_pdf(source, file_name: str):
+    """
+    Converts a Word document blob to PDF and returns the PDF's blob. The
+    output goes to an anonymous temporary file, so concurrent conversions
+    never collide.
+    """
+    with source.file.open("rb") as src, tempfile.TemporaryFile() as out:
+        docx_to_pdf(src, out)
+        return store_blob(out, pdf_name(file_name))
+
+
+def attach_blob(email_id: int, blob, file_name: str) -> Attachment:
+    return Attachment.objects.create(
+        email_id=email_id,
+        file=blob.file.name,
+        file_name=file_name,
+        blob=blob
+    )
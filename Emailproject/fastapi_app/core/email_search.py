@@ -0,0 +1,132 @@
+import abc
+import re
+from functools import lru_cache
+from typing import Iterable, List, Optional, Tuple
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import Q
+from django.utils.module_loading import import_string
+
+FTS_TABLE = "django_backend_email_fts"
+MAX_TERMS = 8
+
+
+def party_token(role: str, user_id: int) -> str:
+    """
+    Tokens written to the index's `parties` column: 's<id>' for the sender,
+    'r<id>' for the receiver. Must match the triggers in migration 0005.
+    """
+    return f"{'s' if role == 'sender' else 'r'}{user_id}"
+
+
+def tokenize_query(query: str):
+    return re.findall(r"\w+", query.lower())[:MAX_TERMS]
+
+
+class SearchBackend(abc.ABC):
+    """
+    Ranks the emails of a folder queryset against a free-text query.
+
+    `search` returns up to `limit` (email_id, rank) pairs ordered by rank
+    ascending (best first) and then id descending. `after` is the
+    (rank, id) of the last row of the previous page.
+    """
+
+    @abc.abstractmethod
+    def search(
+        self,
+        qs,
+        query: str,
+        user,
+        roles: Iterable[str],
+        limit: int,
+        after: Optional[Tuple[float, int]] = None,
+    ) -> List[Tuple[int, float]]:
+        ...
+
+
+class SQLiteFTSSearchBackend(SearchBackend):
+    """
+    Uses the FTS5 index maintained by triggers on django_backend_email.
+
+    The user's own party token is ANDed into the MATCH expression so the
+    full-text lookup only walks the posting lists of their mailbox, and
+    every term is prefix-matched against the subject and body columns.
+    Ranking is the table's configured bm25 `rank`, computed once per match
+    inside the same query.
+    """
+
+    def match_expression(self, query: str, user, roles: Iterable[str]):
+        terms = tokenize_query(query)
+        if not terms:
+            return None
+        parties = " OR ".join(party_token(role, user.id) for role in roles)
+        text = " AND ".join(f'"{term}"*' for term in terms)
+        return f"parties : ({parties}) AND {{subject body}} : ({text})"
+
+    def search(self, qs, query, user, roles, limit, after=None):
+        expression = self.match_expression(query, user, roles)
+        if expression is None:
+            return []
+
+        # The unary "+" keeps SQLite from pushing the IN list down into
+        # FTS5, which would re-run the MATCH once per folder row.
+        folder_sql, folder_params = qs.values("id").query.sql_with_params()
+        sql = (
+            f"SELECT rowid, rank FROM {FTS_TABLE} "
+            f"WHERE {FTS_TABLE} MATCH %s AND +rowid IN ({folder_sql})"
+        )
+        params = [expression, *folder_params]
+        if after is not None:
+            sql += " AND (rank > %s OR (rank = %s AND +rowid < %s))"
+            params += [after[0], after[0], after[1]]
+        sql += " ORDER BY rank, rowid DESC LIMIT %s"
+        params.append(limit)
+
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params)
+            return [(row[0], row[1]) for row in cursor.fetchall()]
+
+
+class LikeSearchBackend(SearchBackend):
+    """
+    Fallback for databases without the FTS5 index: substring match on every
+    term, newest first, every row ranked 0.
+    """
+
+    def search(self, qs, query, user, roles, limit, after=None):
+        terms = tokenize_query(query)
+        if not terms:
+            return []
+        for term in terms:
+            qs = qs.filter(Q(subject__icontains=term) | Q(body__icontains=term))
+        if after is not None:
+            qs = qs.filter(id__lt=after[1])
+        ids = qs.order_by("-id").values_list("id", flat=True)[:limit]
+        return [(email_id, 0.0) for email_id in ids]
+
+
+def _fts_table_exists():
+    if connection.vendor != "sqlite":
+        return False
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = %s",
+            [FTS_TABLE],
+        )
+        return cursor.fetchone() is not None
+
+
+@lru_cache(maxsize=1)
+def get_search_backend() -> SearchBackend:
+    """
+    settings.EMAIL_SEARCH_BACKEND may name a SearchBackend subclass;
+    otherwise FTS5 is used when its index exists and LIKE otherwise.
+    """
+    backend_path = getattr(settings, "EMAIL_SEARCH_BACKEND", None)
+    if backend_path:
+        return import_string(backend_path)()
+    if _fts_table_exists():
+        return SQLiteFTSSearchBackend()
+    return LikeSearchBackend()
@@ -0,0 +1,113 @@
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Tuple
+
+from django.db.models import Exists, OuterRef, Q
+from django_backend.models import Event, EventAttendee
+from fastapi_app.core.calendar_query import overlapping, recurring_overlapping
+from fastapi_app.core.recurrence import occurrence_cache
+
+Interval = Tuple[datetime, datetime]
+
+
+def merge_intervals(intervals: Iterable[Interval]) -> List[Interval]:
+    """
+    Sorts intervals by start and merges those that overlap or touch.
+    """
+    merged: List[Interval] = []
+    for start, end in sorted(intervals):
+        if merged and start <= merged[-1][1]:
+            if end > merged[-1][1]:
+                merged[-1] = (merged[-1][0], end)
+        else:
+            merged.append((start, end))
+    return merged
+
+
+def common_free_slots(busy: Iterable[List[Interval]], start: datetime, end: datetime, min_length: timedelta) -> List[Interval]:
+    """
+    Sweep over every user's busy intervals at once: the gaps where nobody
+    is busy, at least `min_length` long, within [start, end).
+    """
+    edges = []
+    for intervals in busy:
+        for busy_start, busy_end in intervals:
+            busy_start, busy_end = max(busy_start, start), min(busy_end, end)
+            if busy_start < busy_end:
+                edges.append((busy_start, 1))
+                edges.append((busy_end, -1))
+    # Ends sort before starts at the same instant, so back-to-back
+    # meetings leave no zero-length gap between them.
+    edges.sort(key=lambda edge: (edge[0], edge[1]))
+
+    slots = []
+    depth = 0
+    free_from = start
+    for at, delta in edges:
+        if delta == 1 and depth == 0 and at - free_from >= min_length:
+            slots.append((free_from, at))
+        depth += delta
+        if depth == 0:
+            free_from = at
+    if end - free_from >= min_length:
+        slots.append((free_from, end))
+    return slots
+
+
+def busy_intervals(user_ids: List[int], start: datetime, end: datetime) -> Dict[int, List[Interval]]:
+    """
+    Merged busy intervals within [start, end) for each user: events they
+    created or are invited to and have not declined, recurring events
+    expanded. Four queries however many users are asked about.
+    """
+    wanted = set(user_ids)
+    raw: Dict[int, List[Interval]] = defaultdict(list)
+
+    created = (
+        Event.objects.filter(overlapping(start, end), is_recurring=False, created_by_id__in=wanted)
+        .values_list("created_by_id", "start_datetime", "end_datetime")
+    )
+    invited = (
+        EventAttendee.objects.filter(overlapping(start, end, prefix="event__"), event__is_recurring=False, user_id__in=wanted)
+        .exclude(status="declined")
+        .values_list("user_id", "event__start_datetime", "event__end_datetime")
+    )
+    for rows in (created, invited):
+        for user_id, event_start, event_end in rows:
+            raw[user_id].append((event_start, event_end))
+
+    attending = EventAttendee.objects.filter(event=OuterRef("pk"), user_id__in=wanted).exclude(status="declined")
+    series = list(
+        Event.objects.filter(recurring_overlapping(start, end))
+        .filter(Q(created_by_id__in=wanted) | Q(Exists(attending)))
+    )
+    if series:
+        owners = defaultdict(set)
+        for event in series:
+            if event.created_by_id in wanted:
+                owners[event.id].add(event.created_by_id)
+        rows = (
+            EventAttendee.objects.filter(event_id__in=[e.id for e in series], user_id__in=wanted)
+            .exclude(status="declined")
+            .values_list("event_id", "user_id")
+        )
+        for event_id, user_id in rows:
+            owners[event_id].add(user_id)
+
+        for event in series:
+            duration = event.end_datetime - event.start_datetime
+            for occurrence in occurrence_cache.get_or_expand(event, start, end):
+                for user_id in owners[event.id]:
+                    raw[user_id].append((occurrence, occurrence + duration))
+
+    clipped = {
+        user_id: [(max(s, start), min(e, end)) for s, e in merge_intervals(raw.get(user_id, ()))]
+        for user_id in user_ids
+    }
+    return {user_id: [(s, e) for s, e in intervals if s < e] for user_id, intervals in clipped.items()}
+
+
+def free_busy(user_ids: List[int], start: datetime, end: datetime, min_slot: timedelta, max_slots: int):
+    busy = busy_intervals(user_ids, start, end)
+    slots = common_free_slots(busy.values(), start, end, min_slot)
+    return busy, slots[:max_slots]
@@ -0,0 +1,187 @@
+import base64
+from datetime import datetime
+from typing import Optional
+
+from fastapi import HTTPException
+from django.core.files.storage import default_storage
+from django.db.models import Q
+from django.db.models.functions import Substr
+from django_backend.models import Email, Attachment
+from fastapi_app.core.email_search import get_search_backend
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+SNIPPET_LENGTH = 200
+
+HEADER_FIELDS = (
+    "id", "subject", "created_at", "sender__email", "receiver__email",
+    "is_important", "is_favorite", "is_archived", "is_read",
+)
+
+
+def folder_filter(folder: str, user) -> Q:
+    """
+    The WHERE clause for each mailbox folder, relative to the given user.
+    """
+    if folder == "inbox":
+        return Q(receiver=user, is_deleted_by_receiver=False, status='SENT', is_archived=False)
+    if folder == "sent":
+        return Q(sender=user, is_deleted_by_sender=False)
+    if folder == "archived":
+        return Q(receiver=user, is_deleted_by_receiver=False, is_archived=True)
+    if folder == "starred":
+        return (
+            Q(receiver=user, is_deleted_by_receiver=False, is_favorite=True) |
+            Q(sender=user, is_deleted_by_sender=False, is_favorite=True)
+        )
+    if folder == "important":
+        return (
+            Q(receiver=user, is_deleted_by_receiver=False, is_important=True) |
+            Q(sender=user, is_deleted_by_sender=False, is_important=True)
+        )
+    if folder == "trash":
+        return (
+            Q(receiver=user, is_deleted_by_receiver=True) |
+            Q(sender=user, is_deleted_by_sender=True)
+        )
+    raise ValueError(f"Unknown mailbox folder: {folder}")
+
+
+def folder_roles(folder: str):
+    """
+    Which side(s) of the email the user can be on for a folder.
+    """
+    if folder in ("inbox", "archived"):
+        return ("receiver",)
+    if folder == "sent":
+        return ("sender",)
+    return ("receiver", "sender")
+
+
+def encode_cursor(sort_key, email_id: int) -> str:
+    if isinstance(sort_key, datetime):
+        sort_key = sort_key.isoformat()
+    raw = f"{sort_key!s}|{email_id}".encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii")
+
+
+def decode_cursor(cursor: str, parse_key=datetime.fromisoformat):
+    try:
+        raw = base64.urlsafe_b64decode(cursor.encode("ascii")).decode("utf-8")
+        sort_key, email_id = raw.rsplit("|", 1)
+        return parse_key(sort_key), int(email_id)
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def _attachments_for(email_ids):
+    """
+    Loads attachments for a whole page in one query, grouped by email id.
+    """
+    grouped = {email_id: [] for email_id in email_ids}
+    rows = (
+        Attachment.objects.filter(email_id__in=email_ids)
+        .order_by("id")
+        .values_list("email_id", "file", "file_name")
+    )
+    for email_id, name, file_name in rows:
+        grouped[email_id].append({"filename": file_name or name, "url": default_storage.url(name)})
+    return grouped
+
+
+def list_folder(
+    user,
+    folder: str,
+    cursor: Optional[str] = None,
+    limit: int = DEFAULT_PAGE_SIZE,
+    extra_filter: Optional[Q] = None,
+    search: Optional[str] = None,
+):
+    """
+    Returns one page of a mailbox folder, newest first.
+
+    Pages are keyed on (created_at, id) so page N costs the same as page 1,
+    and only header columns plus a short body snippet are read. Sender,
+    receiver and attachments for the page are loaded in two queries total.
+
+    With `search`, results come from the full-text index ordered by
+    relevance instead, and the cursor is keyed on (rank, id). That costs
+    one ranking query plus the same header and attachment queries.
+    """
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+
+    qs = Email.objects.filter(folder_filter(folder, user))
+    if extra_filter is not None:
+        qs = qs.filter(extra_filter)
+
+    if search:
+        return _search_folder(qs, user, folder, search, cursor, limit)
+
+    if cursor:
+        created_at, email_id = decode_cursor(cursor)
+        # Written as "<= AND (< OR id <)" rather than a plain OR so the
+        # database can seek straight to the cursor position on the index.
+        qs = qs.filter(
+            Q(created_at__lte=created_at),
+            Q(created_at__lt=created_at) | Q(id__lt=email_id)
+        )
+
+    rows = list(
+        qs.order_by("-created_at", "-id")
+        .annotate(snippet=Substr("body", 1, SNIPPET_LENGTH))
+        .values(*HEADER_FIELDS, "snippet")[:limit + 1]
+    )
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1]["created_at"], rows[-1]["id"])
+
+    return _page(rows, next_cursor)
+
+
+def _search_folder(qs, user, folder, search, cursor, limit):
+    after = decode_cursor(cursor, parse_key=float) if cursor else None
+    ranked = get_search_backend().search(
+        qs, search, user, folder_roles(folder), limit=limit + 1, after=after
+    )
+
+    next_cursor = None
+    if len(ranked) > limit:
+        ranked = ranked[:limit]
+        last_id, last_rank = ranked[-1]
+        next_cursor = encode_cursor(last_rank, last_id)
+
+    by_id = {
+        r["id"]: r
+        for r in Email.objects.filter(id__in=[email_id for email_id, _ in ranked])
+        .annotate(snippet=Substr("body", 1, SNIPPET_LENGTH))
+        .values(*HEADER_FIELDS, "snippet")
+    }
+    rows = [by_id[email_id] for email_id, _ in ranked if email_id in by_id]
+
+    return _page(rows, next_cursor)
+
+
+def _page(rows, next_cursor):
+    attachments = _attachments_for([r["id"] for r in rows])
+
+    return {
+        "results": [
+            {
+                "id": r["id"],
+                "from": r["sender__email"],
+                "to": r["receiver__email"],
+                "subject": r["subject"],
+                "snippet": r["snippet"],
+                "date": r["created_at"],
+                "is_important": r["is_important"],
+                "is_favorite": r["is_favorite"],
+                "is_archived": r["is_archived"],
+                "is_read": r["is_read"],
+                "attachments": attachments[r["id"]],
+            }
+            for r in rows
+        ],
+        "next_cursor": next_cursor,
+    }
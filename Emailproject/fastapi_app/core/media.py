@@ -0,0 +1,47 @@
+import re
+
+from starlette.datastructures import Headers
+from starlette.responses import FileResponse
+from starlette.staticfiles import NotModifiedResponse, StaticFiles
+
+from fastapi_app.core.config import settings
+
+BLOB_PATH = re.compile(r"(?:^|/)blobs/[0-9a-f]{2}/(?P<sha256>[0-9a-f]{64})(?:\.[a-z0-9]+)?$")
+
+
+class MediaFileResponse(FileResponse):
+    """
+    FileResponse that reads MEDIA_CHUNK_SIZE at a time. Each chunk costs a
+    threadpool round trip, so larger chunks mean far less CPU per GB on
+    servers without zero-copy support. Servers that offer the ASGI
+    "http.response.pathsend" extension send the file themselves.
+    """
+    chunk_size = settings.MEDIA_CHUNK_SIZE
+
+
+class MediaFiles(StaticFiles):
+    """
+    Serves MEDIA_ROOT. Byte ranges (video/audio seeking) and conditional
+    requests are handled by FileResponse.
+
+    Blob files (see fastapi_app/core/blobs.py) are named after their
+    SHA-256 and never change, so they get that hash as a strong ETag and
+    an immutable Cache-Control. They hold private email, chat and Drive
+    files, so only the browser may keep them, not shared caches. Anything
+    else has to be revalidated.
+    """
+
+    def file_response(self, full_path, stat_result, scope, status_code=200):
+        match = BLOB_PATH.search(str(full_path).replace("\\", "/"))
+        if match:
+            headers = {
+                "etag": f'"{match.group("sha256")}"',
+                "cache-control": f"private, max-age={settings.MEDIA_BLOB_MAX_AGE}, immutable",
+            }
+        else:
+            headers = {"cache-control": "no-cache"}
+
+        response = MediaFileResponse(full_path, status_code=status_code, headers=headers, stat_result=stat_result)
+        if self.is_not_modified(response.headers, Headers(scope=scope)):
+            return NotModifiedResponse(response.headers)
+        return response
@@ -0,0 +1,65 @@
+from collections import defaultdict
+
+from django_backend.models import ChatMessage, MessageReaction
+from fastapi_app.core.room_summary import read_counts as watermark_read_counts
+
+
+def attachment_url(message):
+    if not message.attachment:
+        return None
+    try:
+        return message.attachment.url
+    except ValueError:
+        return None
+
+
+def serialize_messages(messages, current_user):
+    """
+    Builds MessageRead dicts for a page of chat messages.
+
+    Read counts (from the rooms' read markers), the current user's stars
+    and reaction groups are loaded for the whole page with one query each,
+    so the cost is four queries no matter how many messages are on the page.
+    """
+    messages = list(messages.select_related("sender", "parent", "parent__sender"))
+    ids = [m.id for m in messages]
+    if not ids:
+        return []
+
+    read_counts = watermark_read_counts(messages)
+
+    starred_ids = set(
+        ChatMessage.starred_by.through.objects
+        .filter(chatmessage_id__in=ids, user_id=current_user.id)
+        .values_list("chatmessage_id", flat=True)
+    )
+
+    reactions = defaultdict(dict)
+    rows = (
+        MessageReaction.objects
+        .filter(message_id__in=ids)
+        .order_by("message_id", "id")
+        .values_list("message_id", "emoji", "user__email")
+    )
+    for message_id, emoji, email in rows:
+        group = reactions[message_id].setdefault(emoji, {"emoji": emoji, "count": 0, "user_emails": []})
+        group["count"] += 1
+        group["user_emails"].append(email)
+
+    return [
+        {
+            "id": m.id,
+            "sender_email": m.sender.email,
+            "content": m.content,
+            "attachment_url": attachment_url(m),
+            "timestamp": m.timestamp,
+            "read_count": read_counts.get(m.id, 0),
+            "is_starred": m.id in starred_ids,
+            "parent_id": m.parent_id,
+            "parent_content": m.parent.content if m.parent else None,
+            "parent_sender": m.parent.sender.email if m.parent else None,
+            "reactions": list(reactions[m.id].values()),
+            "is_forwarded": m.is_forwarded,
+        }
+        for m in messages
+    ]
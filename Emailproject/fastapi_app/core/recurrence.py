@@ -0,0 +1,85 @@
+import copy
+import threading
+from collections import OrderedDict
+from datetime import datetime
+from typing import List
+
+from django.db.models.signals import post_save, post_delete
+from django_backend.models import Event
+from django_backend.recurrence import expand
+from fastapi_app.core.config import settings
+
+
+class OccurrenceCache:
+    """
+    LRU of expanded windows, keyed by event id, the event's updated_at and
+    the window. Editing an event bumps updated_at, so other processes never
+    reuse stale expansions; in this process the event's entries are also
+    dropped right away on save or delete.
+    """
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_or_expand(self, event, start: datetime, end: datetime) -> List[datetime]:
+        key = (event.id, event.updated_at, start, end)
+        with self._lock:
+            cached = self._entries.get(key)
+            if cached is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return cached
+            self.misses += 1
+
+        starts = expand(event, start, end)
+        with self._lock:
+            self._entries[key] = starts
+            if len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+        return starts
+
+    def invalidate_event(self, event_id):
+        with self._lock:
+            for key in [k for k in self._entries if k[0] == event_id]:
+                del self._entries[key]
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "cached_windows": len(self._entries),
+        }
+
+
+occurrence_cache = OccurrenceCache(max_size=settings.RECURRENCE_CACHE_SIZE)
+
+
+def _invalidate_occurrences(sender, instance, **kwargs):
+    occurrence_cache.invalidate_event(instance.pk)
+
+
+post_save.connect(_invalidate_occurrences, sender=Event, dispatch_uid="recurrence_cache_save")
+post_delete.connect(_invalidate_occurrences, sender=Event, dispatch_uid="recurrence_cache_delete")
+
+
+def occurrences_in_range(series, start: datetime, end: datetime) -> List[Event]:
+    """
+    One copy of each recurring event per occurrence in [start, end), with
+    start/end moved to that occurrence and recurrence_id set to its start.
+    """
+    result = []
+    for event in series:
+        duration = event.end_datetime - event.start_datetime
+        for occurrence_start in occurrence_cache.get_or_expand(event, start, end):
+            occurrence = copy.copy(event)
+            occurrence.start_datetime = occurrence_start
+            occurrence.end_datetime = occurrence_start + duration
+            occurrence.recurrence_id = occurrence_start
+            result.append(occurrence)
+    return result
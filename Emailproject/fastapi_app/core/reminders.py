@@ -0,0 +1,53 @@
+from datetime import datetime, timedelta
+from typing import Iterable, Optional
+
+from django.utils import timezone
+from django_backend.models import EventReminder
+from django_backend.recurrence import next_occurrence
+
+
+def next_fire_at(event, minutes_before: int, now: datetime) -> Optional[datetime]:
+    """
+    When a reminder `minutes_before` the event (or, for recurring events,
+    its next occurrence) should go out. None if the event has already
+    started and nothing is left to remind about. A time in the past means
+    "as soon as possible": that one catch-up reminder is sent, and
+    fire_due_reminders then re-arms a recurring reminder for the first
+    occurrence whose fire time is still ahead.
+    """
+    if event.is_recurring:
+        start = next_occurrence(event, now)
+    else:
+        start = event.start_datetime if event.start_datetime > now else None
+    if start is None:
+        return None
+    return start - timedelta(minutes=minutes_before)
+
+
+def schedule_reminders(event, minutes: Iterable[int]):
+    """
+    Creates the event's reminders with their first fire time, in one query.
+    """
+    now = timezone.now()
+    EventReminder.objects.bulk_create([
+        EventReminder(event=event, minutes_before=m, fire_at=next_fire_at(event, m, now))
+        for m in minutes
+    ])
+
+
+def reschedule_reminders(event):
+    """
+    Recomputes fire times after the event moved (start time, repeat rule or
+    time zone changed). Reminders whose time changes are re-armed, so one
+    that already went out for the old time fires again for the new one.
+    """
+    now = timezone.now()
+    changed = []
+    for reminder in EventReminder.objects.filter(event=event):
+        fire_at = next_fire_at(event, reminder.minutes_before, now)
+        if fire_at != reminder.fire_at:
+            reminder.fire_at = fire_at
+            reminder.sent_at = None
+            changed.append(reminder)
+    if changed:
+        EventReminder.objects.bulk_update(changed, ["fire_at", "sent_at"])
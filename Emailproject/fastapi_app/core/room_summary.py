@@ -0,0 +1,111 @@
+from bisect import bisect_left
+from collections import defaultdict
+
+from django.db import transaction
+from django.db.models import F, Q, Subquery
+from django.utils import timezone
+from django_backend.models import ChatRoom, ChatMessage, ChatRoomReadState
+
+
+def _not_read_past(message_id):
+    return Q(last_read_message__isnull=True) | Q(last_read_message_id__lt=message_id)
+
+
+def record_new_message(msg):
+    """
+    Call once a ChatMessage has been created. Points the room at it, bumps
+    every other participant's unread counter and moves the sender's read
+    marker up to it (sending counts as having read the room).
+
+    Three UPDATEs regardless of how many participants the room has. The id
+    guards keep a slower concurrent writer from moving things backwards.
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        ChatRoom.objects.filter(id=msg.room_id).filter(
+            Q(last_message__isnull=True) | Q(last_message_id__lt=msg.id)
+        ).update(last_message=msg)
+
+        states = ChatRoomReadState.objects.filter(room_id=msg.room_id)
+        states.exclude(user_id=msg.sender_id).update(
+            unread_count=F("unread_count") + 1, updated_at=now
+        )
+        states.filter(_not_read_past(msg.id), user_id=msg.sender_id).update(
+            last_read_message=msg, unread_count=0, updated_at=now
+        )
+
+
+def record_deleted_message(msg):
+    """
+    Call after a message has been soft-deleted. Participants who had not
+    read it yet lose one unread, and if it was the room's last message the
+    pointer falls back to the newest message still visible.
+    """
+    now = timezone.now()
+    newest_visible = (
+        ChatMessage.objects
+        .filter(room_id=msg.room_id, is_deleted=False)
+        .order_by("-timestamp", "-id")
+        .values("id")[:1]
+    )
+    with transaction.atomic():
+        ChatRoomReadState.objects.filter(
+            _not_read_past(msg.id), room_id=msg.room_id, unread_count__gt=0
+        ).exclude(user_id=msg.sender_id).update(
+            unread_count=F("unread_count") - 1, updated_at=now
+        )
+        ChatRoom.objects.filter(id=msg.room_id, last_message_id=msg.id).update(
+            last_message=Subquery(newest_visible)
+        )
+
+
+def mark_room_read(room_id, user):
+    """
+    Moves the user's read marker to the room's current last message and
+    clears their unread counter in one UPDATE.
+    """
+    last_message = ChatRoom.objects.filter(id=room_id).values("last_message")[:1]
+    return ChatRoomReadState.objects.filter(room_id=room_id, user=user).update(
+        last_read_message=Subquery(last_message), unread_count=0, updated_at=timezone.now()
+    )
+
+
+def read_counts(messages):
+    """
+    Read receipts derived from the read markers: a message has been read by
+    every participant other than its sender whose marker is at or past it.
+    One query for all the rooms the given messages belong to.
+    """
+    room_ids = {m.room_id for m in messages}
+    watermarks = defaultdict(list)
+    marker_of = {}
+    rows = ChatRoomReadState.objects.filter(
+        room_id__in=room_ids, last_read_message__isnull=False
+    ).values_list("room_id", "user_id", "last_read_message_id")
+    for room_id, user_id, last_read_id in rows:
+        watermarks[room_id].append(last_read_id)
+        marker_of[(room_id, user_id)] = last_read_id
+    for marks in watermarks.values():
+        marks.sort()
+
+    counts = {}
+    for m in messages:
+        marks = watermarks[m.room_id]
+        count = len(marks) - bisect_left(marks, m.id)
+        if marker_of.get((m.room_id, m.sender_id), 0) >= m.id:
+            count -= 1
+        counts[m.id] = count
+    return counts
+
+
+def seen_by(msg):
+    """
+    Participants other than the sender who have read up to this message.
+    """
+    return list(
+        ChatRoomReadState.objects
+        .filter(room_id=msg.room_id, last_read_message_id__gte=msg.id)
+        .exclude(user_id=msg.sender_id)
+        .order_by("user__email")
+        .values_list("user__email", flat=True)
+    )
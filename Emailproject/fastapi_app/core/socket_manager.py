@@ -1,46 +1,208 @@
-from fastapi import WebSocket
-from typing import List, Dict
+from fastapi import WebSocket, status
+from typing import List, Dict, Optional, Set
 from django.utils import timezone
 from asgiref.sync import sync_to_async
 from django.contrib.auth import get_user_model
+from django_backend.models import ChatRoom
+from fastapi_app.core.config import settings
+from fastapi_app.core.broadcast import (
+    BroadcastBackend, MemoryBroadcastBackend, ROOM_CHANNEL_PREFIX, USERS_CHANNEL, ALL_CHANNEL, room_channel
+)
 import redis.asyncio as redis
 import json
 import asyncio
 
 User = get_user_model()
+
+PRESENCE_TYPES = ("USER_STATUS", "USER_STATUS_UPDATE")
+
+
+class Connection:
+    """
+    One accepted WebSocket with its own bounded outbox.
+
+    A dedicated writer task drains the outbox, so broadcasting is just a
+    non-blocking enqueue and a slow client only ever delays itself. When the
+    outbox is full or a send stalls (see ConnectionManager._reap_stalled),
+    the connection is evicted.
+    """
+
+    def __init__(self, websocket: WebSocket, user_id: int, room_id: Optional[int], on_evict):
+        self.websocket = websocket
+        self.user_id = user_id
+        self.room_id = room_id
+        self.closed = False
+        self.busy_since: Optional[float] = None
+        self.outbox = asyncio.Queue(maxsize=settings.WS_SEND_QUEUE_SIZE)
+        self._on_evict = on_evict
+        self.writer = asyncio.create_task(self._drain())
+
+    def send(self, text: str) -> bool:
+        if self.closed:
+            return False
+        try:
+            self.outbox.put_nowait(text)
+            return True
+        except asyncio.QueueFull:
+            self._on_evict(self)
+            return False
+
+    async def _drain(self):
+        loop = asyncio.get_running_loop()
+        try:
+            while True:
+                text = await self.outbox.get()
+                self.busy_since = loop.time()
+                await self.websocket.send_text(text)
+                self.busy_since = None
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            self._on_evict(self)
+
+    def stop(self):
+        self.closed = True
+        if self.writer is not asyncio.current_task():
+            self.writer.cancel()
+
+
 class ConnectionManager:
+    """
+    Registry of live WebSockets, indexed by socket (so a socket is only
+    ever registered once), by room and by user.
+
+    Room messages go to the room's sockets only; presence goes only to
+    users who share at least one room with the subject.
+
+    Nothing is written to sockets directly on broadcast: events go through
+    the broadcast backend, which batches them and brings them back to every
+    process (this one included) via _deliver.
+    """
+
     def __init__(self):
-        self.active_connections: Dict[int, List[WebSocket]] = {}
-        self.user_connection_counts: Dict[int, int] = {} 
+        self.connections: Dict[WebSocket, Connection] = {}
+        self.rooms: Dict[int, Set[Connection]] = {}
+        self.users: Dict[int, Set[Connection]] = {}
+        self._reaper: Optional[asyncio.Task] = None
+        self.backend: BroadcastBackend = MemoryBroadcastBackend()
+        self.backend.on_batch = self._deliver
 
-    async def connect(self, websocket: WebSocket, room_id: int, user_id: int):
+    async def set_backend(self, backend: BroadcastBackend):
+        """
+        Swaps the broadcast transport, e.g. for Redis at startup.
+        """
+        await self.backend.stop()
+        backend.on_batch = self._deliver
+        await backend.start()
+        self.backend = backend
+        for room_id in list(self.rooms):
+            await backend.subscribe(room_channel(room_id))
+
+    async def connect(self, websocket: WebSocket, room_id: Optional[int], user_id: int):
+        """
+        Registers a socket for a chat room, or for presence only when
+        room_id is None.
+        """
+        if websocket in self.connections:
+            return
         await websocket.accept()
-        
-        if room_id not in self.active_connections:
-            self.active_connections[room_id] = []
-        self.active_connections[room_id].append(websocket)
-        self.user_connection_counts[user_id] = self.user_connection_counts.get(user_id, 0) + 1
-        
-        await self.broadcast_to_all({
-            "type": "USER_STATUS",
-            "user_id": user_id,
-            "status": "online"
-        })
 
-    async def disconnect(self, websocket: WebSocket, room_id: int, user_id: int):
-        if room_id in self.active_connections:
-            if websocket in self.active_connections[room_id]:
-                self.active_connections[room_id].remove(websocket)
-                
-        if user_id in self.user_connection_counts:
-            self.user_connection_counts[user_id] -= 1
-            
-            if self.user_connection_counts[user_id] <= 0:
-                del self.user_connection_counts[user_id]
-                
-                await self.update_last_seen(user_id)
-
-        await self.broadcast_to_all({
+        conn = Connection(websocket, user_id, room_id, self._evict)
+        self.connections[websocket] = conn
+        if room_id is not None:
+            first_in_room = room_id not in self.rooms
+            self.rooms.setdefault(room_id, set()).add(conn)
+            if first_in_room:
+                # Waits for the subscription so nothing published to the
+                # room from here on is missed.
+                await self.backend.subscribe(room_channel(room_id))
+
+        came_online = user_id not in self.users
+        self.users.setdefault(user_id, set()).add(conn)
+
+        if self._reaper is None or self._reaper.done():
+            self._reaper = asyncio.create_task(self._reap_stalled())
+
+        if came_online:
+            await self.broadcast_presence(user_id, {
+                "type": "USER_STATUS",
+                "user_id": user_id,
+                "status": "online"
+            })
+
+    async def disconnect(self, websocket: WebSocket, room_id: Optional[int] = None, user_id: Optional[int] = None):
+        conn = self.connections.get(websocket)
+        if conn is None:
+            return
+        went_offline = self._unregister(conn)
+        await self._release_room(conn.room_id)
+        if went_offline:
+            await self._went_offline(conn.user_id)
+
+    def _unregister(self, conn: Connection) -> bool:
+        """
+        Drops a connection from every index. Returns True when it was the
+        user's last one.
+        """
+        conn.stop()
+        self.connections.pop(conn.websocket, None)
+
+        if conn.room_id is not None:
+            room = self.rooms.get(conn.room_id)
+            if room is not None:
+                room.discard(conn)
+                if not room:
+                    del self.rooms[conn.room_id]
+
+        user_conns = self.users.get(conn.user_id)
+        if user_conns is not None:
+            user_conns.discard(conn)
+            if not user_conns:
+                del self.users[conn.user_id]
+                return True
+        return False
+
+    async def _release_room(self, room_id: Optional[int]):
+        """
+        Drops the backend subscription for a room nobody here is in any
+        more. Checked when it runs, not when the last socket left, so a
+        socket that joined again in between keeps it.
+        """
+        if room_id is not None and room_id not in self.rooms:
+            await self.backend.unsubscribe(room_channel(room_id))
+
+    def _evict(self, conn: Connection):
+        if conn.closed:
+            return
+        went_offline = self._unregister(conn)
+        asyncio.create_task(self._close_evicted(conn, went_offline))
+
+    async def _close_evicted(self, conn: Connection, went_offline: bool):
+        try:
+            await conn.websocket.close(code=status.WS_1013_TRY_AGAIN_LATER)
+        except Exception:
+            pass
+        await self._release_room(conn.room_id)
+        if went_offline:
+            await self._went_offline(conn.user_id)
+
+    async def _reap_stalled(self):
+        """
+        Evicts connections whose current send has been stuck for longer than
+        WS_SEND_TIMEOUT. One sweep over all sockets is far cheaper than a
+        timer around every send. Stops once nobody is connected.
+        """
+        loop = asyncio.get_running_loop()
+        while self.connections:
+            await asyncio.sleep(settings.WS_SEND_TIMEOUT / 2)
+            deadline = loop.time() - settings.WS_SEND_TIMEOUT
+            for conn in list(self.connections.values()):
+                if conn.busy_since is not None and conn.busy_since < deadline:
+                    self._evict(conn)
+
+    async def _went_offline(self, user_id: int):
+        await self.update_last_seen(user_id)
+        await self.broadcast_presence(user_id, {
             "type": "USER_STATUS",
             "user_id": user_id,
             "status": "offline"
@@ -56,26 +218,71 @@ class ConnectionManager:
         except User.DoesNotExist:
             pass
 
+    @sync_to_async
+    def _room_peers(self, user_id: int) -> Set[int]:
+        """
+        Ids of everyone who shares a chat room with the user, the user included.
+        """
+        Participant = ChatRoom.participants.through
+        rooms = Participant.objects.filter(user_id=user_id).values("chatroom_id")
+        peers = set(Participant.objects.filter(chatroom_id__in=rooms).values_list("user_id", flat=True))
+        peers.add(user_id)
+        return peers
+
+    def _deliver(self, channel: str, messages: List[dict]):
+        """
+        Writes a batch received from the broadcast backend to the local
+        sockets it is meant for.
+        """
+        if channel.startswith(ROOM_CHANNEL_PREFIX):
+            conns = list(self.rooms.get(int(channel[len(ROOM_CHANNEL_PREFIX):]), ()))
+            for message in messages:
+                text = json.dumps(message, default=str)
+                for conn in conns:
+                    conn.send(text)
+        elif channel == USERS_CHANNEL:
+            for envelope in messages:
+                text = json.dumps(envelope["message"], default=str)
+                for user_id in envelope["user_ids"]:
+                    for conn in list(self.users.get(user_id, ())):
+                        conn.send(text)
+        elif channel == ALL_CHANNEL:
+            for message in messages:
+                text = json.dumps(message, default=str)
+                for conn in list(self.connections.values()):
+                    conn.send(text)
+
     async def broadcast(self, message: dict, room_id: int):
-        """Send a message to everyone in the room"""
-        if room_id in self.active_connections:
-            for connection in self.active_connections[room_id][:]:
-                try:
-                    await connection.send_json(message)
-                except:
-                    pass
+        """Send a message to everyone in the room, on every worker"""
+        coalesce_key = None
+        if message.get("type") == "typing":
+            coalesce_key = ("typing", message.get("user_id"))
+        self.backend.publish(room_channel(room_id), message, coalesce_key)
+
+    async def broadcast_presence(self, user_id: int, message: dict):
+        """
+        Send a status change about `user_id` to the users who share a room
+        with them. A newer status for the same user in the same flush
+        window replaces the older one.
+        """
+        peers = await self._room_peers(user_id)
+        self.backend.publish(
+            USERS_CHANNEL,
+            {"user_ids": sorted(peers), "message": message},
+            ("presence", user_id)
+        )
 
     def get_online_users(self) -> List[int]:
         """Returns a list of User IDs that are currently connected."""
-        return list(self.user_connection_counts.keys())
-    
+        return list(self.users.keys())
+
     async def start_redis_listener(self):
         """
         Listens to the 'status_updates' channel in Redis.
         When Celery sends a message, this function picks it up and broadcasts it.
         """
         print("Redis Listener Started...")
-        r = redis.from_url("redis://localhost:6379/0")
+        r = redis.from_url(settings.REDIS_URL)
         pubsub = r.pubsub()
         await pubsub.subscribe("status_updates")
 
@@ -84,22 +291,18 @@ class ConnectionManager:
                 try:
                     data = json.loads(message["data"])
                     print(f"Received from Redis: {data}")
-                    await self.broadcast_to_all(data)
+                    if data.get("type") in PRESENCE_TYPES and "user_id" in data:
+                        await self.broadcast_presence(data["user_id"], data)
+                    else:
+                        await self.broadcast_to_all(data)
                 except Exception as e:
                     print(f"Error broadcasting redis message: {e}")
-    
+
     async def broadcast_to_all(self, message: dict):
         """
-        Send a message to EVERY connected user in ALL rooms.
-        Used for Status Updates (Online/Offline/In Meeting).
+        Send a message once to every connected socket on every worker.
+        Status changes should use broadcast_presence instead.
         """
-        for room_id in self.active_connections:
-            for connection in self.active_connections[room_id]:
-                try:
-                    await connection.send_json(message)
-                except Exception:
-                    pass
+        self.backend.publish(ALL_CHANNEL, message)
 
 manager = ConnectionManager()
-
-    
\ No newline at end of file
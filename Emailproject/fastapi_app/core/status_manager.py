@@ -30,7 +30,7 @@ class StatusManager:
         success = await StatusManager._update_user_status(user_id, new_status, message, is_manual)
 
         if success:
-            await manager.broadcast_to_all({
+            await manager.broadcast_presence(user_id, {
                 "type": "USER_STATUS_UPDATE",
                 "user_id": user_id,
                 "status": new_status,
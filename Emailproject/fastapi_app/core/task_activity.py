@@ -0,0 +1,65 @@
+from typing import Optional
+
+from django_backend.models import TaskActivity
+from fastapi_app.core.task_query import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, decode_cursor, encode_cursor, keyset_after
+
+VALUE_LENGTH = 255
+
+# Newest first; id breaks ties between entries written in the same batch.
+HISTORY_KEYS = [("created_at", True), ("id", True)]
+
+
+def _compact(value) -> Optional[str]:
+    if value is None:
+        return None
+    return str(value)[:VALUE_LENGTH]
+
+
+class ActivityBuffer:
+    """
+    Collects a request's task activity and writes it in one INSERT.
+
+        log = ActivityBuffer(current_user)
+        log.change(task, "status_change", "status", task.status, data.status)
+        ...
+        log.flush()
+    """
+
+    def __init__(self, actor):
+        self.actor = actor
+        self.entries = []
+
+    def change(self, task, action: str, field: str, old, new):
+        self.entries.append(TaskActivity(
+            task=task,
+            project_id=task.project_id,
+            actor=self.actor,
+            action_type=action,
+            field=field,
+            old_value=_compact(old),
+            new_value=_compact(new),
+        ))
+
+    def flush(self):
+        if self.entries:
+            TaskActivity.objects.bulk_create(self.entries)
+            self.entries = []
+
+
+def activity_page(qs, cursor: Optional[str] = None, limit: int = DEFAULT_PAGE_SIZE):
+    """
+    One page of activity entries, newest first, keyed on (created_at, id)
+    so any page costs the same as the first.
+    """
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+    if cursor:
+        qs = qs.filter(keyset_after(HISTORY_KEYS, decode_cursor(cursor, HISTORY_KEYS)))
+
+    rows = list(qs.select_related("actor").order_by("-created_at", "-id")[:limit + 1])
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor([rows[-1].created_at, rows[-1].id])
+
+    return {"results": rows, "next_cursor": next_cursor}
@@ -0,0 +1,181 @@
+from typing import List, Optional
+
+from fastapi import HTTPException
+from django.db import transaction
+from django.utils import timezone
+from django_backend.models import Notification, Project, Tag, Task, User
+from fastapi_app.core.task_activity import ActivityBuffer
+from fastapi_app.core.task_query import visible_tasks
+
+MAX_BULK_TASKS = 1000
+BULK_BATCH_SIZE = 500
+
+STATUSES = {status for status, _ in Task.STATUS_CHOICES}
+PRIORITIES = {priority for priority, _ in Task.PRIORITY_CHOICES}
+
+
+def _task_notification(recipient_id, message, task_id):
+    # Same shape as routers.notifications.create_notification.
+    return Notification(
+        recipient_id=recipient_id,
+        message=message[:255],
+        notification_type="task",
+        object_id=task_id,
+    )
+
+
+def bulk_create_tasks(user, items) -> List[dict]:
+    """
+    Creates many tasks at once and returns one result per item, in order.
+    An item with an invalid priority or whose assignee or project does not
+    exist fails on its own; the rest are inserted together. Assignees and projects are resolved in one
+    query each, tasks and notifications in one INSERT each (per batch).
+    """
+    emails = {item.assigned_to_email for item in items if item.assigned_to_email}
+    assignees = {u.email: u for u in User.objects.filter(email__in=emails)} if emails else {}
+    project_ids = {item.project_id for item in items if item.project_id}
+    projects = set(Project.objects.filter(id__in=project_ids).values_list("id", flat=True)) if project_ids else set()
+
+    results = []
+    new_tasks = []
+    for item in items:
+        if item.priority not in PRIORITIES:
+            results.append({"task_id": None, "ok": False, "error": "Invalid priority"})
+            continue
+        if item.assigned_to_email and item.assigned_to_email not in assignees:
+            results.append({"task_id": None, "ok": False, "error": "Assignee email not found"})
+            continue
+        if item.project_id and item.project_id not in projects:
+            results.append({"task_id": None, "ok": False, "error": "Project not found"})
+            continue
+        task = Task(
+            title=item.title,
+            description=item.description or "",
+            priority=item.priority,
+            due_date=item.due_date,
+            created_by=user,
+            assigned_to=assignees.get(item.assigned_to_email),
+            project_id=item.project_id,
+        )
+        new_tasks.append(task)
+        results.append({"task": task, "ok": True, "error": None})
+
+    with transaction.atomic():
+        Task.objects.bulk_create(new_tasks, batch_size=BULK_BATCH_SIZE)
+        Notification.objects.bulk_create(
+            [
+                _task_notification(task.assigned_to_id, f"{user.email} assigned you a task: {task.title}", task.id)
+                for task in new_tasks
+                if task.assigned_to_id and task.assigned_to_id != user.id
+            ],
+            batch_size=BULK_BATCH_SIZE,
+        )
+
+    for result in results:
+        task = result.pop("task", None)
+        if task is not None:
+            result["task_id"] = task.id
+    return results
+
+
+def bulk_update_tasks(
+    user,
+    task_ids: List[int],
+    status: Optional[str] = None,
+    priority: Optional[str] = None,
+    assigned_to_email: Optional[str] = None,
+    add_tags: Optional[List[str]] = None,
+) -> List[dict]:
+    """
+    Applies the same changes to many tasks and returns one result per id,
+    in order, listing the fields that actually changed. Ids the user can
+    not see (neither creator nor assignee) fail individually. An id given
+    more than once is applied once and its result repeated at each place.
+
+    Tasks are read in one query and all changed rows are written with a
+    single UPDATE; new tag links, activity entries and reassignment
+    notifications are each inserted in bulk, all in one transaction.
+    """
+    if status and status not in STATUSES:
+        raise HTTPException(status_code=400, detail="Invalid status")
+    if priority and priority not in PRIORITIES:
+        raise HTTPException(status_code=400, detail="Invalid priority")
+
+    assignee = None
+    if assigned_to_email:
+        assignee = User.objects.filter(email=assigned_to_email).first()
+        if assignee is None:
+            raise HTTPException(status_code=404, detail="Assignee email not found")
+
+    ids = list(dict.fromkeys(task_ids))
+    tasks = {
+        task.id: task
+        for task in visible_tasks(user).filter(id__in=ids).select_related("assigned_to")
+    }
+
+    tags = []
+    linked = set()
+    names = list(dict.fromkeys(name for name in (add_tags or []) if name))
+    if names:
+        Tag.objects.bulk_create([Tag(name=name) for name in names], ignore_conflicts=True)
+        tags = list(Tag.objects.filter(name__in=names))
+        linked = set(
+            Task.tags.through.objects.filter(task_id__in=list(tasks), tag__in=tags)
+            .values_list("task_id", "tag_id")
+        )
+
+    log = ActivityBuffer(user)
+    changed_ids = []
+    new_links = []
+    notifications = []
+    results = {}
+    for task_id in ids:
+        task = tasks.get(task_id)
+        if task is None:
+            results[task_id] = {"task_id": task_id, "ok": False, "error": "Task not found", "changed": []}
+            continue
+
+        changed = []
+        if status and status != task.status:
+            log.change(task, "status_change", "status", task.status, status)
+            changed.append("status")
+        if priority and priority != task.priority:
+            log.change(task, "priority_change", "priority", task.priority, priority)
+            changed.append("priority")
+        if assignee and task.assigned_to_id != assignee.id:
+            log.change(
+                task, "assignment", "assigned_to",
+                task.assigned_to.email if task.assigned_to else None, assignee.email
+            )
+            changed.append("assigned_to")
+            notifications.append(_task_notification(
+                assignee.id, f"Task reassigned to you by {user.email}: {task.title}", task.id
+            ))
+
+        for tag in tags:
+            if (task.id, tag.id) not in linked:
+                new_links.append(Task.tags.through(task_id=task.id, tag_id=tag.id))
+                log.change(task, "tag_added", "tags", None, tag.name)
+                if "tags" not in changed:
+                    changed.append("tags")
+
+        if changed:
+            changed_ids.append(task.id)
+        results[task_id] = {"task_id": task_id, "ok": True, "error": None, "changed": changed}
+
+    updates = {"updated_at": timezone.now()}
+    if status:
+        updates["status"] = status
+    if priority:
+        updates["priority"] = priority
+    if assignee:
+        updates["assigned_to"] = assignee
+
+    with transaction.atomic():
+        if changed_ids:
+            Task.objects.filter(id__in=changed_ids).update(**updates)
+        Task.tags.through.objects.bulk_create(new_links, batch_size=BULK_BATCH_SIZE, ignore_conflicts=True)
+        log.flush()
+        Notification.objects.bulk_create(notifications, batch_size=BULK_BATCH_SIZE)
+
+    return [dict(results[task_id]) for task_id in task_ids]
@@ -0,0 +1,186 @@
+import base64
+import json
+from datetime import datetime
+from typing import Optional
+
+from fastapi import HTTPException
+from django.db.models import Case, Count, Exists, IntegerField, OuterRef, Q, Value, When
+from django.db.models.functions import Coalesce
+from django_backend.models import Task
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+# Lower sorts first.
+PRIORITY_RANK = {"high": 0, "medium": 1, "low": 2}
+
+# Each sort is a list of (key, descending) ending with id, so the order is
+# total and a page can resume right after its last row. Keys are never
+# null: tasks without a due date sort after dated ones via due_missing,
+# and due_key falls back to created_at just to have a value to compare.
+SORTS = {
+    "created": [("created_at", True), ("id", True)],
+    "due_date": [("due_missing", False), ("due_key", False), ("id", False)],
+    "priority": [("priority_rank", False), ("due_missing", False), ("due_key", False), ("id", False)],
+}
+DATETIME_KEYS = {"created_at", "due_key"}
+
+
+def visible_tasks(user):
+    """
+    Tasks the user created or is assigned to. A single WHERE with an OR,
+    so each side can use its (user, status) index and no DISTINCT is needed.
+    """
+    return Task.objects.filter(Q(assigned_to=user) | Q(created_by=user))
+
+
+def _with_sort_keys(qs):
+    return qs.annotate(
+        due_missing=Case(When(due_date__isnull=True, then=Value(1)), default=Value(0), output_field=IntegerField()),
+        due_key=Coalesce("due_date", "created_at"),
+        priority_rank=Case(
+            *[When(priority=name, then=Value(rank)) for name, rank in PRIORITY_RANK.items()],
+            default=Value(len(PRIORITY_RANK)),
+            output_field=IntegerField(),
+        ),
+    )
+
+
+def encode_cursor(values) -> str:
+    raw = json.dumps([v.isoformat() if isinstance(v, datetime) else v for v in values])
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii")
+
+
+def decode_cursor(cursor: str, keys):
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")).decode("utf-8"))
+        if len(values) != len(keys):
+            raise ValueError(cursor)
+        return [
+            datetime.fromisoformat(v) if key in DATETIME_KEYS else int(v)
+            for (key, _), v in zip(keys, values)
+        ]
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def keyset_after(keys, values) -> Q:
+    """
+    Rows that come after `values` in the sort: greater on the first key, or
+    equal on it and greater on the next, and so on.
+    """
+    after = Q(pk__in=[])
+    equal = Q()
+    for (key, descending), value in zip(keys, values):
+        after |= equal & Q(**{f"{key}__{'lt' if descending else 'gt'}": value})
+        equal &= Q(**{key: value})
+    return after
+
+
+def list_tasks(
+    user,
+    status: Optional[str] = None,
+    priority: Optional[str] = None,
+    project_id: Optional[int] = None,
+    tag: Optional[str] = None,
+    sort: str = "created",
+    cursor: Optional[str] = None,
+    limit: int = DEFAULT_PAGE_SIZE,
+):
+    """
+    One page of the user's tasks plus the cursor for the next one.
+
+    Creator, assignee and project (with its owner) come from the same
+    query, tags for the whole page from one more, so a page costs two
+    queries whatever its size.
+    """
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+    keys = SORTS[sort]
+
+    qs = visible_tasks(user)
+    if status:
+        qs = qs.filter(status=status)
+    if priority:
+        qs = qs.filter(priority__iexact=priority)
+    if project_id:
+        qs = qs.filter(project_id=project_id)
+    if tag:
+        qs = qs.filter(Exists(
+            Task.tags.through.objects.filter(task_id=OuterRef("pk"), tag__name__iexact=tag)
+        ))
+
+    qs = _with_sort_keys(qs)
+    if cursor:
+        qs = qs.filter(keyset_after(keys, decode_cursor(cursor, keys)))
+
+    rows = list(
+        qs.select_related("created_by", "assigned_to", "project__owner")
+        .prefetch_related("tags")
+        .order_by(*[f"-{key}" if descending else key for key, descending in keys])[:limit + 1]
+    )
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor([getattr(rows[-1], key) for key, _ in keys])
+
+    return {"results": rows, "next_cursor": next_cursor}
+
+
+def task_board(user, project_id: Optional[int] = None, sort: str = "created", limit: int = DEFAULT_PAGE_SIZE):
+    """
+    Kanban view of the user's tasks: a column per status with its count and
+    first page (continue with list_tasks and the column's next_cursor), plus
+    counts per project, priority and tag.
+
+    Counts come from two GROUP BY queries and each column page from two
+    more, so the cost depends on how many tasks the user can see, never on
+    the size of the table, and rows are never loaded just to be counted.
+    """
+    qs = visible_tasks(user)
+    if project_id:
+        qs = qs.filter(project_id=project_id)
+
+    by_status = {status: 0 for status, _ in Task.STATUS_CHOICES}
+    by_priority = {priority: 0 for priority, _ in Task.PRIORITY_CHOICES}
+    projects = {}
+    groups = (
+        qs.values("status", "priority", "project_id", "project__name")
+        .annotate(n=Count("id"))
+        .order_by()
+    )
+    for row in groups:
+        by_status[row["status"]] = by_status.get(row["status"], 0) + row["n"]
+        by_priority[row["priority"]] = by_priority.get(row["priority"], 0) + row["n"]
+        if row["project_id"] is not None:
+            project = projects.setdefault(row["project_id"], {
+                "project_id": row["project_id"],
+                "name": row["project__name"],
+                "count": 0,
+                "by_status": {status: 0 for status, _ in Task.STATUS_CHOICES},
+            })
+            project["count"] += row["n"]
+            project["by_status"][row["status"]] = project["by_status"].get(row["status"], 0) + row["n"]
+
+    tags = (
+        Task.tags.through.objects.filter(task__in=qs.values("id"))
+        .values("tag_id", "tag__name")
+        .annotate(n=Count("task_id"))
+        .order_by("-n", "tag__name")
+    )
+
+    columns = []
+    for status, count in by_status.items():
+        page = (
+            list_tasks(user, status=status, project_id=project_id, sort=sort, limit=limit)
+            if count else {"results": [], "next_cursor": None}
+        )
+        columns.append({"status": status, "count": count, **page})
+
+    return {
+        "total": sum(by_status.values()),
+        "columns": columns,
+        "by_priority": by_priority,
+        "projects": sorted(projects.values(), key=lambda p: (-p["count"], p["name"])),
+        "tags": [{"tag_id": t["tag_id"], "name": t["tag__name"], "count": t["n"]} for t in tags],
+    }
@@ -0,0 +1,60 @@
+import os
+import shutil
+import tempfile
+
+from django.db import transaction
+from django.utils import timezone
+from django_backend.models import UploadSession
+from fastapi_app.core.config import settings
+
+
+def partial_path(session_id) -> str:
+    os.makedirs(settings.UPLOAD_TEMP_DIR, exist_ok=True)
+    return os.path.join(settings.UPLOAD_TEMP_DIR, f"{session_id}.part")
+
+
+def chunk_spool():
+    """
+    A private temporary file for one request's body. Nothing touches the
+    session's partial file until the request has claimed its offset (see
+    commit_chunk).
+    """
+    os.makedirs(settings.UPLOAD_TEMP_DIR, exist_ok=True)
+    return tempfile.TemporaryFile(dir=settings.UPLOAD_TEMP_DIR)
+
+
+def commit_chunk(session_id, offset: int, spool, length: int) -> bool:
+    """
+    Claims bytes [offset, offset + length) of the session and copies the
+    spooled chunk there. Returns False, leaving the partial file untouched,
+    if another request already moved the session past `offset`.
+
+    The claim is a conditional UPDATE whose row lock is held until the copy
+    is done, so a competing request for the same offset waits and then
+    finds `received` changed. If the copy fails, the claim rolls back with
+    it.
+    """
+    with transaction.atomic():
+        claimed = UploadSession.objects.filter(id=session_id, received=offset).update(
+            received=offset + length, updated_at=timezone.now()
+        )
+        if not claimed:
+            return False
+
+        path = partial_path(session_id)
+        mode = "r+b" if os.path.exists(path) else "wb"
+        spool.seek(0)
+        with open(path, mode) as fh:
+            fh.seek(offset)
+            shutil.copyfileobj(spool, fh, settings.UPLOAD_CHUNK_SIZE)
+            # Drops anything left past the new end by an attempt that was
+            # rolled back.
+            fh.truncate()
+    return True
+
+
+def discard_partial(session_id):
+    try:
+        os.remove(partial_path(session_id))
+    except FileNotFoundError:
+        pass
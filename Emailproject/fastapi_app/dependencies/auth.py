@@ -1,28 +1,137 @@
+import copy
+import threading
+import time
+from typing import Dict, Optional, Tuple
+
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
+from asgiref.sync import sync_to_async
 from django.contrib.auth import get_user_model
+from django.db.models.signals import post_save, post_delete
+from fastapi_app.core.config import settings
 from fastapi_app.core.security import decode_access_token
-from typing import TYPE_CHECKING
-
-if TYPE_CHECKING:
-    from django_backend.models import User as DjangoUser
-
 
 User = get_user_model()
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/login")
 
-def get_current_user(token: str = Depends(oauth2_scheme)):
-    payload = decode_access_token(token)
 
-    if payload is None or "sub" not in payload:
-        raise HTTPException(
-            status_code=401,
-            detail="Invalid or expired token"
-        )
+class UserCache:
+    """
+    Short-lived cache of authenticated users, keyed by token subject (the
+    user's email), plus a cache of already-decoded tokens.
+
+    Entries expire after AUTH_CACHE_TTL seconds and are dropped as soon as
+    the user is saved or deleted in this process (which covers profile
+    changes and deactivation). Other workers pick up such changes within
+    the TTL. Callers always get their own copy of the user, so a request
+    that modifies it cannot leak the change into the cache.
+    """
+
+    def __init__(self, ttl: float, max_size: int):
+        self.ttl = ttl
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self._users: Dict[str, Tuple[float, object]] = {}
+        self._tokens: Dict[str, Tuple[float, Optional[str]]] = {}
+        self._lock = threading.Lock()
+
+    def subject(self, token: str) -> Optional[str]:
+        """
+        The token's "sub" claim, or None if the token is invalid or expired.
+        """
+        now = time.time()
+        cached = self._tokens.get(token)
+        if cached is not None and cached[0] > now:
+            return cached[1]
+
+        payload = decode_access_token(token)
+        if not payload or not payload.get("sub"):
+            return None
+        expires = min(float(payload.get("exp", now + self.ttl)), now + self.ttl)
+        with self._lock:
+            self._store(self._tokens, token, (expires, payload["sub"]))
+        return payload["sub"]
+
+    def get(self, email: str):
+        cached = self._users.get(email)
+        if cached is not None and cached[0] > time.monotonic():
+            self.hits += 1
+            return copy.copy(cached[1])
+        self.misses += 1
+        return None
+
+    def put(self, email: str, user):
+        with self._lock:
+            self._store(self._users, email, (time.monotonic() + self.ttl, copy.copy(user)))
+
+    def invalidate_user(self, user_id):
+        with self._lock:
+            stale = [email for email, (_, user) in self._users.items() if user.pk == user_id]
+            for email in stale:
+                del self._users[email]
+
+    def clear(self):
+        with self._lock:
+            self._users.clear()
+            self._tokens.clear()
+
+    def _store(self, entries, key, value):
+        if key not in entries and len(entries) >= self.max_size:
+            entries.pop(next(iter(entries)))
+        entries[key] = value
 
-    email = payload["sub"]
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "cached_users": len(self._users),
+            "cached_tokens": len(self._tokens),
+        }
 
-    try:
-        return User.objects.get(email=email)
-    except User.DoesNotExist:
-        raise HTTPException(status_code=401, detail="User not found")
+
+user_cache = UserCache(ttl=settings.AUTH_CACHE_TTL, max_size=settings.AUTH_CACHE_SIZE)
+
+
+def _invalidate_cached_user(sender, instance, **kwargs):
+    user_cache.invalidate_user(instance.pk)
+
+
+post_save.connect(_invalidate_cached_user, sender=User, dispatch_uid="auth_user_cache_save")
+post_delete.connect(_invalidate_cached_user, sender=User, dispatch_uid="auth_user_cache_delete")
+
+
+async def authenticate_token(token: str):
+    """
+    Resolves a JWT access token to its user, or None. Only cache misses
+    reach the database.
+    """
+    email = user_cache.subject(token)
+    if email is None:
+        return None
+
+    user = user_cache.get(email)
+    if user is not None:
+        return user
+
+    user = await sync_to_async(User.objects.filter(email=email).first)()
+    if user is not None:
+        user_cache.put(email, user)
+    return user
+
+
+async def get_current_user(token: str = Depends(oauth2_scheme)):
+    """
+    The one authentication dependency for every router: returns the
+    logged-in user or raises 401.
+    """
+    user = await authenticate_token(token)
+    if user is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Could not validate credentials",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    return user
@@ -6,8 +6,9 @@ from email_project.asgi import application as django_asgi_app
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi_app.core.socket_manager import manager
+from fastapi_app.core.broadcast import get_broadcast_backend
 import asyncio
-from fastapi.staticfiles import StaticFiles
+from fastapi_app.core.media import MediaFiles
 from pathlib import Path
 
 from fastapi_app.routers import (
@@ -29,7 +30,7 @@ BASE_DIR = Path(__file__).resolve().parent.parent
 MEDIA_ROOT = BASE_DIR / "media" 
 MEDIA_ROOT.mkdir(parents=True, exist_ok=True)
 
-app.mount("/media", StaticFiles(directory=str(MEDIA_ROOT)), name="media")
+app.mount("/media", MediaFiles(directory=str(MEDIA_ROOT)), name="media")
 
 app.include_router(email.router, prefix="/email", tags=["Emails"])
 app.include_router(auth.router, prefix="/auth", tags=["Authentication"])
@@ -48,12 +49,14 @@ app.include_router(drive.router, prefix="/drive", tags=["Drive"])
 
 @app.on_event("startup")
 async def startup_event():
+    await manager.set_backend(get_broadcast_backend())
     app.state.redis_listener = asyncio.create_task(manager.start_redis_listener())
     
 @app.on_event("shutdown")
 async def shutdown_event():
     if hasattr(app.state, "redis_listener"):
         app.state.redis_listener.cancel()
+    await manager.backend.stop()
 
 @app.get("/")
 def read_root():
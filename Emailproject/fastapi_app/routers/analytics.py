@@ -3,6 +3,8 @@ from django.contrib.auth import get_user_model
 from django.db.models import Count
 from django_backend.models import Email, ChatMessage, ChatRoom 
 from fastapi_app.dependencies.permissions import is_admin 
+from fastapi_app.dependencies.auth import user_cache
+from fastapi_app.core.recurrence import occurrence_cache
 
 router = APIRouter()
 User = get_user_model()
@@ -48,5 +50,7 @@ def get_analytics(current_user = Depends(is_admin)):
             "chat_messages": total_messages,
             "active_chat_rooms": total_rooms
         },
-        "top_performers": top_senders
+        "top_performers": top_senders,
+        "auth_cache": user_cache.stats(),
+        "recurrence_cache": occurrence_cache.stats()
     }
\ No newline at end of file
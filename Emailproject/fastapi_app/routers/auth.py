@@ -1,14 +1,14 @@
 import pyotp
 from fastapi import APIRouter, Depends, HTTPException, status, Request, Query
-from fastapi.security import OAuth2PasswordRequestForm, OAuth2PasswordBearer
+from fastapi.security import OAuth2PasswordRequestForm
 from datetime import timedelta
-from asgiref.sync import sync_to_async
 from django_backend.models import LoginActivity
 from ..core.security import (
     verify_password, create_access_token,
-    create_password_reset_token, decode_access_token
+    create_password_reset_token
 )
 from ..core.config import settings
+from ..dependencies.auth import get_current_user  # noqa: F401
 from ..schemas.user_schemas import Token, ForgotPasswordRequest, ResetPasswordWithOTP, ForgotUsernameRequest
 
 from fastapi_app.utils.otp import generate_otp, otp_expiry
@@ -22,43 +22,6 @@ from fastapi_app.utils.sms import send_otp_sms
 
 router = APIRouter()
 
-oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/login")
-
-async def get_current_user(token: str = Depends(oauth2_scheme)):
-    """
-    Extracts the logged-in user from the JWT access token.
-    Used in authenticated endpoints like:
-    - create task
-    - create chat room
-    - send messages
-    """
-
-    payload = decode_access_token(token)
-    if not payload:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Invalid or expired authentication token",
-            headers={"WWW-Authenticate": "Bearer"},
-        )
-
-    email = payload.get("sub")
-    if not email:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Invalid token payload",
-        )
-
-    user = await sync_to_async(User.objects.filter(email=email).first)()
-
-    if not user:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="User not found",
-        )
-
-    return user
-
-
 @router.post("/login", response_model=Token)
 def login_for_access_token(
     request: Request, 
@@ -1,20 +1,25 @@
 
 from fastapi import APIRouter, Depends, HTTPException, Query
 from typing import List, Optional
-from datetime import datetime, date, timedelta
+from datetime import datetime, date, timedelta, timezone as dt_timezone
 import secrets
 from asgiref.sync import sync_to_async
-from django_backend.models import Event, EventAttendee, EventReminder, Meeting, ChatRoom
+from django_backend.models import Event, EventAttendee, Meeting, ChatRoom
 from django.contrib.auth import get_user_model
-from fastapi_app.schemas.calendar_schemas import EventCreate, EventRead 
-from django.contrib.auth import get_user_model
-from fastapi_app.schemas.calendar_schemas import EventCreate, EventRead 
-from fastapi_app.routers.auth import get_current_user
+from fastapi_app.schemas.calendar_schemas import EventCreate, EventRead, FreeBusyRequest, FreeBusyResponse
+from fastapi_app.dependencies.auth import get_current_user
 from fastapi_app.tasks import process_event_invites
+from fastapi_app.core.calendar_query import events_in_range, day_range, week_range, month_range
+from fastapi_app.core.freebusy import free_busy
+from fastapi_app.core.reminders import schedule_reminders, reschedule_reminders
+from fastapi_app.core.attendees import invite_attendees, add_room_members
 
 User = get_user_model()
 router = APIRouter(prefix="/calendar", tags=["Calendar"])
 
+MAX_FREEBUSY_USERS = 500
+MAX_FREEBUSY_RANGE = timedelta(days=62)
+
 async def _get_event_or_404(event_id: int) -> Event:
     """
     Returns Event instance or raises 404.
@@ -24,11 +29,16 @@ async def _get_event_or_404(event_id: int) -> Event:
         raise HTTPException(status_code=404, detail="Event not found")
     return ev
 
-def _start_of_week(d: date) -> date:
-    return d - timedelta(days=d.weekday())
+def _parse_date(value: Optional[str]) -> date:
+    if not value:
+        return datetime.utcnow().date()
+    try:
+        return datetime.strptime(value, "%Y-%m-%d").date()
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid date format. Use YYYY-MM-DD")
 
-def _end_of_week(d: date) -> date:
-    return _start_of_week(d) + timedelta(days=6)
+async def _events_between(user, start: datetime, end: datetime):
+    return await sync_to_async(events_in_range)(user, start, end)
 
 @router.post("/events", response_model=EventRead, status_code=201)
 async def create_event(
@@ -60,17 +70,8 @@ async def create_event(
             name=f"Chat: {payload.title}",
             is_group=True
         )
-        await sync_to_async(chat_room.participants.add)(current_user)
-        
-        if payload.attendees:
-            for uid in payload.attendees:
-                if uid == current_user.id:
-                    continue
-                
-                u = await sync_to_async(User.objects.filter(id=uid).first)()
-                if u:
-                    await sync_to_async(chat_room.participants.add)(u)
-        
+        await sync_to_async(add_room_members)(chat_room, [current_user.id, *(payload.attendees or [])])
+
         meeting_code = secrets.token_urlsafe(8)
         meeting = await sync_to_async(Meeting.objects.create)(
             host=current_user,
@@ -84,34 +85,12 @@ async def create_event(
         event.url = f"https://meet.jit.si/Stackly-Meeting-{meeting_code}"
         await sync_to_async(event.save)()
     
-    await sync_to_async(EventAttendee.objects.get_or_create)(
-        event=event,
-        user=current_user,
-        defaults={"status": "accepted"}
-    )
-
+    await sync_to_async(invite_attendees)(event, [current_user.id], status="accepted")
     if payload.attendees:
-        for user_id in payload.attendees:
-
-            if user_id == current_user.id:
-                continue
-
-            user = await sync_to_async(User.objects.filter(id=user_id).first)()
-            if not user:
-                continue  
-
-            await sync_to_async(EventAttendee.objects.get_or_create)(
-                event=event,
-                user=user,
-                defaults={"status": "pending"}
-            )
+        await sync_to_async(invite_attendees)(event, payload.attendees)
 
     if payload.reminders:
-        for minutes in payload.reminders:
-            await sync_to_async(EventReminder.objects.create)(
-                event=event,
-                minutes_before=minutes
-            )
+        await sync_to_async(schedule_reminders)(event, payload.reminders)
 
     fresh_event = await sync_to_async(
         Event.objects.select_related("created_by").get
@@ -121,6 +100,90 @@ async def create_event(
     return fresh_event
 
 
+@router.get("/events", response_model=List[EventRead])
+async def list_events(
+    start: datetime = Query(..., description="Range start (ISO 8601)"),
+    end: datetime = Query(..., description="Range end, exclusive (ISO 8601)"),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Events the user created or is invited to that overlap [start, end),
+    with recurring events expanded into their occurrences. Times without
+    an offset are taken as UTC.
+    """
+    if start.tzinfo is None:
+        start = start.replace(tzinfo=dt_timezone.utc)
+    if end.tzinfo is None:
+        end = end.replace(tzinfo=dt_timezone.utc)
+    if end <= start:
+        raise HTTPException(status_code=400, detail="end must be after start")
+    return await _events_between(current_user, start, end)
+
+
+@router.get("/events/day", response_model=List[EventRead])
+async def list_events_for_day(date_str: Optional[str] = Query(None, description="YYYY-MM-DD"), current_user: User = Depends(get_current_user)):
+    """
+    Pass date=YYYY-MM-DD to list events for that day. Defaults to today.
+    Lists events where user is creator or attendee.
+    """
+    return await _events_between(current_user, *day_range(_parse_date(date_str)))
+
+
+@router.get("/events/week", response_model=List[EventRead])
+async def list_events_for_week(start_date: Optional[str] = Query(None, description="YYYY-MM-DD"), current_user: User = Depends(get_current_user)):
+    """
+    Provide start_date (YYYY-MM-DD) to choose week-start. Defaults to current week.
+    """
+    return await _events_between(current_user, *week_range(_parse_date(start_date)))
+
+
+@router.get("/events/month", response_model=List[EventRead])
+async def list_events_for_month(year: Optional[int] = Query(None), month: Optional[int] = Query(None), current_user: User = Depends(get_current_user)):
+    """
+    List events for a given year/month. Defaults to current month.
+    """
+    today = datetime.utcnow().date()
+    try:
+        bounds = month_range(year or today.year, month or today.month)
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid year/month")
+    return await _events_between(current_user, *bounds)
+
+
+@router.post("/freebusy", response_model=FreeBusyResponse)
+async def freebusy(payload: FreeBusyRequest, current_user: User = Depends(get_current_user)):
+    """
+    Busy intervals per user over [start, end) (no event details), plus the
+    gaps where all of them are free for at least duration_minutes.
+    """
+    start, end = payload.start, payload.end
+    if start.tzinfo is None:
+        start = start.replace(tzinfo=dt_timezone.utc)
+    if end.tzinfo is None:
+        end = end.replace(tzinfo=dt_timezone.utc)
+    if end <= start:
+        raise HTTPException(status_code=400, detail="end must be after start")
+    if end - start > MAX_FREEBUSY_RANGE:
+        raise HTTPException(status_code=400, detail=f"Range can be at most {MAX_FREEBUSY_RANGE.days} days")
+    if not payload.user_ids or len(payload.user_ids) > MAX_FREEBUSY_USERS:
+        raise HTTPException(status_code=400, detail=f"Pass between 1 and {MAX_FREEBUSY_USERS} user ids")
+    if payload.duration_minutes < 1:
+        raise HTTPException(status_code=400, detail="duration_minutes must be positive")
+
+    busy, slots = await sync_to_async(free_busy)(
+        payload.user_ids, start, end, timedelta(minutes=payload.duration_minutes), payload.max_slots
+    )
+    return {
+        "start": start,
+        "end": end,
+        "users": [
+            {"user_id": user_id, "busy": [{"start": s, "end": e} for s, e in intervals]}
+            for user_id, intervals in busy.items()
+        ],
+        "free_slots": [{"start": s, "end": e} for s, e in slots],
+    }
+
+
 @router.get("/events/{event_id}", response_model=EventRead)
 async def get_event(event_id: int, current_user: User = Depends(get_current_user)):
     event = await _get_event_or_404(event_id)
@@ -143,6 +206,7 @@ async def update_event(event_id: int, payload: EventCreate, current_user: User =
     if event.created_by_id != current_user.id:
         raise HTTPException(status_code=403, detail="Only the creator can edit the event")
 
+    schedule_before = (event.start_datetime, event.repeat_rule, event.timezone)
     for attr in (
         "title", "description", "start_datetime", "end_datetime", "is_all_day",
         "location", "url", "color", "repeat_rule", "timezone"
@@ -153,6 +217,8 @@ async def update_event(event_id: int, payload: EventCreate, current_user: User =
                 setattr(event, attr, val)
 
     await sync_to_async(event.save)()
+    if (event.start_datetime, event.repeat_rule, event.timezone) != schedule_before:
+        await sync_to_async(reschedule_reminders)(event)
 
     updated = await sync_to_async(Event.objects.select_related("created_by").get)(id=event.id)
     return updated
@@ -167,98 +233,6 @@ async def delete_event(event_id: int, current_user: User = Depends(get_current_u
     return {}
 
 
-@router.get("/events/day", response_model=List[EventRead])
-async def list_events_for_day(date_str: Optional[str] = Query(None, description="YYYY-MM-DD"), current_user: User = Depends(get_current_user)):
-    """
-    Pass date=YYYY-MM-DD to list events for that day. Defaults to today.
-    Lists events where user is creator or attendee.
-    """
-    if date_str:
-        try:
-            d = datetime.strptime(date_str, "%Y-%m-%d").date()
-        except Exception:
-            raise HTTPException(status_code=400, detail="Invalid date format. Use YYYY-MM-DD")
-    else:
-        d = datetime.utcnow().date()
-
-    start = datetime.combine(d, datetime.min.time())
-    end = datetime.combine(d, datetime.max.time())
-
-    qs = Event.objects.filter(start_datetime__lte=end, end_datetime__gte=start).distinct()
-
-    created_qs = qs.filter(created_by=current_user)
-    attendee_event_ids = EventAttendee.objects.filter(user=current_user).values_list("event_id", flat=True)
-    attendee_qs = qs.filter(id__in=attendee_event_ids)
-
-    final_qs = (created_qs | attendee_qs).select_related("created_by").order_by("start_datetime")
-
-    events = await sync_to_async(list)(final_qs)
-    return events
-
-
-@router.get("/events/week", response_model=List[EventRead])
-async def list_events_for_week(start_date: Optional[str] = Query(None, description="YYYY-MM-DD"), current_user: User = Depends(get_current_user)):
-    """
-    Provide start_date (YYYY-MM-DD) to choose week-start. Defaults to current week.
-    """
-    if start_date:
-        try:
-            sd = datetime.strptime(start_date, "%Y-%m-%d").date()
-        except Exception:
-            raise HTTPException(status_code=400, detail="Invalid date format. Use YYYY-MM-DD")
-    else:
-        sd = datetime.utcnow().date()
-
-    week_start = _start_of_week(sd)
-    week_end = _end_of_week(sd)
-
-    start_dt = datetime.combine(week_start, datetime.min.time())
-    end_dt = datetime.combine(week_end, datetime.max.time())
-
-    qs = Event.objects.filter(start_datetime__lte=end_dt, end_datetime__gte=start_dt).distinct()
-    created_qs = qs.filter(created_by=current_user)
-    attendee_event_ids = EventAttendee.objects.filter(user=current_user).values_list("event_id", flat=True)
-    attendee_qs = qs.filter(id__in=attendee_event_ids)
-    final_qs = (created_qs | attendee_qs).select_related("created_by").order_by("start_datetime")
-
-    events = await sync_to_async(list)(final_qs)
-    return events
-
-
-@router.get("/events/month", response_model=List[EventRead])
-async def list_events_for_month(year: Optional[int] = Query(None), month: Optional[int] = Query(None), current_user: User = Depends(get_current_user)):
-    """
-    List events for a given year/month. Defaults to current month.
-    """
-    today = datetime.utcnow().date()
-    if not year:
-        year = today.year
-    if not month:
-        month = today.month
-
-    try:
-        month_start = date(year, month, 1)
-    except Exception:
-        raise HTTPException(status_code=400, detail="Invalid year/month")
-
-    if month == 12:
-        next_month = date(year + 1, 1, 1)
-    else:
-        next_month = date(year, month + 1, 1)
-
-    start_dt = datetime.combine(month_start, datetime.min.time())
-    end_dt = datetime.combine(next_month - timedelta(days=1), datetime.max.time())
-
-    qs = Event.objects.filter(start_datetime__lte=end_dt, end_datetime__gte=start_dt).distinct()
-    created_qs = qs.filter(created_by=current_user)
-    attendee_event_ids = EventAttendee.objects.filter(user=current_user).values_list("event_id", flat=True)
-    attendee_qs = qs.filter(id__in=attendee_event_ids)
-    final_qs = (created_qs | attendee_qs).select_related("created_by").order_by("start_datetime")
-
-    events = await sync_to_async(list)(final_qs)
-    return events
-
-
 @router.post("/events/{event_id}/attendees", status_code=201)
 async def add_attendees(event_id: int, user_ids: List[int], current_user: User = Depends(get_current_user)):
     """
@@ -268,16 +242,7 @@ async def add_attendees(event_id: int, user_ids: List[int], current_user: User =
     if event.created_by_id != current_user.id:
         raise HTTPException(status_code=403, detail="Only the creator can add attendees")
 
-    added = []
-    for uid in user_ids:
-        user = await sync_to_async(User.objects.filter(id=uid).first)()
-        if not user:
-            continue
-        exists = await sync_to_async(EventAttendee.objects.filter(event=event, user=user).exists)()
-        if not exists:
-            await sync_to_async(EventAttendee.objects.create)(event=event, user=user, status="pending")
-            added.append(uid)
-
+    added = await sync_to_async(invite_attendees)(event, user_ids)
     return {"added": added}
 
 
@@ -1,21 +1,22 @@
 from django.db.models import Q
-from jose import JWTError, jwt
 from fastapi import status
-from fastapi_app.core.config import settings
 from pydantic import BaseModel
 from fastapi import APIRouter, Depends, HTTPException, WebSocket, WebSocketDisconnect, File, UploadFile, Query
 import json
 import re
 import secrets
-from django.core.files.base import ContentFile
 from typing import List, Optional
 from django.contrib.auth import get_user_model
 from asgiref.sync import sync_to_async
 from fastapi_app.routers.notifications import create_notification
-from django_backend.models import ChatRoom, ChatMessage, Email, MessageReaction
-from fastapi_app.schemas.chat_schemas import ChatRoomCreate, ChatRoomRead, MessageRead, ChatMemberUpdate, MessageUpdate, ForwardRequest
+from fastapi_app.tasks import fan_out_chat_notification
+from django_backend.models import ChatRoom, ChatMessage, ChatRoomReadState, Email, MessageReaction
+from fastapi_app.schemas.chat_schemas import ChatRoomCreate, ChatRoomRead, MessageRead, MessageSeenBy, ChatMemberUpdate, MessageUpdate, ForwardRequest
 from fastapi_app.core.socket_manager import manager
-from fastapi_app.dependencies.auth import get_current_user
+from fastapi_app.core.message_serializer import serialize_messages
+from fastapi_app.core.room_summary import record_new_message, record_deleted_message, mark_room_read, seen_by
+from fastapi_app.core.blobs import store_blob
+from fastapi_app.dependencies.auth import get_current_user, authenticate_token
 
 router = APIRouter()
 User = get_user_model()
@@ -24,21 +25,10 @@ async def get_current_user_ws(token: str = Query(...)):
     """
     Validates the token passed in the WebSocket URL.
     """
-    credentials_exception = status.WS_1008_POLICY_VIOLATION
-    
-    try:
-        payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
-        email: str = payload.get("sub")
-        if email is None:
-            raise WebSocketDisconnect(code=credentials_exception)
-    except JWTError:
-        raise WebSocketDisconnect(code=credentials_exception)
-    
-    try:
-        user = await sync_to_async(User.objects.get)(email=email)
-        return user
-    except User.DoesNotExist:
-        raise WebSocketDisconnect(code=credentials_exception)
+    user = await authenticate_token(token)
+    if user is None:
+        raise WebSocketDisconnect(code=status.WS_1008_POLICY_VIOLATION)
+    return user
     
 
 @router.post("/rooms", response_model=ChatRoomRead)
@@ -91,145 +81,132 @@ def search_messages(
         room__id__in=user_room_ids,   
         is_deleted=False,             
         content__icontains=q         
-    ).select_related('parent', 'parent__sender').prefetch_related('reactions', 'reactions__user').order_by("-timestamp")
-    
-    results = []
-    for m in msgs:
-        url = None
-        if m.attachment:
-            try:
-                url = m.attachment.url
-            except ValueError:
-                url = None  
-
-        reaction_map = {}
-        for r in m.reactions.all():
-            if r.emoji not in reaction_map:
-                reaction_map[r.emoji] = {"count": 0, "emails": []}
-            reaction_map[r.emoji]["count"] += 1
-            reaction_map[r.emoji]["emails"].append(r.user.email)
-
-        reactions_list = [
-            {"emoji": k, "count": v["count"], "user_emails": v["emails"]}
-            for k, v in reaction_map.items()
-        ]
-
-        results.append({
-            "id": m.id,
-            "sender_email": m.sender.email,
-            "content": m.content,
-            "attachment_url": url,
-            "timestamp": m.timestamp,
-            "read_count": m.read_by.count(),
-            "is_starred": m.starred_by.filter(id=current_user.id).exists(),
-            "parent_id": m.parent.id if m.parent else None,
-            "parent_content": m.parent.content if m.parent else None,
-            "parent_sender": m.parent.sender.email if m.parent else None,
-            "reactions": reactions_list,
-            "is_forwarded": m.is_forwarded
-        })
-
-    return results
+    ).order_by("-timestamp")
+
+    return serialize_messages(msgs, current_user)
 
 @router.get("/rooms", response_model=List[ChatRoomRead])
 def list_rooms(current_user = Depends(get_current_user)):
     """
     List rooms with Unread Count AND Last Message Preview.
-    """
-    rooms = current_user.chat_rooms.all().prefetch_related('messages', 'participants')
 
-    results = []
-    for room in rooms:
-        unread_count = room.messages.filter(is_deleted=False).exclude(read_by=current_user).count()
-
-        last_msg_obj = room.messages.filter(is_deleted=False).order_by("-timestamp").first()
-        
-        last_message_data = None
-        if last_msg_obj:
-            last_message_data = {
-                "id": last_msg_obj.id,
-                "sender_email": last_msg_obj.sender.email,
-                "content": last_msg_obj.content,
-                "attachment_url": last_msg_obj.attachment.url if last_msg_obj.attachment else None,
-                "timestamp": last_msg_obj.timestamp,
-                "read_count": last_msg_obj.read_by.count(),
-                "is_starred": last_msg_obj.starred_by.filter(id=current_user.id).exists()
-            }
+    Everything comes from the user's ChatRoomReadState rows and the rooms'
+    last_message pointers, so the cost does not grow with message volume:
+    one query for the rooms, one for participants and the fixed batch in
+    serialize_messages for the previews. Most recently active rooms first.
+    """
+    states = list(
+        ChatRoomReadState.objects
+        .filter(user=current_user)
+        .select_related("room")
+        .prefetch_related("room__participants")
+        .order_by("-room__last_message_id", "-room_id")
+    )
 
-        results.append({
-            "id": room.id,
-            "name": room.name,
-            "is_group": room.is_group,
-            "unread_count": unread_count,       
-            "last_message": last_message_data,
-            "participants": [u.email for u in room.participants.all()] 
-        })
+    last_ids = [s.room.last_message_id for s in states if s.room.last_message_id]
+    last_messages = {
+        m["id"]: m
+        for m in serialize_messages(ChatMessage.objects.filter(id__in=last_ids), current_user)
+    }
 
-    return results
+    return [
+        {
+            "id": s.room.id,
+            "name": s.room.name,
+            "is_group": s.room.is_group,
+            "unread_count": s.unread_count,
+            "last_message": last_messages.get(s.room.last_message_id),
+            "participants": [u.email for u in s.room.participants.all()]
+        }
+        for s in states
+    ]
 
 
 @router.get("/online", response_model=List[int])
 def get_online_users(current_user = Depends(get_current_user)):
     return manager.get_online_users()
 
+HISTORY_PAGE_SIZE = 50
+MAX_HISTORY_PAGE_SIZE = 200
+
+
+def _older_than(msgs, timestamp, message_id, inclusive=False):
+    """Keyset filter on (timestamp, id), written so the index can seek on timestamp."""
+    tie = Q(id__lte=message_id) if inclusive else Q(id__lt=message_id)
+    return msgs.filter(Q(timestamp__lte=timestamp), Q(timestamp__lt=timestamp) | tie)
+
+
+def _newer_than(msgs, timestamp, message_id, inclusive=False):
+    tie = Q(id__gte=message_id) if inclusive else Q(id__gt=message_id)
+    return msgs.filter(Q(timestamp__gte=timestamp), Q(timestamp__gt=timestamp) | tie)
+
+
+def _history_window(room, msgs, before=None, after=None, around=None, limit=HISTORY_PAGE_SIZE):
+    """
+    Returns the ids of one window of room history, oldest first.
+
+    Every mode seeks on the (room, timestamp, id) index and reads at most
+    `limit` rows, so scrolling back costs the same at any depth.
+    """
+    def anchor(message_id):
+        row = room.messages.filter(id=message_id).values_list("timestamp", "id").first()
+        if not row:
+            raise HTTPException(status_code=404, detail="Message not found in this room")
+        return row
+
+    def older(qs, n):
+        ids = list(qs.order_by("-timestamp", "-id").values_list("id", flat=True)[:n])
+        ids.reverse()
+        return ids
+
+    def newer(qs, n):
+        return list(qs.order_by("timestamp", "id").values_list("id", flat=True)[:n])
+
+    if around is not None:
+        ts, mid = anchor(around)
+        half = limit // 2
+        return older(_older_than(msgs, ts, mid), half) + newer(_newer_than(msgs, ts, mid, inclusive=True), limit - half)
+    if before is not None:
+        return older(_older_than(msgs, *anchor(before)), limit)
+    if after is not None:
+        return newer(_newer_than(msgs, *anchor(after)), limit)
+    return older(msgs, limit)
+
+
 @router.get("/rooms/{room_id}/messages", response_model=List[MessageRead])
 def get_messages(
     room_id: int, 
     q: Optional[str] = Query(None, description="Search within this room"), 
+    before: Optional[int] = Query(None, description="Messages older than this message id"),
+    after: Optional[int] = Query(None, description="Messages newer than this message id"),
+    around: Optional[int] = Query(None, description="Jump to message: a window centered on this message id"),
+    limit: int = Query(HISTORY_PAGE_SIZE, ge=1, le=MAX_HISTORY_PAGE_SIZE),
     current_user = Depends(get_current_user)
 ):
+    """
+    Room history in windows of `limit` messages, oldest first.
+    With no cursor the latest page is returned; pass the first id of a page
+    as `before` to scroll back, the last id as `after` to scroll forward.
+    """
     try:
         room = ChatRoom.objects.get(id=room_id)
-        if current_user not in room.participants.all():
+        if not room.participants.filter(id=current_user.id).exists():
              raise HTTPException(status_code=403, detail="Not a participant")
     except ChatRoom.DoesNotExist:
         raise HTTPException(status_code=404, detail="Room not found")
 
-    msgs = room.messages.filter(is_deleted=False).select_related('parent', 'parent__sender').prefetch_related('reactions', 'reactions__user')
+    if sum(cursor is not None for cursor in (before, after, around)) > 1:
+        raise HTTPException(status_code=400, detail="Use only one of before, after or around")
+
+    msgs = room.messages.filter(is_deleted=False)
     
     if q:
         msgs = msgs.filter(content__icontains=q)
-        
-    msgs = msgs.order_by("timestamp")
-    
-    results = []
-    for m in msgs:
-        url = None
-        if m.attachment:
-            try:
-                url = m.attachment.url
-            except ValueError:
-                url = None  
-
-        reaction_map = {}
-        for r in m.reactions.all():
-            if r.emoji not in reaction_map:
-                reaction_map[r.emoji] = {"count": 0, "emails": []}
-            reaction_map[r.emoji]["count"] += 1
-            reaction_map[r.emoji]["emails"].append(r.user.email)
-
-        reactions_list = [
-            {"emoji": k, "count": v["count"], "user_emails": v["emails"]}
-            for k, v in reaction_map.items()
-        ]
-
-        results.append({
-            "id": m.id,
-            "sender_email": m.sender.email,
-            "content": m.content,
-            "attachment_url": url,
-            "timestamp": m.timestamp,
-            "read_count": m.read_by.count(),
-            "is_starred": m.starred_by.filter(id=current_user.id).exists(),
-            
-            "parent_id": m.parent.id if m.parent else None,
-            "parent_content": m.parent.content if m.parent else None,
-            "parent_sender": m.parent.sender.email if m.parent else None,
-            "reactions": reactions_list,
-            "is_forwarded": m.is_forwarded    
-        })
 
-    return results
+    ids = _history_window(room, msgs, before=before, after=after, around=around, limit=limit)
+    page = ChatMessage.objects.filter(id__in=ids).order_by("timestamp", "id")
+
+    return serialize_messages(page, current_user)
 
 @router.patch("/messages/{message_id}", response_model=MessageRead)
 async def edit_message(
@@ -259,15 +236,7 @@ async def edit_message(
 
     @sync_to_async
     def get_response_data():
-        return {
-            "id": msg.id,
-            "sender_email": msg.sender.email,  
-            "content": msg.content,
-            "attachment_url": msg.attachment.url if msg.attachment else None,
-            "timestamp": msg.timestamp,
-            "read_count": msg.read_by.count(), 
-            "is_starred": msg.starred_by.filter(id=current_user.id).exists() 
-        }
+        return serialize_messages(ChatMessage.objects.filter(id=msg.id), current_user)[0]
 
     return await get_response_data()
 
@@ -278,25 +247,27 @@ async def mark_room_as_read(
 ):
     """
     Marks all messages in the room as 'Read' by the current user.
+
+    Only the user's read marker moves, so this is a single UPDATE however
+    many messages were waiting.
     """
     @sync_to_async
     def process_read_receipts():
-        try:
-            room = ChatRoom.objects.get(id=room_id)
-            if current_user not in room.participants.all():
-                raise PermissionError("Not a participant")
-            
-            unread_msgs = room.messages.exclude(read_by=current_user)
-            count = unread_msgs.count()
-            
-            for msg in unread_msgs:
-                msg.read_by.add(current_user)
-                
-            return count
-            
-        except ChatRoom.DoesNotExist:
+        if not ChatRoom.objects.filter(id=room_id).exists():
             return None
 
+        count = (
+            ChatRoomReadState.objects
+            .filter(room_id=room_id, user=current_user)
+            .values_list("unread_count", flat=True)
+            .first()
+        )
+        if count is None:
+            raise PermissionError("Not a participant")
+
+        mark_room_read(room_id, current_user)
+        return count
+
     try:
         count = await process_read_receipts()
     except PermissionError:
@@ -318,8 +289,10 @@ def delete_message(message_id: int, current_user: User = Depends(get_current_use
     if msg.sender != current_user:
         raise HTTPException(status_code=403, detail="You can only delete your own messages")
 
-    msg.is_deleted = True
-    msg.save()
+    if not msg.is_deleted:
+        msg.is_deleted = True
+        msg.save()
+        record_deleted_message(msg)
     
     return None
 
@@ -329,37 +302,9 @@ def chat_trash(current_user = Depends(get_current_user)):
     msgs = ChatMessage.objects.filter(
         sender=current_user, 
         is_deleted=True
-    ).select_related('parent', 'parent__sender').prefetch_related('reactions', 'reactions__user').order_by("-timestamp")
-
-    results = []
-    for m in msgs:
-        reaction_map = {}
-        for r in m.reactions.all():
-            if r.emoji not in reaction_map:
-                reaction_map[r.emoji] = {"count": 0, "emails": []}
-            reaction_map[r.emoji]["count"] += 1
-            reaction_map[r.emoji]["emails"].append(r.user.email)
-        
-        reactions_list = [
-            {"emoji": k, "count": v["count"], "user_emails": v["emails"]}
-            for k, v in reaction_map.items()
-        ]
-
-        results.append({
-            "id": m.id,
-            "sender_email": m.sender.email,
-            "content": m.content,
-            "attachment_url": m.attachment.url if m.attachment else None,
-            "timestamp": m.timestamp,
-            "read_count": m.read_by.count(),
-            "is_starred": m.starred_by.filter(id=current_user.id).exists(),
-            "parent_id": m.parent.id if m.parent else None,
-            "parent_content": m.parent.content if m.parent else None,
-            "parent_sender": m.parent.sender.email if m.parent else None,
-            "reactions": reactions_list,
-            "is_forwarded": m.is_forwarded
-        })
-    return results
+    ).order_by("-timestamp")
+
+    return serialize_messages(msgs, current_user)
 
 
 @router.post("/messages/{message_id}/star")
@@ -381,6 +326,23 @@ def star_message(message_id: int, current_user: User = Depends(get_current_user)
 
     return {"message": "Star updated", "is_starred": is_starred}
 
+
+@router.get("/messages/{message_id}/seen-by", response_model=MessageSeenBy)
+def message_seen_by(message_id: int, current_user: User = Depends(get_current_user)):
+    """
+    Who has read a message, derived from the participants' read markers.
+    """
+    try:
+        msg = ChatMessage.objects.get(id=message_id, is_deleted=False)
+    except ChatMessage.DoesNotExist:
+        raise HTTPException(status_code=404, detail="Message not found")
+
+    if not msg.room.participants.filter(id=current_user.id).exists():
+        raise HTTPException(status_code=403, detail="Not authorized")
+
+    emails = seen_by(msg)
+    return {"message_id": msg.id, "read_count": len(emails), "seen_by": emails}
+
 def format_room_response(room):
     
     last_msg_obj = room.messages.order_by("-timestamp").first()
@@ -405,18 +367,7 @@ def format_room_response(room):
 @router.get("/starred", response_model=List[MessageRead])
 def get_my_starred_messages(current_user: User = Depends(get_current_user)):
     msgs = current_user.starred_chat_messages.all().order_by("-timestamp")
-    return [
-        {
-            "id": m.id,
-            "sender_email": m.sender.email,
-            "content": m.content,
-            "attachment_url": m.attachment.url if m.attachment else None,
-            "timestamp": m.timestamp,
-            "read_count": m.read_by.count(),
-            "is_starred": True 
-        }
-        for m in msgs
-    ]
+    return serialize_messages(msgs, current_user)
  
 @router.post("/rooms/{room_id}/upload")
 async def upload_chat_attachment(
@@ -428,29 +379,23 @@ async def upload_chat_attachment(
     def save_attachment_to_db():
         try:
             room = ChatRoom.objects.get(id=room_id)
-            if current_user not in room.participants.all():
+            if not room.participants.filter(id=current_user.id).exists():
                 raise PermissionError("Not a participant")
             
-            file_content = file.file.read()
-            
+            blob = store_blob(file.file, file.filename)
+
             msg = ChatMessage.objects.create(
                 room=room,
                 sender=current_user,
                 content=f"Sent a file: {file.filename}", 
-                attachment=None 
+                attachment=blob.file.name,
+                blob=blob
+            )
+            record_new_message(msg)
+
+            fan_out_chat_notification.delay(
+                room.id, current_user.id, f"{current_user.email} sent a file in {room.name or 'Chat'}"
             )
-        
-            msg.attachment.save(file.filename, ContentFile(file_content))
-            msg.save()
-
-            for participant in room.participants.all():
-                if participant != current_user:
-                    create_notification(
-                        recipient=participant,
-                        message=f"{current_user.email} sent a file in {room.name or 'Chat'}",
-                        type_choice="chat",
-                        related_id=room.id
-                    )
 
             return msg, room
         except ChatRoom.DoesNotExist:
@@ -545,7 +490,7 @@ async def forward_message(
             
             target_room = ChatRoom.objects.get(id=request.target_room_id)
             
-            if current_user not in target_room.participants.all():
+            if not target_room.participants.filter(id=current_user.id).exists():
                 raise PermissionError("You are not a member of the target room")
 
             new_msg = ChatMessage.objects.create(
@@ -553,17 +498,14 @@ async def forward_message(
                 sender=current_user,
                 content=original_msg.content, 
                 attachment=original_msg.attachment, 
+                blob_id=original_msg.blob_id,
                 is_forwarded=True
             )
+            record_new_message(new_msg)
             
-            for participant in target_room.participants.all():
-                if participant != current_user:
-                    create_notification(
-                        recipient=participant,
-                        message=f"Forwarded message from {current_user.email}",
-                        type_choice="chat",
-                        related_id=target_room.id
-                    )
+            fan_out_chat_notification.delay(
+                target_room.id, current_user.id, f"Forwarded message from {current_user.email}"
+            )
 
             return new_msg, target_room.id
 
@@ -605,7 +547,7 @@ async def send_text_message(
     def save_text_message():
         try:
             room = ChatRoom.objects.get(id=room_id)
-            if current_user not in room.participants.all():
+            if not room.participants.filter(id=current_user.id).exists():
                 raise PermissionError("Not a participant")
             
             parent_msg = None
@@ -621,16 +563,10 @@ async def send_text_message(
                 content=data.content,
                 parent=parent_msg
             )
+            record_new_message(msg)
             process_mentions(msg)
 
-            for participant in room.participants.all():
-                if participant != current_user:
-                    create_notification(
-                        recipient=participant,
-                        message=f"New message from {current_user.email}",
-                        type_choice="chat",
-                        related_id=room.id
-                    )
+            fan_out_chat_notification.delay(room.id, current_user.id, f"New message from {current_user.email}")
 
             parent_info = None
             if parent_msg:
@@ -688,6 +624,7 @@ async def websocket_endpoint(websocket: WebSocket, room_id: int, user_id: int):
             content=content,
             parent=parent_msg 
         )
+        record_new_message(msg)
         process_mentions(msg)
 
         parent_info = None
@@ -730,6 +667,7 @@ async def websocket_endpoint(websocket: WebSocket, room_id: int, user_id: int):
                     content=content,
                     message_type='SYSTEM' 
                 )
+                await sync_to_async(record_new_message)(msg_obj)
 
                 response = {
                     "type": "system_alert",
@@ -839,6 +777,7 @@ async def start_call(
             sender=current_user,
             content=f" started a call. Click to join: {join_url}"
         )
+        record_new_message(msg)
         return msg
 
     msg_obj = await create_call_message()
@@ -878,26 +817,7 @@ def get_my_mentions(current_user: User = Depends(get_current_user)):
     Returns all messages where the current user was tagged (@Name).
     """
     msgs = current_user.mentioned_in_messages.filter(is_deleted=False).order_by("-timestamp")
-    
-    results = []
-    for m in msgs:
-        url = None
-        if m.attachment:
-            try:
-                url = m.attachment.url
-            except ValueError:
-                pass
-
-        results.append({
-            "id": m.id,
-            "sender_email": m.sender.email,
-            "content": m.content,
-            "attachment_url": url,
-            "timestamp": m.timestamp,
-            "read_count": m.read_by.count(),
-            "is_starred": m.starred_by.filter(id=current_user.id).exists()
-        })
-    return results            
+    return serialize_messages(msgs, current_user)
 
 @router.websocket("/ws/{user_id}")
 async def status_websocket(
@@ -911,10 +831,10 @@ async def status_websocket(
         await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
         return
 
-    await manager.connect(websocket, user_id, user_id)
+    await manager.connect(websocket, None, user_id)
     
     try:
         while True:
             await websocket.receive_text()
     except WebSocketDisconnect:
-       await manager.disconnect(websocket, user_id, user_id)
\ No newline at end of file
+       await manager.disconnect(websocket, None, user_id)
\ No newline at end of file
@@ -1,9 +1,14 @@
-from fastapi import APIRouter, UploadFile, File, Depends, HTTPException
+import io
+from uuid import UUID
+from fastapi import APIRouter, UploadFile, File, Depends, HTTPException, Query, Request
 from asgiref.sync import sync_to_async
-from django_backend.models import DriveFile
-from fastapi_app.schemas.drive_schemas import DriveFileRead
-from fastapi_app.routers.auth import get_current_user
-from django.core.files.base import ContentFile
+from django.db import transaction
+from django_backend.models import DriveFile, UploadSession
+from fastapi_app.schemas.drive_schemas import DriveFileRead, UploadSessionCreate, UploadSessionRead
+from fastapi_app.dependencies.auth import get_current_user
+from fastapi_app.core.config import settings
+from fastapi_app.core.blobs import store_blob
+from fastapi_app.core.uploads import partial_path, chunk_spool, commit_chunk, discard_partial
 
 
 router = APIRouter(prefix="/drive", tags=["Drive"])
@@ -14,22 +19,23 @@ async def upload_file(
     file: UploadFile = File(...),
     current_user=Depends(get_current_user)
 ):
-    try:
-        content = await file.read()
-
-     
-        drive_file = await sync_to_async(DriveFile.objects.create)(
+    """
+    One-shot upload. The multipart body is already spooled to a temporary
+    file; it goes into the blob store, so content that is already stored
+    is not written again.
+    """
+    @sync_to_async
+    def save_upload():
+        blob = store_blob(file.file, file.filename)
+        return DriveFile.objects.create(
             owner=current_user,
             original_name=file.filename,
-            size=len(content),
             content_type=file.content_type or "application/octet-stream",
+            **_blob_fields(blob),
         )
 
-        
-        await sync_to_async(drive_file.file.save)(
-            file.filename,
-            ContentFile(content),
-        )
+    try:
+        drive_file = await save_upload()
 
         return {
             "message": "File uploaded successfully",
@@ -45,6 +51,147 @@ async def upload_file(
         )
 
 
+def _blob_fields(blob):
+    return {"blob": blob, "file": blob.file.name, "size": blob.size, "sha256": blob.sha256}
+
+
+def _session_response(session):
+    return {
+        "upload_id": session.id,
+        "file_name": session.original_name,
+        "offset": session.received,
+        "total_size": session.total_size,
+        "chunk_size": settings.UPLOAD_CHUNK_SIZE,
+    }
+
+
+def _get_session(upload_id, user):
+    try:
+        return UploadSession.objects.get(id=upload_id, owner=user)
+    except UploadSession.DoesNotExist:
+        raise HTTPException(status_code=404, detail="Upload session not found")
+
+
+@router.post("/uploads", response_model=UploadSessionRead)
+async def start_upload(data: UploadSessionCreate, current_user=Depends(get_current_user)):
+    """
+    Starts a resumable upload. Send the bytes with PUT /uploads/{upload_id}
+    in any number of chunks, then call POST /uploads/{upload_id}/complete.
+    """
+    session = await sync_to_async(UploadSession.objects.create)(
+        owner=current_user,
+        original_name=data.file_name,
+        content_type=data.content_type or "application/octet-stream",
+        total_size=data.total_size,
+    )
+    return _session_response(session)
+
+
+@router.get("/uploads/{upload_id}", response_model=UploadSessionRead)
+async def upload_status(upload_id: UUID, current_user=Depends(get_current_user)):
+    """
+    Where to resume an interrupted upload: `offset` is the number of bytes
+    received so far.
+    """
+    session = await sync_to_async(_get_session)(upload_id, current_user)
+    return _session_response(session)
+
+
+@router.put("/uploads/{upload_id}", response_model=UploadSessionRead)
+async def upload_chunk(
+    upload_id: UUID,
+    request: Request,
+    offset: int = Query(..., ge=0),
+    current_user=Depends(get_current_user)
+):
+    """
+    Appends the raw request body at `offset`, which must equal the bytes
+    received so far. The body is streamed to a private temporary file and
+    only copied into the upload once this request has claimed the offset,
+    so a competing request for the same offset can never overwrite it.
+    """
+    session = await sync_to_async(_get_session)(upload_id, current_user)
+    if offset != session.received:
+        raise HTTPException(
+            status_code=409,
+            detail=f"Expected offset {session.received}"
+        )
+
+    spool = await sync_to_async(chunk_spool)()
+    try:
+        written = 0
+        buffer = bytearray()
+        async for piece in request.stream():
+            buffer += piece
+            if session.total_size is not None and offset + written + len(buffer) > session.total_size:
+                raise HTTPException(status_code=400, detail="Upload exceeds declared size")
+            if len(buffer) >= settings.UPLOAD_CHUNK_SIZE:
+                await sync_to_async(spool.write)(bytes(buffer))
+                written += len(buffer)
+                buffer.clear()
+        if buffer:
+            await sync_to_async(spool.write)(bytes(buffer))
+            written += len(buffer)
+
+        claimed = await sync_to_async(commit_chunk)(session.id, offset, spool, written)
+    finally:
+        spool.close()
+    if not claimed:
+        raise HTTPException(status_code=409, detail="Concurrent upload to the same offset")
+
+    session.received = offset + written
+    return _session_response(session)
+
+
+@router.post("/uploads/{upload_id}/complete")
+async def complete_upload(upload_id: UUID, current_user=Depends(get_current_user)):
+    """
+    Moves the assembled file into the blob store.
+    """
+    @sync_to_async
+    def finish():
+        session = _get_session(upload_id, current_user)
+        if session.total_size is not None and session.received != session.total_size:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Upload incomplete: {session.received} of {session.total_size} bytes"
+            )
+
+        if session.received:
+            with open(partial_path(session.id), "rb") as fh:
+                blob = store_blob(fh, session.original_name)
+        else:
+            blob = store_blob(io.BytesIO(), session.original_name)
+
+        with transaction.atomic():
+            drive_file = DriveFile.objects.create(
+                owner=current_user,
+                original_name=session.original_name,
+                content_type=session.content_type,
+                **_blob_fields(blob),
+            )
+            session.delete()
+        discard_partial(upload_id)
+        return drive_file
+
+    drive_file = await finish()
+    return {
+        "message": "File uploaded successfully",
+        "file_id": drive_file.id,
+        "file_name": drive_file.original_name,
+        "size": drive_file.size,
+        "sha256": drive_file.sha256,
+    }
+
+
+@router.delete("/uploads/{upload_id}", status_code=204)
+async def abort_upload(upload_id: UUID, current_user=Depends(get_current_user)):
+    session = await sync_to_async(_get_session)(upload_id, current_user)
+    await sync_to_async(session.delete)()
+    discard_partial(upload_id)
+    return None
+
+
 @router.get("/my-files", response_model=list[DriveFileRead])
 async def my_files(current_user=Depends(get_current_user)):
     files = await sync_to_async(list)(
@@ -1,24 +1,24 @@
 from datetime import date
 from typing import List
-from fastapi import APIRouter, Depends, HTTPException, status, File, UploadFile, Form
+from fastapi import APIRouter, Depends, HTTPException, status, File, UploadFile, Form, Query
 from django.contrib.auth import get_user_model
 from typing import Optional, Union
 from django.utils import timezone
-from django.core.files.base import ContentFile
-from django_backend.models import Email, User, Attachment
+from django_backend.models import Email, User, Attachment, DocumentConversion
 from django.db.models import Q
 from fastapi_app.schemas.email_schemas import EmailCreate, EmailReply, EmailUpdate, DraftCreate, BulkReadRequest
 from fastapi_app.dependencies.auth import get_current_user 
 from asgiref.sync import sync_to_async 
 from fastapi_app.schemas.email_schemas import EmailRead
 from fastapi_app.routers.notifications import create_notification
+from fastapi_app.core.mailbox import list_folder, DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
+from fastapi_app.core.blobs import store_blob
 from fastapi import UploadFile, File
-from pathlib import Path
-import shutil
 import os
 from fastapi import UploadFile
 
-from fastapi_app.utils.file_convert import docx_to_pdf
+from fastapi_app.core.conversions import needs_conversion, pdf_name, attach_blob
+from fastapi_app.tasks import attach_converted_document
 
 
 router = APIRouter()
@@ -41,7 +41,7 @@ def ensure_stackly_email(email: str):
         
 def get_attachments(email_obj):
     return [
-        {"filename": a.file.name, "url": a.file.url} 
+        {"filename": a.file_name or a.file.name, "url": a.file.url} 
         for a in email_obj.attachments.all()
     ]        
 
@@ -81,38 +81,33 @@ def send_email(
         )
 
     file_url = None
+    attachment_pending = False
 
-  
     if file and file.filename:
-        upload_dir = Path("media/temp")
-        upload_dir.mkdir(parents=True, exist_ok=True)
-
-        temp_path = upload_dir / file.filename
-
-        with open(temp_path, "wb") as buffer:
-            shutil.copyfileobj(file.file, buffer)
-
-        ext = temp_path.suffix.lower()
-
-   
-        if ext in [".doc", ".docx"]:
-            pdf_path = temp_path.with_suffix(".pdf")
-            docx_to_pdf(temp_path, pdf_path)
-            final_path = pdf_path
+        source = store_blob(file.file, file.filename)
+
+        # Word documents are sent as PDF. Converting takes seconds, so it
+        # runs in Celery and the PDF is attached when it is ready, unless
+        # the same document has been converted before.
+        if needs_conversion(file.filename):
+            conversion, created = DocumentConversion.objects.get_or_create(source=source)
+            if not created:
+                DocumentConversion.objects.filter(id=conversion.id).update(last_used_at=timezone.now())
+            if conversion.status == "DONE":
+                file_url = attach_blob(email_obj.id, conversion.result, pdf_name(file.filename)).file.url
+            elif conversion.status == "FAILED":
+                file_url = attach_blob(email_obj.id, source, file.filename).file.url
+            else:
+                attach_converted_document.delay(email_obj.id, conversion.id, file.filename)
+                attachment_pending = True
         else:
-            final_path = temp_path
-
-      
-        with open(final_path, "rb") as f:
-            attachment = Attachment(email=email_obj)
-            attachment.file.save(final_path.name, ContentFile(f.read()))
-            attachment.save()
-            file_url = attachment.file.url
+            file_url = attach_blob(email_obj.id, source, file.filename).file.url
 
     return {
         "message": "Email sent successfully", 
         "id": email_obj.id,
-        "attachment": file_url
+        "attachment": file_url,
+        "attachment_pending": attachment_pending
     }
 
 
@@ -147,65 +142,32 @@ def inbox(
     sender: Optional[str] = None,
     date_from: Optional[date] = None,
     date_to: Optional[date] = None,
+    cursor: Optional[str] = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
     
     current_user: User = Depends(get_current_user)
 ):
-    
-    msgs = Email.objects.filter(
-        receiver=current_user, 
-        is_deleted_by_receiver=False,
-        status='SENT',
-        is_archived=False 
-    )
-
-    if q:
-        msgs = msgs.filter(
-            Q(subject__icontains=q) | Q(body__icontains=q)
-        )
+    filters = Q()
 
     if sender:
-        msgs = msgs.filter(sender__email__icontains=sender)
+        filters &= Q(sender__email__icontains=sender)
 
     if date_from:
-        msgs = msgs.filter(created_at__date__gte=date_from) 
+        filters &= Q(created_at__date__gte=date_from)
     if date_to:
-        msgs = msgs.filter(created_at__date__lte=date_to)   
+        filters &= Q(created_at__date__lte=date_to)
 
-    msgs = msgs.order_by("-created_at")
-
-    return [
-        {
-            "id": m.id,
-            "from": m.sender.email,
-            "subject": m.subject,
-            "body": m.body,
-            "date": m.created_at,
-            "is_important": m.is_important,
-            "is_favorite": m.is_favorite,
-            "is_archived": m.is_archived,
-            "attachments": get_attachments(m)
-        }
-        for m in msgs
-    ]
+    return list_folder(current_user, "inbox", cursor=cursor, limit=limit, extra_filter=filters, search=q)
 
 
 @router.get("/sent")
-def sent(current_user: User = Depends(get_current_user)):
-    msgs = Email.objects.filter(
-        sender=current_user, 
-        is_deleted_by_sender=False
-    ).order_by("-created_at")
-
-    return [
-        {
-            "id": m.id,
-            "to": m.receiver.email,
-            "subject": m.subject,
-            "body": m.body,
-            "date": m.created_at,
-        }
-        for m in msgs
-    ]
+def sent(
+    q: Optional[str] = None,
+    cursor: Optional[str] = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    current_user: User = Depends(get_current_user)
+):
+    return list_folder(current_user, "sent", cursor=cursor, limit=limit, search=q)
 
 
 @router.get("/drafts", response_model=List[EmailRead])
@@ -416,104 +378,48 @@ def forward_email(
     for attachment in original.attachments.all():
         Attachment.objects.create(
             email=forwarded_email,
-            file=attachment.file 
+            file=attachment.file,
+            file_name=attachment.file_name,
+            blob_id=attachment.blob_id
         )
 
     return {"message": "Email forwarded", "id": forwarded_email.id}
 
 
 @router.get("/archived")
-def archived(current_user: User = Depends(get_current_user)):
-    msgs = Email.objects.filter(
-        receiver=current_user, 
-        is_deleted_by_receiver=False,
-        is_archived=True 
-    ).order_by("-created_at")
-
-    return [
-        {
-            "id": m.id,
-            "from": m.sender.email,
-            "subject": m.subject,
-            "body": m.body,
-            "date": m.created_at,
-            "is_important": m.is_important,
-            "is_favorite": m.is_favorite,
-            "is_archived": m.is_archived, 
-            "attachments": get_attachments(m)
-        }
-        for m in msgs
-    ]
+def archived(
+    cursor: Optional[str] = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    current_user: User = Depends(get_current_user)
+):
+    return list_folder(current_user, "archived", cursor=cursor, limit=limit)
     
 
 @router.get("/starred")
-def starred(current_user: User = Depends(get_current_user)):
-    
-    msgs = Email.objects.filter(
-        Q(receiver=current_user, is_deleted_by_receiver=False, is_favorite=True) |
-        Q(sender=current_user, is_deleted_by_sender=False, is_favorite=True)
-    ).order_by("-created_at")
-
-    return [
-        {
-            "id": m.id,
-            "from": m.sender.email,
-            "subject": m.subject,
-            "body": m.body,
-            "date": m.created_at,
-            "is_important": m.is_important,
-            "is_favorite": m.is_favorite,
-            "is_archived": m.is_archived,
-            "attachments": get_attachments(m)
-        }
-        for m in msgs
-    ]      
+def starred(
+    cursor: Optional[str] = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    current_user: User = Depends(get_current_user)
+):
+    return list_folder(current_user, "starred", cursor=cursor, limit=limit)
     
 
 @router.get("/important")
-def important(current_user: User = Depends(get_current_user)):
-    msgs = Email.objects.filter(
-        Q(receiver=current_user, is_deleted_by_receiver=False, is_important=True) |
-        Q(sender=current_user, is_deleted_by_sender=False, is_important=True)
-    ).order_by("-created_at")
-
-    return [
-        {
-            "id": m.id,
-            "from": m.sender.email,
-            "subject": m.subject,
-            "body": m.body,
-            "date": m.created_at,
-            "is_important": m.is_important,
-            "is_favorite": m.is_favorite,
-            "is_archived": m.is_archived,
-            "attachments": get_attachments(m)
-        }
-        for m in msgs
-    ]    
+def important(
+    cursor: Optional[str] = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    current_user: User = Depends(get_current_user)
+):
+    return list_folder(current_user, "important", cursor=cursor, limit=limit)
 
 
 @router.get("/trash")
-def trash(current_user: User = Depends(get_current_user)):
-    msgs = Email.objects.filter(
-        Q(receiver=current_user, is_deleted_by_receiver=True) | 
-        Q(sender=current_user, is_deleted_by_sender=True)
-    ).order_by("-created_at")
-
-    return [
-        {
-            "id": m.id,
-            "from": m.sender.email,
-            "subject": m.subject,
-            "body": m.body,
-            "date": m.created_at,
-            "is_important": m.is_important,
-            "is_favorite": m.is_favorite,
-            "is_archived": m.is_archived,
-            "attachments": get_attachments(m)
-        }
-        for m in msgs
-    ]
+def trash(
+    cursor: Optional[str] = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    current_user: User = Depends(get_current_user)
+):
+    return list_folder(current_user, "trash", cursor=cursor, limit=limit)
     
 
 @router.post("/{email_id}/restore")
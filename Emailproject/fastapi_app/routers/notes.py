@@ -3,7 +3,7 @@ from asgiref.sync import sync_to_async
 
 from django_backend.models import Note
 from ..schemas.note_schemas import NoteCreate, NoteUpdate, NoteRead
-from .auth import get_current_user
+from fastapi_app.dependencies.auth import get_current_user
 
 router = APIRouter(prefix="/notes", tags=["Notes"])
 
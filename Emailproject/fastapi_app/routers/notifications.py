@@ -25,9 +25,10 @@ def mark_as_read(
     except Notification.DoesNotExist:
         raise HTTPException(status_code=404, detail="Notification not found")
         
-def create_notification(recipient, message, type_choice="general"):
+def create_notification(recipient, message, type_choice="general", related_id=None):
     Notification.objects.create(
         recipient=recipient,
         message=message,
-        notification_type=type_choice
+        notification_type=type_choice,
+        object_id=related_id
     )
\ No newline at end of file
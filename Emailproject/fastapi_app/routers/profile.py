@@ -9,7 +9,7 @@ from fastapi_app.schemas.profile_schemas import (
     ProfileCreate, ProfileRead, ActivityRead,
     ProfileSettingsUpdate, TwoFactorSetupResponse, TwoFactorVerifyRequest
 )
-from fastapi_app.routers.auth import get_current_user
+from fastapi_app.dependencies.auth import get_current_user
 from django_backend.models import User
 
 router = APIRouter(prefix="/profile", tags=["Profile"])
@@ -1,48 +1,63 @@
 from fastapi import APIRouter, Depends, HTTPException, Query
 from asgiref.sync import sync_to_async
+from django.db import transaction
 from typing import List, Optional
 from django_backend.models import Email, Task, User, ChatMessage, TaskComment, TaskActivity, Tag, Project 
-from fastapi_app.schemas.task_schemas import TaskRead, TaskCreate, TaskUpdate, CommentCreate, CommentRead, ActivityRead, TagRead, AddTagRequest, ProjectCreate, ProjectRead
-from fastapi_app.routers.auth import get_current_user
+from fastapi_app.schemas.task_schemas import TaskRead, TaskPage, TaskBoard, TaskCreate, TaskUpdate, TaskBulkCreate, TaskBulkUpdate, BulkTaskResponse, CommentCreate, CommentRead, ActivityPage, TagRead, AddTagRequest, ProjectCreate, ProjectRead
+from fastapi_app.dependencies.auth import get_current_user
 from fastapi_app.routers.notifications import create_notification
+from fastapi_app.core.task_bulk import bulk_create_tasks, bulk_update_tasks, MAX_BULK_TASKS
+from fastapi_app.core.task_activity import ActivityBuffer, activity_page
+from fastapi_app.core.task_query import list_tasks, task_board, visible_tasks, SORTS, DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
 
 router = APIRouter(prefix="/tasks", tags=["Tasks"])
 
-def log_activity(task: Task, user: User, action: str, details: str):
-    TaskActivity.objects.create(
-        task=task,
-        actor=user,
-        action_type=action,
-        details=details
-    )
-
 
-@router.get("/", response_model=List[TaskRead])
+@router.get("/", response_model=TaskPage)
 def list_my_tasks(
     status: Optional[str] = Query(None, description="Filter by status (todo, in_progress, done)"),
     priority: Optional[str] = Query(None, description="Filter by priority (low, medium, high)"),
     project_id: Optional[int] = Query(None, description="Filter by Project ID"),
     tag: Optional[str] = Query(None, description="Filter by Tag Name"),          
+    sort: str = Query("created", description="created (newest first), due_date (soonest first) or priority (highest first)"),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
     current_user: User = Depends(get_current_user)
 ):
     """
-    Get all tasks for the current user.
+    Tasks the current user created or is assigned to, one page at a time.
     Filters: status, priority, project_id, tag
     """
-    tasks = Task.objects.filter(assigned_to=current_user) | Task.objects.filter(created_by=current_user)
-    
-    if status:
-        tasks = tasks.filter(status=status)
-    if priority:
-        tasks = tasks.filter(priority__iexact=priority)
-    
-    if project_id:
-        tasks = tasks.filter(project_id=project_id)
-        
-    if tag:
-        tasks = tasks.filter(tags__name__iexact=tag) 
-        
-    return tasks.distinct() 
+    if sort not in SORTS:
+        raise HTTPException(status_code=400, detail=f"Invalid sort. Use one of: {', '.join(SORTS)}")
+
+    return list_tasks(
+        current_user,
+        status=status,
+        priority=priority,
+        project_id=project_id,
+        tag=tag,
+        sort=sort,
+        cursor=cursor,
+        limit=limit,
+    )
+
+@router.get("/board", response_model=TaskBoard)
+def task_board_view(
+    project_id: Optional[int] = Query(None, description="Only this project's tasks"),
+    sort: str = Query("created", description="Order within each column: created, due_date or priority"),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE, description="Tasks per column"),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Kanban board: one column per status with its count and first page of
+    tasks (load more with GET /tasks/?status=...&cursor=next_cursor), plus
+    counts per priority, project and tag.
+    """
+    if sort not in SORTS:
+        raise HTTPException(status_code=400, detail=f"Invalid sort. Use one of: {', '.join(SORTS)}")
+
+    return task_board(current_user, project_id=project_id, sort=sort, limit=limit)
 
 @router.post("/", response_model=TaskRead)
 def create_task(data: TaskCreate, current_user: User = Depends(get_current_user)):
@@ -81,6 +96,44 @@ def create_task(data: TaskCreate, current_user: User = Depends(get_current_user)
     return task
 
 
+def _bulk_response(results):
+    succeeded = sum(1 for r in results if r["ok"])
+    return {"succeeded": succeeded, "failed": len(results) - succeeded, "results": results}
+
+
+@router.post("/bulk", response_model=BulkTaskResponse)
+def bulk_create(data: TaskBulkCreate, current_user: User = Depends(get_current_user)):
+    """
+    Create up to MAX_BULK_TASKS tasks in one request. Results are in the
+    order given; an item with an invalid priority or an unknown assignee
+    or project fails alone.
+    """
+    if not data.tasks or len(data.tasks) > MAX_BULK_TASKS:
+        raise HTTPException(status_code=400, detail=f"Send between 1 and {MAX_BULK_TASKS} tasks")
+
+    return _bulk_response(bulk_create_tasks(current_user, data.tasks))
+
+
+@router.patch("/bulk", response_model=BulkTaskResponse)
+def bulk_update(data: TaskBulkUpdate, current_user: User = Depends(get_current_user)):
+    """
+    Apply the same status/priority/assignee change and/or tags to many
+    tasks. Each result lists the fields that changed for that task; ids
+    you neither created nor are assigned to fail with "Task not found".
+    """
+    if not data.task_ids or len(data.task_ids) > MAX_BULK_TASKS:
+        raise HTTPException(status_code=400, detail=f"Send between 1 and {MAX_BULK_TASKS} task ids")
+
+    return _bulk_response(bulk_update_tasks(
+        current_user,
+        data.task_ids,
+        status=data.status,
+        priority=data.priority,
+        assigned_to_email=data.assigned_to_email,
+        add_tags=data.add_tags,
+    ))
+
+
 @router.patch("/{task_id}", response_model=TaskRead)
 def update_task(task_id: int, data: TaskUpdate, current_user: User = Depends(get_current_user)):
     try:
@@ -88,19 +141,24 @@ def update_task(task_id: int, data: TaskUpdate, current_user: User = Depends(get
     except Task.DoesNotExist:
         raise HTTPException(status_code=404, detail="Task not found")
 
+    log = ActivityBuffer(current_user)
+
     if data.status and data.status != task.status:
-        log_activity(task, current_user, "status_change", f"Changed status from {task.status} to {data.status}")
+        log.change(task, "status_change", "status", task.status, data.status)
         task.status = data.status
 
     if data.priority and data.priority != task.priority:
-        log_activity(task, current_user, "priority_change", f"Changed priority from {task.priority} to {data.priority}")
+        log.change(task, "priority_change", "priority", task.priority, data.priority)
         task.priority = data.priority
     
     if data.assigned_to_email:
         try:
             new_assignee = User.objects.get(email=data.assigned_to_email)
             if task.assigned_to != new_assignee:
-                log_activity(task, current_user, "assignment", f"Reassigned task to {new_assignee.email}")
+                log.change(
+                    task, "assignment", "assigned_to",
+                    task.assigned_to.email if task.assigned_to else None, new_assignee.email
+                )
                 task.assigned_to = new_assignee
                 
                 create_notification(
@@ -112,7 +170,9 @@ def update_task(task_id: int, data: TaskUpdate, current_user: User = Depends(get
         except User.DoesNotExist:
             pass 
 
-    task.save()
+    with transaction.atomic():
+        task.save()
+        log.flush()
     return task
 
 
@@ -184,14 +244,20 @@ def list_comments(task_id: int, current_user: User = Depends(get_current_user)):
     return task.comments.all().order_by('-created_at')
 
 
-@router.get("/{task_id}/history", response_model=List[ActivityRead])
-def get_task_history(task_id: int, current_user: User = Depends(get_current_user)):
-    try:
-        task = Task.objects.get(id=task_id)
-    except Task.DoesNotExist:
+@router.get("/{task_id}/history", response_model=ActivityPage)
+def get_task_history(
+    task_id: int,
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    The task's activity, newest first, one page at a time.
+    """
+    if not Task.objects.filter(id=task_id).exists():
         raise HTTPException(status_code=404, detail="Task not found")
-        
-    return task.activity_log.all().order_by('-created_at')
+
+    return activity_page(TaskActivity.objects.filter(task_id=task_id), cursor=cursor, limit=limit)
 
 @router.post("/{task_id}/tags", response_model=TaskRead)
 def add_tag_to_task(task_id: int, tag_data: AddTagRequest, current_user: User = Depends(get_current_user)):
@@ -203,7 +269,9 @@ def add_tag_to_task(task_id: int, tag_data: AddTagRequest, current_user: User =
     
     task.tags.add(tag)
     
-    log_activity(task, current_user, "tag_added", f"Added tag: {tag.name}")
+    log = ActivityBuffer(current_user)
+    log.change(task, "tag_added", "tags", None, tag.name)
+    log.flush()
     
     return task
 
@@ -220,4 +288,26 @@ def create_project(data: ProjectCreate, current_user: User = Depends(get_current
 
 @router.get("/projects", response_model=List[ProjectRead])
 def list_projects(current_user: User = Depends(get_current_user)):
-    return Project.objects.all()
\ No newline at end of file
+    return Project.objects.all()
+
+
+@router.get("/projects/{project_id}/activity", response_model=ActivityPage)
+def project_activity(
+    project_id: int,
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Activity across all of a project's tasks, newest first. Open to the
+    project owner and anyone who created or is assigned a task in it.
+    """
+    try:
+        project = Project.objects.get(id=project_id)
+    except Project.DoesNotExist:
+        raise HTTPException(status_code=404, detail="Project not found")
+
+    if project.owner_id != current_user.id and not visible_tasks(current_user).filter(project=project).exists():
+        raise HTTPException(status_code=403, detail="Not a member of this project")
+
+    return activity_page(TaskActivity.objects.filter(project=project), cursor=cursor, limit=limit)
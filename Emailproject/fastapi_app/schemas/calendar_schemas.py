@@ -1,4 +1,4 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from datetime import datetime, date
 from typing import List, Optional
 
@@ -52,6 +52,9 @@ class EventRead(BaseModel):
     timezone: str
 
     created_by_id: int
+    # Start of this occurrence when a recurring event is expanded in a
+    # range listing; None for one-off events and the series itself.
+    recurrence_id: Optional[datetime] = None
 
     class Config:
         from_attributes = True
@@ -109,3 +112,32 @@ class CalendarMonthView(BaseModel):
     month: int
     events: List[EventRead]
     holidays: List[HolidayRead]
+
+
+MAX_FREE_SLOTS = 200
+
+
+class FreeBusyRequest(BaseModel):
+    user_ids: List[int]
+    start: datetime
+    end: datetime
+    # Shortest gap worth suggesting as a common free slot.
+    duration_minutes: int = 30
+    max_slots: int = Field(default=20, ge=0, le=MAX_FREE_SLOTS)
+
+
+class TimeInterval(BaseModel):
+    start: datetime
+    end: datetime
+
+
+class UserBusy(BaseModel):
+    user_id: int
+    busy: List[TimeInterval]
+
+
+class FreeBusyResponse(BaseModel):
+    start: datetime
+    end: datetime
+    users: List[UserBusy]
+    free_slots: List[TimeInterval]
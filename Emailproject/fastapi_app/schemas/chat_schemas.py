@@ -24,6 +24,11 @@ class MessageRead(BaseModel):
     class Config:
         from_attributes = True
 
+class MessageSeenBy(BaseModel):
+    message_id: int
+    read_count: int
+    seen_by: List[str]
+
 class ChatRoomRead(BaseModel):
     id: int
     name: str | None
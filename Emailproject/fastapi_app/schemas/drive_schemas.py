@@ -1,5 +1,7 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from datetime import datetime
+from typing import Optional
+from uuid import UUID
 
 class DriveFileRead(BaseModel):
     id: int
@@ -12,3 +14,15 @@ class DriveFileRead(BaseModel):
     class Config:
         from_attributes = True
 
+
+class UploadSessionCreate(BaseModel):
+    file_name: str
+    content_type: Optional[str] = None
+    total_size: Optional[int] = Field(default=None, ge=0)
+
+class UploadSessionRead(BaseModel):
+    upload_id: UUID
+    file_name: str
+    offset: int
+    total_size: Optional[int] = None
+    chunk_size: int
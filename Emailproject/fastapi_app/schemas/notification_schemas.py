@@ -6,6 +6,7 @@ class NotificationRead(BaseModel):
     message: str
     notification_type: str
     is_read: bool
+    count: int = 1
     created_at: datetime
     related_id: int | None = Field(default=None, validation_alias="object_id")
 
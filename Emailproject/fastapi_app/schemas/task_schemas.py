@@ -1,7 +1,7 @@
 from __future__ import annotations
-from pydantic import BaseModel, field_validator
+from pydantic import BaseModel, Field, field_validator
 from datetime import datetime
-from typing import Optional, List
+from typing import Optional, List, Dict
 
 
 class UserTiny(BaseModel):
@@ -27,6 +27,27 @@ class TaskUpdate(BaseModel):
     priority: str | None = None
     assigned_to_email: str | None = None
 
+class TaskBulkCreate(BaseModel):
+    tasks: List[TaskCreate]
+
+class TaskBulkUpdate(BaseModel):
+    task_ids: List[int]
+    status: str | None = None
+    priority: str | None = None
+    assigned_to_email: str | None = None
+    add_tags: List[str] = []
+
+class BulkTaskResult(BaseModel):
+    task_id: int | None = None
+    ok: bool
+    error: str | None = None
+    changed: List[str] = []
+
+class BulkTaskResponse(BaseModel):
+    succeeded: int
+    failed: int
+    results: List[BulkTaskResult]
+
 class TagRead(BaseModel):
     id: int
     name: str
@@ -60,6 +81,34 @@ class TaskRead(BaseModel):
             return list(v.all())
         return v
 
+class TaskPage(BaseModel):
+    results: List[TaskRead]
+    next_cursor: str | None = None
+
+class BoardColumn(BaseModel):
+    status: str
+    count: int
+    results: List[TaskRead]
+    next_cursor: str | None = None
+
+class ProjectRollup(BaseModel):
+    project_id: int
+    name: str
+    count: int
+    by_status: Dict[str, int]
+
+class TagRollup(BaseModel):
+    tag_id: int
+    name: str
+    count: int
+
+class TaskBoard(BaseModel):
+    total: int
+    columns: List[BoardColumn]
+    by_priority: Dict[str, int]
+    projects: List[ProjectRollup]
+    tags: List[TagRollup]
+
 class CommentCreate(BaseModel):
     content: str
 
@@ -73,13 +122,22 @@ class CommentRead(BaseModel):
         
 class ActivityRead(BaseModel):
     id: int
+    task_id: int
     action_type: str
-    details: str
+    field: str = ""
+    old_value: str | None = None
+    new_value: str | None = None
+    # Human-readable line, built from field/old/new for structured entries.
+    details: str = Field("", validation_alias="summary")
     created_at: datetime
     actor: UserTiny
 
     class Config:
         from_attributes = True      
+
+class ActivityPage(BaseModel):
+    results: List[ActivityRead]
+    next_cursor: str | None = None
         
 class AddTagRequest(BaseModel):
     tag_name: str
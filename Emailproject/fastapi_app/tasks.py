@@ -2,14 +2,21 @@ import os
 import json
 import redis
 import logging
-from celery import shared_task
+from celery import group, shared_task
 import django
-from django.core.mail import send_mail
+from django.core.files.storage import default_storage
+from django.core.mail import EmailMessage, get_connection
+from django.db import IntegrityError, transaction
+from django.db.models import CharField, Exists, F, OuterRef, ProtectedError, Q, Value
+from django.db.models.functions import Cast, Concat
+from django.utils import timezone
+from datetime import timedelta
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'Emailproject.settings')
 django.setup()
 from django.contrib.auth import get_user_model
 from django.contrib.contenttypes.models import ContentType
-from django_backend.models import Event, Notification, EventAttendee, Email
+from django_backend.models import Event, Notification, EventAttendee, Email, ChatRoom, UploadSession, Blob, DocumentConversion, EventReminder
+from django_backend.recurrence import next_occurrence
 
 User = get_user_model()
 logger = logging.getLogger(__name__)
@@ -58,61 +65,403 @@ def reset_user_status(user_id: int):
     except User.DoesNotExist:
         print(f"User {user_id} not found during auto-reset.")
         
+NOTIFICATION_BATCH_SIZE = 500
+
+@shared_task
+def fan_out_chat_notification(room_id: int, sender_id: int, message: str):
+    """
+    Notifies every participant of a room except the sender about a new
+    message, off the request path.
+
+    Each recipient keeps at most one unread chat digest per room: if they
+    already have one it is bumped ("3 new messages in ...") and moved to the
+    top, otherwise a new one is created with `message`. That is one UPDATE
+    plus batched INSERTs however large the room is, repeated only for the
+    recipients whose digest a concurrent fan-out created first.
+    """
+    room = ChatRoom.objects.filter(id=room_id).first()
+    if room is None:
+        return 0
+
+    recipient_ids = list(room.participants.exclude(id=sender_id).values_list("id", flat=True))
+    if not recipient_ids:
+        return 0
+
+    room_type = ContentType.objects.get_for_model(ChatRoom)
+    digests = Notification.objects.filter(
+        recipient_id__in=recipient_ids,
+        notification_type='chat',
+        is_read=False,
+        content_type=room_type,
+        object_id=room_id
+    )
+    label = (room.name or "Chat")[:200]
+
+    pending = set(recipient_ids)
+    with transaction.atomic():
+        while pending:
+            # Locking the digests being bumped keeps them from being marked
+            # read (or bumped by another fan-out) until this commits.
+            locked = dict(
+                digests.filter(recipient_id__in=pending)
+                .select_for_update()
+                .values_list("recipient_id", "id")
+            )
+            Notification.objects.filter(id__in=list(locked.values())).update(
+                count=F("count") + 1,
+                created_at=timezone.now(),
+                message=Concat(Cast(F("count") + 1, CharField()), Value(f" new messages in {label}"))
+            )
+            pending -= locked.keys()
+            try:
+                with transaction.atomic():
+                    Notification.objects.bulk_create(
+                        [
+                            Notification(
+                                recipient_id=recipient_id,
+                                message=message[:255],
+                                notification_type='chat',
+                                content_type=room_type,
+                                object_id=room_id
+                            )
+                            for recipient_id in pending
+                        ],
+                        batch_size=NOTIFICATION_BATCH_SIZE
+                    )
+            except IntegrityError:
+                # A concurrent fan-out created some of these digests first;
+                # the next pass bumps them instead.
+                continue
+            break
+
+    return len(recipient_ids)
+
+INVITE_EMAIL_CHUNK_SIZE = 500
+INVITE_EMAIL_BATCH_SIZE = 50
+
+def _invite_body(event, user):
+    meeting_link = event.url if event.url else "Link pending or location provided."
+    return (
+        f"Hello {user.first_name},\n\n"
+        f"You have been invited to '{event.title}'.\n"
+        f"Time: {event.start_datetime}\n"
+        f"Join here: {meeting_link}\n\n"
+        f"See you there!"
+    )
+
 @shared_task(bind=True, max_retries=3)
 def process_event_invites(self, event_id, creator_id):
+    """
+    Invites every attendee of an event except its creator.
+
+    In-app notifications and internal emails for all not-yet-invited
+    attendees are written with bulk_create in the same transaction that
+    stamps their invited_at, so a retry never duplicates them. Outbound
+    mail is handed to send_event_invite_emails in chunks of
+    INVITE_EMAIL_CHUNK_SIZE attendees.
+    """
     try:
         event = Event.objects.get(id=event_id)
         creator = User.objects.get(id=creator_id)
-        attendee_records = EventAttendee.objects.filter(event=event).exclude(user_id=creator_id)
-        recipients = [record.user for record in attendee_records]
+        attendees = EventAttendee.objects.filter(event=event).exclude(user_id=creator_id)
 
         logger.info(f"Starting background invites for Event: {event.title}")
         event_content_type = ContentType.objects.get_for_model(Event)
 
-        notifications_created = 0
-        for user in recipients:
-            meeting_link = event.url if event.url else "Link pending or location provided."
-            message_body = (
-            f"Hello {user.first_name},\n\n"
-            f"You have been invited to '{event.title}'.\n"
-            f"Time: {event.start_datetime}\n"
-            f"Join here: {meeting_link}\n\n"
-            f"See you there!"
-        )            
-            Notification.objects.create(
-                recipient=user,
-                message=f"You are invited to {event.title}!",
-                notification_type='meet',
-                content_type=event_content_type, 
-                object_id=event.id
+        with transaction.atomic():
+            pending = list(
+                attendees.filter(invited_at__isnull=True)
+                .select_for_update(of=("self",))
+                .select_related("user")
             )
-            
-            Email.objects.create(
-                sender=creator,
-                receiver=user,
-                subject=f"Invitation: {event.title}",
-                body=message_body,
-                status='SENT'
+            Notification.objects.bulk_create(
+                [
+                    Notification(
+                        recipient=record.user,
+                        message=f"You are invited to {event.title}!"[:255],
+                        notification_type='meet',
+                        content_type=event_content_type,
+                        object_id=event.id
+                    )
+                    for record in pending
+                ],
+                batch_size=NOTIFICATION_BATCH_SIZE
             )
-            
-            # 2. SEND REAL EMAIL (The New Part)
-            if user.email: 
-                logger.info(f"Sending email to {user.email}...")
-                send_mail(
-                    subject=f"Invitation: {event.title}",
-                    message=message_body,
-                    from_email=None,  # Uses the EMAIL_HOST_USER from settings
-                    recipient_list=[user.email],
-                    fail_silently=False
-                )
-            
-            notifications_created += 1
+            Email.objects.bulk_create(
+                [
+                    Email(
+                        sender=creator,
+                        receiver=record.user,
+                        subject=f"Invitation: {event.title}",
+                        body=_invite_body(event, record.user),
+                        status='SENT'
+                    )
+                    for record in pending
+                ],
+                batch_size=NOTIFICATION_BATCH_SIZE
+            )
+            EventAttendee.objects.filter(id__in=[record.id for record in pending]).update(invited_at=timezone.now())
 
-        logger.info(f"Completed. Sent {notifications_created} invites.")
-        return f"Processed {notifications_created} invites for Event {event_id}"
+        to_email = list(
+            attendees.filter(emailed_at__isnull=True)
+            .exclude(user__email="")
+            .order_by("id")
+            .values_list("id", flat=True)
+        )
+        chunks = [
+            to_email[i:i + INVITE_EMAIL_CHUNK_SIZE]
+            for i in range(0, len(to_email), INVITE_EMAIL_CHUNK_SIZE)
+        ]
+        if chunks:
+            group(send_event_invite_emails.s(event_id, chunk) for chunk in chunks).apply_async()
+
+        logger.info(f"Invited {len(pending)} attendees; queued {len(to_email)} emails in {len(chunks)} chunks.")
+        return {"invited": len(pending), "emails_queued": len(to_email), "email_chunks": len(chunks)}
 
     except Event.DoesNotExist:
         logger.error(f"Event with ID {event_id} not found.")
     except Exception as e:
         logger.error(f"Error processing invites: {e}")
-        self.retry(exc=e, countdown=60)
\ No newline at end of file
+        self.retry(exc=e, countdown=60)
+
+@shared_task(bind=True, max_retries=3)
+def send_event_invite_emails(self, event_id, attendee_ids):
+    """
+    Sends the invitation emails for one chunk of attendees over a single
+    SMTP connection, INVITE_EMAIL_BATCH_SIZE messages at a time.
+
+    Each batch stamps emailed_at once sent, so a retry resumes after the
+    last delivered batch, and progress is reported as PROGRESS task state
+    ({"sent": n, "total": m}).
+    """
+    try:
+        event = Event.objects.get(id=event_id)
+    except Event.DoesNotExist:
+        logger.error(f"Event with ID {event_id} not found.")
+        return 0
+
+    records = list(
+        EventAttendee.objects.filter(id__in=attendee_ids, emailed_at__isnull=True)
+        .select_related("user")
+        .order_by("id")
+    )
+    total = len(records)
+    sent = 0
+
+    try:
+        with get_connection() as connection:
+            for i in range(0, total, INVITE_EMAIL_BATCH_SIZE):
+                batch = records[i:i + INVITE_EMAIL_BATCH_SIZE]
+                connection.send_messages([
+                    EmailMessage(
+                        subject=f"Invitation: {event.title}",
+                        body=_invite_body(event, record.user),
+                        to=[record.user.email],
+                        connection=connection
+                    )
+                    for record in batch
+                ])
+                EventAttendee.objects.filter(id__in=[record.id for record in batch]).update(emailed_at=timezone.now())
+                sent += len(batch)
+                if not self.request.is_eager:
+                    self.update_state(state="PROGRESS", meta={"sent": sent, "total": total})
+    except Exception as e:
+        logger.error(f"Error sending invite emails for Event {event_id} ({sent}/{total} sent): {e}")
+        raise self.retry(exc=e, countdown=60)
+
+    logger.info(f"Sent {sent} invite emails for Event {event_id}.")
+    return sent
+
+@shared_task
+def purge_stale_upload_sessions(max_age_hours: int = 24):
+    """
+    Deletes resumable Drive uploads that have not received a chunk for
+    `max_age_hours`, together with their partial files.
+    """
+    from fastapi_app.core.uploads import discard_partial
+
+    cutoff = timezone.now() - timedelta(hours=max_age_hours)
+    stale = UploadSession.objects.filter(updated_at__lt=cutoff).values_list("id", flat=True)
+
+    removed = 0
+    for session_id in stale.iterator():
+        # Re-checked in the DELETE itself so a session that took a chunk
+        # meanwhile keeps its partial file.
+        deleted, _ = UploadSession.objects.filter(id=session_id, updated_at__lt=cutoff).delete()
+        if deleted:
+            discard_partial(session_id)
+            removed += 1
+    return removed
+
+
+CONVERSION_CACHE_DAYS = 30
+
+
+@shared_task
+def collect_unreferenced_blobs(grace_minutes: int = 60, conversion_max_age_days: int = CONVERSION_CACHE_DAYS):
+    """
+    Deletes blobs nothing points at any more, together with their stored
+    files. Blobs touched within `grace_minutes` are kept, since an upload
+    may have just stored (or reused) one without referencing it yet.
+
+    Blobs held by the conversion cache (as source or result) are not
+    counted in ref_count but are PROTECTed by it, so they are left out of
+    the candidates instead of failing the DELETE on every run. Cache rows
+    not used for `conversion_max_age_days` whose blobs are referenced by
+    nothing else are dropped first, so their blobs go in the same run.
+    """
+    now = timezone.now()
+    DocumentConversion.objects.filter(
+        last_used_at__lt=now - timedelta(days=conversion_max_age_days),
+        source__ref_count__lte=0,
+    ).exclude(status="PENDING").exclude(result__ref_count__gt=0).delete()
+
+    cutoff = now - timedelta(minutes=grace_minutes)
+    cached = DocumentConversion.objects.filter(Q(source=OuterRef("pk")) | Q(result=OuterRef("pk")))
+    candidates = (
+        Blob.objects.filter(ref_count__lte=0, updated_at__lt=cutoff)
+        .filter(~Exists(cached))
+        .values_list("id", "file")
+    )
+
+    removed = 0
+    for blob_id, name in candidates.iterator():
+        try:
+            # Re-checked in the DELETE itself so a blob picked up again meanwhile survives.
+            deleted, _ = Blob.objects.filter(id=blob_id, ref_count__lte=0, updated_at__lt=cutoff).delete()
+        except ProtectedError:
+            continue
+        if deleted:
+            default_storage.delete(name)
+            removed += 1
+    return removed
+
+
+@shared_task(bind=True, max_retries=3)
+def attach_converted_document(self, email_id: int, conversion_id: int, file_name: str):
+    """
+    Converts an emailed Word document to PDF and attaches the PDF to the
+    email. Each distinct document is converted only once (see
+    DocumentConversion); if conversion fails the original is attached.
+    Anything else that goes wrong (the row not visible yet, storage or
+    database errors) is retried.
+    """
+    try:
+        return _attach_converted_document(email_id, conversion_id, file_name)
+    except Exception as e:
+        logger.error(f"Attaching {file_name} to Email {email_id} failed: {e}")
+        raise self.retry(exc=e, countdown=60)
+
+
+def _attach_converted_document(email_id, conversion_id, file_name):
+    from fastapi_app.core.conversions import attach_blob, convert_to_pdf, pdf_name
+
+    conversion = DocumentConversion.objects.select_related("source").get(id=conversion_id)
+    if conversion.status == "PENDING":
+        try:
+            result = convert_to_pdf(conversion.source, file_name)
+        except Exception as e:
+            logger.exception("Converting %s failed", file_name)
+            DocumentConversion.objects.filter(id=conversion_id, status="PENDING").update(
+                status="FAILED", error=str(e), updated_at=timezone.now()
+            )
+        else:
+            # A concurrent task may have finished first; its result is kept.
+            DocumentConversion.objects.filter(id=conversion_id, status="PENDING").update(
+                status="DONE", result=result, updated_at=timezone.now()
+            )
+        conversion.refresh_from_db()
+
+    if not Email.objects.filter(id=email_id).exists():
+        return None
+    if conversion.status == "DONE":
+        attachment = attach_blob(email_id, conversion.result, pdf_name(file_name))
+    else:
+        attachment = attach_blob(email_id, conversion.source, file_name)
+    return attachment.id
+
+
+REMINDER_BATCH_SIZE = 500
+# A reminder still goes out if it is picked up up to this long after its
+# occurrence started; later than that (e.g. after an outage) it is skipped
+# rather than announcing a meeting that is well under way. How late it is
+# relative to its own fire_at does not matter: a reminder created with
+# less notice than minutes_before is due at once and must still be sent.
+REMINDER_START_GRACE = timedelta(minutes=5)
+
+
+@shared_task
+def fire_due_reminders():
+    """
+    Run by Celery beat. Delivers every reminder whose fire_at has passed,
+    REMINDER_BATCH_SIZE at a time, as in-app notifications to the event's
+    creator and attendees who have not declined.
+
+    Only the front of eventreminder_due_idx is read, however many future
+    reminders exist. Each reminder is claimed with an UPDATE conditioned
+    on the fire_at that was read, in the same transaction that creates its
+    notifications, so overlapping ticks, retries and restarts never
+    deliver it twice. Recurring reminders move on to the first occurrence
+    whose fire time is still in the future instead of being marked sent,
+    so an overdue one catches up with a single notification.
+    """
+    event_content_type = ContentType.objects.get_for_model(Event)
+    delivered = 0
+    while True:
+        now = timezone.now()
+        with transaction.atomic():
+            due = list(
+                EventReminder.objects.select_for_update(skip_locked=True, of=("self",))
+                .select_related("event")
+                .filter(sent_at__isnull=True, fire_at__lte=now)
+                .order_by("fire_at")[:REMINDER_BATCH_SIZE]
+            )
+            if not due:
+                break
+
+            to_send = []
+            for reminder in due:
+                lead = timedelta(minutes=reminder.minutes_before)
+                starts_at = reminder.fire_at + lead
+                changes = {"sent_at": now}
+                if reminder.event.is_recurring:
+                    # The first occurrence whose reminder is still ahead.
+                    # With a lead longer than the repeat period the ones
+                    # in between are already inside their lead; they are
+                    # skipped rather than each sent on a following tick.
+                    upcoming = next_occurrence(reminder.event, now + lead)
+                    if upcoming is not None:
+                        changes = {"fire_at": upcoming - lead}
+
+                claimed = EventReminder.objects.filter(
+                    id=reminder.id, fire_at=reminder.fire_at, sent_at__isnull=True
+                ).update(**changes)
+                if claimed and now <= starts_at + REMINDER_START_GRACE:
+                    to_send.append((reminder.event, starts_at))
+
+            event_ids = {event.id for event, _ in to_send}
+            recipients = {event_id: set() for event_id in event_ids}
+            for event_id, user_id in (
+                EventAttendee.objects.filter(event_id__in=event_ids)
+                .exclude(status="declined")
+                .values_list("event_id", "user_id")
+            ):
+                recipients[event_id].add(user_id)
+
+            notifications = []
+            for event, starts_at in to_send:
+                message = f"Reminder: {event.title[:180]} starts at {starts_at:%Y-%m-%d %H:%M} UTC"
+                for user_id in recipients[event.id] | {event.created_by_id}:
+                    notifications.append(Notification(
+                        recipient_id=user_id,
+                        message=message,
+                        notification_type='meet',
+                        content_type=event_content_type,
+                        object_id=event.id
+                    ))
+            Notification.objects.bulk_create(notifications, batch_size=NOTIFICATION_BATCH_SIZE)
+            delivered += len(notifications)
+
+        if len(due) < REMINDER_BATCH_SIZE:
+            break
+    return delivered
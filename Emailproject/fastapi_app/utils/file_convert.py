@@ -2,11 +2,16 @@ from docx import Document
 from reportlab.lib.pagesizes import A4
 from reportlab.pdfgen import canvas
 from pathlib import Path
+from typing import BinaryIO, Union
 
 
-def docx_to_pdf(docx_path: Path, pdf_path: Path):
+def docx_to_pdf(docx_path: Union[Path, BinaryIO], pdf_path: Union[Path, BinaryIO]):
+    """
+    Renders the paragraphs of a .docx as a plain PDF. Both arguments may be
+    paths or open binary files.
+    """
     document = Document(docx_path)
-    c = canvas.Canvas(str(pdf_path), pagesize=A4)
+    c = canvas.Canvas(pdf_path if hasattr(pdf_path, "write") else str(pdf_path), pagesize=A4)
 
     width, height = A4
     x, y = 40, height - 40